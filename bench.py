@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+bench.py - benchmarks for the parsers and cleanup functions
+
+Times the functions a full rebuild spends its CPU in, against the fixture
+pages in bench_fixtures/ (the page formats the scrapers keep in the
+content store: the master list, Bulbapedia Pokémon/type pages, the
+name-origin section HTML and the JP wiki pages), plus the checked-in
+JSON for the per-record functions:
+
+    parse_list                          list.html, all 1025 rows
+    parse_master                        a 21-row slice of the stored master index
+    clean_origin                        name-origin section HTML
+    jp_elements                         JP wiki page
+    extract_pokemon_types_from_page     Pokémon page
+    extract_type_info_from_types_page   Type page
+    extract_tcg_types_from_page         TCG type page
+    katakana_to_hiragana                every kanaName
+    clean_footnotes                     every raw nameOriginDescription
+
+Each case reports per-call latency (median and p95), throughput in
+units/s (pages, names or descriptions) and peak traced memory of one
+call.  Results are saved as JSON; --compare flags every case whose median
+got slower than a baseline by more than --threshold.
+
+parse_master and jp_elements read through the content store, so they are
+given a temporary store seeded with the fixtures.  Fixture pages are
+generated from the dataset by `python bench.py fixtures` and checked in,
+so timings don't move when the dataset does.
+
+Usage:
+    python bench.py run [-k parse] [--rounds 20] [--save bench_results.json]
+    python bench.py run --compare bench_baseline.json [--threshold 0.2]
+    python bench.py fixtures            # regenerate bench_fixtures/
+"""
+
+import argparse
+import contextlib
+import html
+import io
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import quote
+
+FIXTURES = pathlib.Path("bench_fixtures")
+POKEMON_JSON = "pokemon_base_0001_1025_with_tcg_types.json"
+ORIGINS_RAW_JSON = "name_origins_0001_1025.json"
+SAMPLE = (1, 6, 25, 150, 448, 1000)     # the pages each page case cycles through
+
+# ------------------ fixtures --------------------
+TYPE_COLORS = {
+    "Normal": "#9FA19F", "Fire": "#E62829", "Water": "#2980EF", "Electric": "#F8D030",
+    "Grass": "#3FA129", "Ice": "#3DCEF3", "Fighting": "#FF8000", "Poison": "#9141CB",
+    "Ground": "#915121", "Flying": "#81B9EF", "Psychic": "#EF4179", "Bug": "#91A119",
+    "Rock": "#AFA981", "Ghost": "#704170", "Dragon": "#7038F8", "Dark": "#504843",
+    "Steel": "#60A1B8", "Fairy": "#EF70EF",
+}
+GENERATIONS = (151, 251, 386, 493, 649, 721, 809, 905, 1025)
+
+def _page(title, body, filler_rows=0):
+    """A MediaWiki-shaped page; filler rows stand in for the learnset tables."""
+    filler = "".join(f"<tr><td>{i}</td><td><a href='/wiki/Move_{i}'>Move {i}</a></td>"
+                     f"<td style='background:#ddd'>Normal</td><td>40</td><td>100%</td></tr>"
+                     for i in range(filler_rows))
+    return (f"<!DOCTYPE html><html><head><title>{html.escape(title)}</title></head><body>"
+            f"<div id='mw-content-text'>{body}"
+            f"<table class='roundy sortable'><tbody>{filler}</tbody></table></div></body></html>")
+
+def list_fixture(pokemon):
+    tables, start = [], 0
+    for gen, end in enumerate(GENERATIONS, 1):
+        rows = []
+        for p in pokemon[start:end]:
+            rows.append(
+                f"<tr><td>#{p['ndex']:04d}</td>"
+                f"<td><a href='/wiki/{quote(p['english'])}_(Pok%C3%A9mon)'>"
+                f"<img src='{p['imageUrl'].removeprefix('https:')}' width='70'></a></td>"
+                f"<td><a href='/wiki/{quote(p['english'])}_(Pok%C3%A9mon)'>"
+                f"{html.escape(p['english'])}</a></td>"
+                f"<td><a href='{p['jpPage']}' class='external'>{p['kanaName']}</a></td>"
+                f"<td>{html.escape(p['hepburnName'])}</td>"
+                f"<td>{html.escape(p['publishedName'])}</td></tr>")
+        tables.append(
+            f"<h2>Generation {gen}</h2><table class='roundy'><tbody>"
+            f"<tr><th>Ndex</th><th>MS</th><th>English</th><th>Kana</th><th>Hepburn</th>"
+            f"<th>Trademarked</th></tr><tr><th colspan='6'></th></tr>{''.join(rows)}"
+            f"</tbody></table>")
+        start = end
+    return _page("List of Japanese Pokémon names", "".join(tables))
+
+def pokemon_fixture(p):
+    cells = "".join(f"<td style='background:{TYPE_COLORS[t]}'>"
+                    f"<a href='/wiki/{t}_(type)'><span>{t}</span></a></td>"
+                    for t in p.get("types", []))
+    infobox = (f"<table class='roundy infobox'><tbody>"
+               f"<tr><td><b>{html.escape(p['english'])}</b></td></tr>"
+               f"<tr><td><b><a href='/wiki/Type'>Type</a></b><table><tr>{cells}"
+               f"</tr></table></td></tr>"
+               f"<tr><td><b>Category</b></td><td>Seed Pokémon</td></tr></tbody></table>")
+    return _page(p["english"], infobox + "<p>Biology ...</p>" * 20, filler_rows=150)
+
+def types_fixture():
+    cells = "".join(f"<td style='background: {c}'><a href='/wiki/{t}_(type)'>"
+                    f"<img src='//archives.bulbagarden.net/media/upload/{t}_icon.png'>{t}</a></td>"
+                    for t, c in TYPE_COLORS.items())
+    return _page("Type", f"<table><tr>{cells}</tr></table>" + "<p>Type chart ...</p>" * 40,
+                 filler_rows=300)
+
+def tcg_types_fixture():
+    rows = "".join(
+        f"<tr><td style='background: {c}'><img src='/media/upload/{t}-attack.png'>{t}</td>"
+        f"<td>Pokémon of the {t} type</td></tr>"
+        for t, c in [("Grass", "#19A648"), ("Fire", "#E4613E"), ("Water", "#3099E1"),
+                     ("Lightning", "#DFBC28"), ("Psychic", "#E96C8C"), ("Fighting", "#E49021"),
+                     ("Darkness", "#4F4747"), ("Metal", "#74B0CB"), ("Fairy", "#E18CE1"),
+                     ("Dragon", "#576325"), ("Colorless", "#BEBED1")])
+    return _page("Type (TCG)", f"<table><tr><th>TCG</th><th>Description</th></tr>{rows}</table>",
+                 filler_rows=100)
+
+def origin_fixture(description):
+    """The parsed 'Name origin' section, as the API returns it."""
+    return (f"<div class='mw-parser-output'><h3><span id='Name_origin'>Name origin</span></h3>"
+            f"<p>{html.escape(description)}</p>"
+            f"<p>{html.escape(description.split('.')[0])}.<sup>[1]</sup></p>"
+            f"<table><tr><th>Language</th><th>Title</th><th>Meaning</th></tr>"
+            + "<tr><td>French</td><td>Nom</td><td>From ...</td></tr>" * 20 + "</table></div>")
+
+def jp_fixture(kana_name, elements):
+    return _page(kana_name,
+                 "<h2><span>概要</span></h2><p>...</p>" * 5 +
+                 f"<h2><span>名称と由来</span></h2><table><tr><th>言語</th><th>名前</th>"
+                 f"<th>名前</th><th>由来</th></tr><tr><td>日本語</td><td>-</td>"
+                 f"<td>{kana_name}</td><td>{'、'.join(elements)}</td></tr></table>",
+                 filler_rows=80)
+
+def make_fixtures():
+    with open(POKEMON_JSON, "r", encoding="utf-8") as f:
+        pokemon = json.load(f)
+    with open(ORIGINS_RAW_JSON, "r", encoding="utf-8") as f:
+        origins = json.load(f)
+    FIXTURES.mkdir(exist_ok=True)
+    files = {"list.html": list_fixture(pokemon), "types.html": types_fixture(),
+             "tcg_types.html": tcg_types_fixture()}
+    by_ndex = {p["ndex"]: p for p in pokemon}
+    for n in SAMPLE:
+        p, o = by_ndex[n], origins[str(n)]
+        files[f"pokemon_{n:04d}.html"] = pokemon_fixture(p)
+        files[f"origin_{n:04d}.html"] = origin_fixture(o["nameOriginDescription"])
+        files[f"jp_{n:04d}.html"] = jp_fixture(p["kanaName"], o["nameOriginElements"][1:])
+    for name, text in files.items():
+        (FIXTURES / name).write_text(text, encoding="utf-8")
+    print(f"Wrote {len(files)} fixtures to {FIXTURES}/ "
+          f"({sum(len(t.encode()) for t in files.values()) / 1024:.0f} KB)")
+
+# ------------------ cases -----------------------
+def fixture(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+@contextlib.contextmanager
+def seeded_store(entries):
+    """Point content_store.default_store() at a temporary store holding entries."""
+    import content_store
+    with tempfile.TemporaryDirectory() as tmp:
+        store = content_store.ContentStore(pathlib.Path(tmp), legacy_fallback=False)
+        for key, text in entries.items():
+            store.put(key, text)
+        previous, content_store._default = content_store._default, store
+        try:
+            yield store
+        finally:
+            content_store._default = previous
+            store.conn().close()
+
+def cases():
+    """name -> (unit, setup) where setup() returns (calls, units per call, context)."""
+    def parse_list():
+        from scrape_pokemon_flashcards import parse_list as func
+        page = fixture("list.html")
+        return [lambda: func(page)], 1, contextlib.nullcontext()
+
+    def parse_master():
+        import scrape_pokemon_flashcards as scraper
+        scraper._master = None
+        return [lambda: scraper.parse_master(500, 520)], 1, seeded_store(
+            {"list.html": fixture("list.html")})
+
+    def clean_origin():
+        from scrape_pokemon_flashcards import clean_origin as func
+        pages = [fixture(f"origin_{n:04d}.html") for n in SAMPLE]
+        return [lambda h=h: func(h) for h in pages], 1, contextlib.nullcontext()
+
+    def jp_elements():
+        from scrape_pokemon_flashcards import jp_elements as func
+        with open(POKEMON_JSON, "r", encoding="utf-8") as f:
+            urls = {p["ndex"]: p["jpPage"] for p in json.load(f) if p["ndex"] in SAMPLE}
+        entries = {f"jp_{pathlib.Path(urls[n]).name}.html": fixture(f"jp_{n:04d}.html")
+                   for n in SAMPLE}
+        return [lambda u=urls[n]: func(u) for n in SAMPLE], 1, seeded_store(entries)
+
+    def pokemon_types():
+        from extract_types import extract_pokemon_types_from_page as func
+        pages = [fixture(f"pokemon_{n:04d}.html") for n in SAMPLE]
+        return [lambda h=h: func(h, "") for h in pages], 1, contextlib.nullcontext()
+
+    def type_info():
+        from extract_types import extract_type_info_from_types_page as func
+        page = fixture("types.html")
+        return [lambda: func(page)], 1, contextlib.nullcontext()
+
+    def tcg_types():
+        from extract_tcg_types import extract_tcg_types_from_page as func
+        page = fixture("tcg_types.html")
+        return [lambda: func(page)], 1, contextlib.nullcontext()
+
+    def hiragana():
+        from add_hiragana import katakana_to_hiragana as func
+        with open(POKEMON_JSON, "r", encoding="utf-8") as f:
+            names = [p["kanaName"] for p in json.load(f)]
+        return [lambda: [func(n) for n in names]], len(names), contextlib.nullcontext()
+
+    def footnotes():
+        from clean_footnotes import clean_footnotes as func
+        with open(ORIGINS_RAW_JSON, "r", encoding="utf-8") as f:
+            texts = [o["nameOriginDescription"] for o in json.load(f).values()]
+        return [lambda: [func(t) for t in texts]], len(texts), contextlib.nullcontext()
+
+    return {
+        "parse_list":                        ("page", parse_list),
+        "parse_master":                      ("slice", parse_master),
+        "clean_origin":                      ("page", clean_origin),
+        "jp_elements":                       ("page", jp_elements),
+        "extract_pokemon_types_from_page":   ("page", pokemon_types),
+        "extract_type_info_from_types_page": ("page", type_info),
+        "extract_tcg_types_from_page":       ("page", tcg_types),
+        "katakana_to_hiragana":              ("name", hiragana),
+        "clean_footnotes":                   ("description", footnotes),
+    }
+
+# ------------------ runner ----------------------
+def measure(unit, setup, rounds):
+    calls, per_call, context = setup()
+    with context, contextlib.redirect_stdout(io.StringIO()):   # the parsers print
+        for call in calls:
+            call()                      # warm up imports and caches
+        times = []
+        for _ in range(rounds):
+            for call in calls:
+                started = time.perf_counter()
+                call()
+                times.append(time.perf_counter() - started)
+        tracemalloc.start()
+        calls[0]()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    times.sort()
+    median = statistics.median(times)
+    return {
+        "unit": unit,
+        "calls": len(times),
+        "median_ms": median * 1e3,
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1e3,
+        "per_second": per_call / median,
+        "peak_kb": peak / 1024,
+    }
+
+def run(selected, rounds):
+    results = {}
+    for name, (unit, setup) in cases().items():
+        if selected and not any(s in name for s in selected):
+            continue
+        results[name] = measure(unit, setup, rounds)
+        r = results[name]
+        print(f"{name:35s} {r['median_ms']:9.3f} ms {r['p95_ms']:9.3f} ms p95 "
+              f"{r['per_second']:10.1f} {unit}s/s {r['peak_kb']:9.0f} KB peak")
+    return results
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline; returns the names that regressed."""
+    regressed = []
+    print(f"\nAgainst baseline (threshold +{threshold:.0%}):")
+    for name, r in results.items():
+        old = baseline["results"].get(name)
+        if not old:
+            print(f"  {name:35s} new")
+            continue
+        change = r["median_ms"] / old["median_ms"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"  {name:35s} {old['median_ms']:9.3f} -> {r['median_ms']:9.3f} ms "
+              f"({change:+.1%}) {flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the parsers and cleanup functions")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="run the benchmarks")
+    r.add_argument("-k", dest="select", action="append", default=[],
+                   help="only cases whose name contains this (repeatable)")
+    r.add_argument("--rounds", type=int, default=20)
+    r.add_argument("--save", metavar="FILE", help="write results as JSON")
+    r.add_argument("--compare", metavar="BASELINE", help="results JSON to compare with")
+    r.add_argument("--threshold", type=float, default=0.2,
+                   help="slowdown of the median counted as a regression (default 0.2)")
+    sub.add_parser("fixtures", help=f"regenerate {FIXTURES}/ from the dataset")
+    args = ap.parse_args()
+
+    if args.cmd == "fixtures":
+        make_fixtures()
+        return
+    results = run(args.select, args.rounds)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "rounds": args.rounds,
+                       "results": results}, f, indent=2)
+        print(f"Saved results to {args.save}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressed = compare(results, json.load(f), args.threshold)
+        if regressed:
+            print(f"{len(regressed)} regression(s): {', '.join(regressed)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
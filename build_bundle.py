@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+build_bundle.py - pre-join the card data into sharded bundles
+
+loadData() in script.js used to fetch the three source files in full and
+join them in the browser before the first sheet could render.  This does
+the join offline and writes the result already shaped like script.js's
+card objects (jpRuby is the elements with furigana, see furigana.py):
+
+    {"id": 1, "kana": "フシギダネ", "hiragana": ..., "pub": ..., "hep": ...,
+     "english": ..., "img": ..., "jp": [...], "jpRuby": [...], "en": [], "desc": ...,
+     "tcgType": "Grass", "tcgTypeIcon": "images/20px-Grass-attack.png"}
+
+Cards are split into shards of whole 4-card sheets, so the first shard
+fills the first pages on its own.  Shard names carry a content hash
+(cards_000.3f2a9c1e.json) and can be cached forever; bundle/index.json
+lists them:
+
+    {"version": 1, "cards": 1025, "cardsPerSheet": 4,
+     "shards": [{"file": "cards_000.3f2a9c1e.json", "first": 1, "count": 32}, ...]}
+
+Every shard is minified and written with a .gz copy, plus a .br copy
+when the brotli module is installed (pip install brotli), for servers
+that serve precompressed files.
+
+Usage:
+    python build_bundle.py [--sheets-per-shard 8] [--out bundle]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import pathlib
+
+try:
+    import brotli
+except ImportError:                 # optional dependency
+    brotli = None
+
+POKEMON_JSON = "pokemon_base_0001_1025_with_tcg_types.json"
+ORIGINS_JSON = "name_origins_0001_1025_furigana.json"
+TCG_TYPES_JSON = "tcg_types_info.json"
+BUNDLE_DIR = pathlib.Path("bundle")
+CARDS_PER_SHEET = 4                 # buildSheets() puts four cards on a sheet
+
+def make_card(pokemon: dict, origin: dict, tcg_types: dict) -> dict:
+    """The card object loadData() builds from one record of each file."""
+    elements = origin.get("nameOriginElements") or []
+    tcg_type = pokemon.get("tcg_type") or "Colorless"
+    info = tcg_types.get(tcg_type) or tcg_types.get("Colorless") or {}
+    return {
+        "id": pokemon["ndex"],
+        "kana": pokemon["kanaName"],
+        "hiragana": pokemon.get("hiragana") or pokemon["kanaName"],
+        "pub": pokemon["publishedName"],
+        "hep": pokemon["hepburnName"],
+        "english": pokemon["english"],
+        "img": pokemon["imageUrl"],
+        "jp": elements[1:],         # the first element is the Japanese name itself
+        "jpRuby": (origin.get("nameOriginRuby") or elements)[1:],
+        "en": [],
+        "desc": origin.get("nameOriginDescription") or "",
+        "tcgType": tcg_type,
+        "tcgTypeIcon": info.get("icon_url"),
+    }
+
+def load_cards() -> list[dict]:
+    with open(POKEMON_JSON, "r", encoding="utf-8") as f:
+        pokemon = json.load(f)
+    with open(ORIGINS_JSON, "r", encoding="utf-8") as f:
+        origins = json.load(f)
+    with open(TCG_TYPES_JSON, "r", encoding="utf-8") as f:
+        tcg_types = json.load(f)
+    return [make_card(p, origins.get(str(p["ndex"]), {}), tcg_types) for p in pokemon]
+
+def write_variants(path: pathlib.Path, body: bytes) -> int:
+    """Write body plus precompressed copies; returns the bytes written."""
+    path.write_bytes(body)
+    total = len(body)
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    path.with_name(path.name + ".gz").write_bytes(gz)
+    total += len(gz)
+    if brotli:
+        br = brotli.compress(body, quality=11)
+        path.with_name(path.name + ".br").write_bytes(br)
+        total += len(br)
+    return total
+
+def build(sheets_per_shard: int = 8, out: pathlib.Path = BUNDLE_DIR) -> dict:
+    cards = load_cards()
+    out.mkdir(parents=True, exist_ok=True)
+    for old in out.glob("cards_*"):
+        old.unlink()
+    size = sheets_per_shard * CARDS_PER_SHEET
+    index = {"version": 1, "cards": len(cards), "cardsPerSheet": CARDS_PER_SHEET, "shards": []}
+    written = 0
+    for n, start in enumerate(range(0, len(cards), size)):
+        shard = cards[start:start + size]
+        body = json.dumps(shard, ensure_ascii=False, separators=(",", ":")).encode()
+        name = f"cards_{n:03d}.{hashlib.sha1(body).hexdigest()[:8]}.json"
+        written += write_variants(out / name, body)
+        index["shards"].append({"file": name, "first": shard[0]["id"], "count": len(shard)})
+    body = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode()
+    written += write_variants(out / "index.json", body)
+    index["bytes"] = written
+    return index
+
+def main():
+    ap = argparse.ArgumentParser(description="Pre-join card data into sharded bundles")
+    ap.add_argument("--sheets-per-shard", type=int, default=8,
+                    help="4-card sheets per shard (the first shard is the first render)")
+    ap.add_argument("--out", type=pathlib.Path, default=BUNDLE_DIR)
+    args = ap.parse_args()
+
+    index = build(args.sheets_per_shard, args.out)
+    first = args.out / index["shards"][0]["file"]
+    print(f"Bundled {index['cards']} cards into {len(index['shards'])} shards in {args.out}/")
+    print(f"First shard: {first.stat().st_size} bytes, "
+          f"{(first.with_name(first.name + '.gz')).stat().st_size} gzipped"
+          + ("" if brotli else " (install brotli for .br copies)"))
+    print(f"Total written: {index['bytes'] / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    main()
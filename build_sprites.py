@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+build_sprites.py - pack images/ into sprite-sheet atlases
+
+Packs the 70px Pokémon sprites (in ndex order, so neighbouring cards share
+an atlas) and the type icons into a handful of PNG atlases, optionally with
+WebP copies, and writes images/atlas/manifest.json:
+
+    {
+      "atlases": [{"png": "images/atlas/sprites_0.png",
+                   "webp": "images/atlas/sprites_0.webp", "w": 560, "h": 560}, ...],
+      "images":  {"70px-0001Bulbasaur.png": [atlas, x, y, w, h], ...}
+    }
+
+script.js looks images up by file name and draws them as CSS background
+offsets; `python pipeline.py sprites` records the same offsets next to
+imageUrl in the dataset.
+
+Requires Pillow (pip install Pillow); WebP output needs Pillow built with
+libwebp.
+
+Usage:
+    python build_sprites.py [--per-atlas 64] [--columns 8] [--webp]
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+
+try:
+    from PIL import Image
+except ImportError:                 # optional dependency
+    Image = None
+
+from download_images import image_filename
+
+IMAGES_DIR = pathlib.Path("images")
+ATLAS_DIR = IMAGES_DIR / "atlas"
+MANIFEST = ATLAS_DIR / "manifest.json"
+POKEMON_JSON = "pokemon_base_0001_1025_with_local_images.json"
+ICON_JSONS = ["tcg_types_info.json", "types_info.json"]
+
+def sprite_files(pokemon_json: str) -> list[pathlib.Path]:
+    """Sprite files in ndex order."""
+    with open(pokemon_json, "r", encoding="utf-8") as f:
+        data = sorted(json.load(f), key=lambda p: p["ndex"])
+    paths = [IMAGES_DIR / image_filename(p["imageUrl"]) for p in data]
+    return [p for p in paths if p.exists()]
+
+def icon_files() -> list[pathlib.Path]:
+    """Type icons referenced by the type info files."""
+    seen = []
+    for name in ICON_JSONS:
+        if not pathlib.Path(name).exists():
+            continue
+        with open(name, "r", encoding="utf-8") as f:
+            for info in json.load(f).values():
+                url = info.get("icon_url")
+                path = IMAGES_DIR / image_filename(url) if url else None
+                if path and path.exists() and path not in seen:
+                    seen.append(path)
+    return seen
+
+def pack(paths, columns: int, stem: str, webp: bool, manifest: dict):
+    """Grid-pack equally sized images into one atlas."""
+    tiles = [Image.open(p).convert("RGBA") for p in paths]
+    w = max(t.width for t in tiles)
+    h = max(t.height for t in tiles)
+    cols = min(columns, len(tiles))
+    rows = -(-len(tiles) // cols)
+    sheet = Image.new("RGBA", (cols * w, rows * h), (0, 0, 0, 0))
+    index = len(manifest["atlases"])
+    for i, (path, tile) in enumerate(zip(paths, tiles)):
+        x, y = (i % cols) * w, (i // cols) * h
+        sheet.paste(tile, (x, y))
+        manifest["images"][path.name] = [index, x, y, tile.width, tile.height]
+
+    png = ATLAS_DIR / f"{stem}.png"
+    sheet.save(png, optimize=True)
+    entry = {"png": png.as_posix(), "webp": None, "w": sheet.width, "h": sheet.height}
+    if webp:
+        out = ATLAS_DIR / f"{stem}.webp"
+        sheet.save(out, "WEBP", lossless=True, method=6)
+        entry["webp"] = out.as_posix()
+    manifest["atlases"].append(entry)
+    print(f"  {png} ({len(tiles)} images, {sheet.width}x{sheet.height})")
+
+def build(pokemon_json: str = POKEMON_JSON, per_atlas: int = 64,
+          columns: int = 8, webp: bool = False) -> dict:
+    ATLAS_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = {"atlases": [], "images": {}}
+    sprites = sprite_files(pokemon_json)
+    for n, start in enumerate(range(0, len(sprites), per_atlas)):
+        pack(sprites[start:start + per_atlas], columns, f"sprites_{n}", webp, manifest)
+    icons = icon_files()
+    if icons:
+        pack(icons, columns, "icons", webp, manifest)
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    return manifest
+
+# ------------------ pipeline stage --------------
+_manifest = None
+
+def sprite_record(pokemon: dict) -> dict:
+    """Return a copy of one Pokémon record with its atlas offsets"""
+    global _manifest
+    if _manifest is None:
+        if not MANIFEST.exists():       # atlases not built yet
+            return {**pokemon, "sprite": None}
+        with open(MANIFEST, "r", encoding="utf-8") as f:
+            _manifest = json.load(f)
+    placed = _manifest["images"].get(image_filename(pokemon["imageUrl"]))
+    if placed is None:
+        return {**pokemon, "sprite": None}
+    atlas = _manifest["atlases"][placed[0]]
+    x, y, w, h = placed[1:]
+    return {**pokemon, "sprite": {"atlas": atlas["png"], "webp": atlas["webp"],
+                                  "x": x, "y": y, "w": w, "h": h}}
+
+def main():
+    ap = argparse.ArgumentParser(description="Pack images/ into sprite atlases")
+    ap.add_argument("--pokemon-json", default=POKEMON_JSON)
+    ap.add_argument("--per-atlas", type=int, default=64,
+                    help="sprites per atlas (default 64 = 16 pages of 4 cards)")
+    ap.add_argument("--columns", type=int, default=8)
+    ap.add_argument("--webp", action="store_true", help="also write lossless WebP atlases")
+    args = ap.parse_args()
+    if Image is None:
+        print("Pillow is required: pip install Pillow")
+        sys.exit(1)
+
+    print("Building sprite atlases...")
+    manifest = build(args.pokemon_json, args.per_atlas, args.columns, args.webp)
+    print(f"Packed {len(manifest['images'])} images into {len(manifest['atlases'])} atlases")
+    print(f"Manifest saved to {MANIFEST}")
+    print("Run `python pipeline.py sprites` to record the offsets in the dataset")
+
+if __name__ == "__main__":
+    main()
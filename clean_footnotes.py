@@ -4,54 +4,47 @@ Clean footnote references from Pokemon name origin descriptions
 Removes patterns like [ 1 ], [ 2 ], [ 3 ] etc. from nameOriginDescription fields
 """
 
-import json
 import re
 
+import stream
+
+# [ 1 ], [ 2 ], [ 3 ] etc. with the whitespace around them
+FOOTNOTE = re.compile(r'\s*\[\s*\d+\s*\]\s*')
+SPACES = re.compile(r'\s+')
+
 def clean_footnotes(text):
     """Remove footnote references from text"""
-    # Remove patterns like [ 1 ], [ 2 ], [ 3 ] etc.
-    # This regex matches [ followed by spaces, digits, and spaces, then ]
-    cleaned = re.sub(r'\s*\[\s*\d+\s*\]\s*', ' ', text)
-    
-    # Clean up any double spaces that might result
-    cleaned = re.sub(r'\s+', ' ', cleaned)
-    
-    # Trim leading/trailing whitespace
-    cleaned = cleaned.strip()
-    
-    return cleaned
+    return SPACES.sub(' ', FOOTNOTE.sub(' ', text)).strip()
+
+def strip_footnotes_record(etymology):
+    """Stream stage: footnote references replaced by a space"""
+    if 'nameOriginDescription' not in etymology:
+        return etymology
+    return {**etymology,
+            'nameOriginDescription': FOOTNOTE.sub(' ', etymology['nameOriginDescription'])}
+
+def normalize_whitespace_record(record):
+    """Stream stage: runs of whitespace in string fields collapsed and trimmed"""
+    return {k: SPACES.sub(' ', v).strip() if isinstance(v, str) else v
+            for k, v in record.items()}
+
+def clean_origin_record(etymology):
+    """Return a copy of one name-origin entry with footnotes removed"""
+    if 'nameOriginDescription' not in etymology:
+        return etymology
+    return {**etymology,
+            'nameOriginDescription': clean_footnotes(etymology['nameOriginDescription'])}
+
+STAGES = [('footnotes', strip_footnotes_record), ('whitespace', normalize_whitespace_record)]
 
 def process_name_origins():
     """Process name origins data to remove footnote references"""
-    
-    # Load the original name origins data
-    with open('name_origins_0001_1025.json', 'r', encoding='utf-8') as f:
-        origins_data = json.load(f)
-    
-    cleaned_count = 0
-    
-    # Process each Pokemon's etymology data
-    for pokemon_id, etymology in origins_data.items():
-        if 'nameOriginDescription' in etymology:
-            original_desc = etymology['nameOriginDescription']
-            cleaned_desc = clean_footnotes(original_desc)
-            
-            # Only update if there was a change
-            if cleaned_desc != original_desc:
-                etymology['nameOriginDescription'] = cleaned_desc
-                cleaned_count += 1
-                print(f"Pokemon {pokemon_id}: Cleaned footnote references")
-                print(f"  Before: {original_desc[:100]}...")
-                print(f"  After:  {cleaned_desc[:100]}...")
-                print()
-    
-    # Save the cleaned data
-    with open('name_origins_0001_1025_cleaned.json', 'w', encoding='utf-8') as f:
-        json.dump(origins_data, f, ensure_ascii=False, indent=2)
-    
-    print(f"\nProcessed {len(origins_data)} Pokemon entries")
-    print(f"Cleaned footnote references from {cleaned_count} descriptions")
+    total, changed = stream.run('name_origins_0001_1025.json',
+                                'name_origins_0001_1025_cleaned.json', STAGES, indent=2)
+
+    print(f"Processed {total} Pokemon entries")
+    print(f"Cleaned footnote references from {changed['footnotes']} descriptions")
     print("Saved to name_origins_0001_1025_cleaned.json")
 
 if __name__ == '__main__':
-    process_name_origins() 
\ No newline at end of file
+    process_name_origins()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+cleanup.py - run any chain of cleanup stages in one streaming pass
+
+Stages come from the cleanup scripts and run record by record
+(stream.py), so chaining them costs one read and one write in total:
+
+    footnotes   strip [ 1 ]-style references (clean_footnotes.py)
+    whitespace  collapse whitespace in string fields (clean_footnotes.py)
+    types       drop invalid types (clean_types.py)
+    hiragana    add hiragana from kanaName (add_hiragana.py)
+
+Output ending in .ndjson/.jsonl is written as compact NDJSON, other
+output as compact JSON unless --indent is given.
+
+Usage:
+    python cleanup.py SRC DEST -s STAGE [-s STAGE ...] [--indent 2]
+    python cleanup.py pokemon_base_0001_1025_with_types.json all.ndjson -s types -s hiragana
+"""
+
+import argparse
+import time
+
+import stream
+from add_hiragana import add_hiragana_record
+from clean_footnotes import normalize_whitespace_record, strip_footnotes_record
+from clean_types import clean_record_types
+
+STAGES = {
+    "footnotes":  strip_footnotes_record,
+    "whitespace": normalize_whitespace_record,
+    "types":      clean_record_types,
+    "hiragana":   add_hiragana_record,
+}
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream JSON records through cleanup stages")
+    ap.add_argument("source", help=".json, .ndjson or .jsonl input")
+    ap.add_argument("dest", help="output; may be the same file as source")
+    ap.add_argument("-s", "--stage", action="append", required=True, choices=list(STAGES),
+                    help="stage to apply, in order (repeatable)")
+    ap.add_argument("--indent", type=int, help="pretty-print JSON output")
+    args = ap.parse_args()
+
+    started = time.perf_counter()
+    total, changed = stream.run(args.source, args.dest,
+                                [(name, STAGES[name]) for name in args.stage], args.indent)
+    print(f"Streamed {total} records to {args.dest} in {time.perf_counter() - started:.2f} s")
+    for name in args.stage:
+        print(f"  {name:10s} changed {changed[name]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+content_store.py - compressed, indexed page cache
+
+Replaces the loose files in cache/ with one SQLite database holding
+compressed bodies (zstd when the `zstandard` package is installed, gzip
+otherwise) plus URL, fetch time, size and sha256 for every entry.
+
+Keys keep the old file names (pokemon_bulbasaur.html, idx_<slug>.json, ...)
+so the legacy cache/ files migrate one-to-one; a key missing from the
+store but present as a legacy file is imported on first read.
+
+Usage:
+    python content_store.py stats
+    python content_store.py migrate [--delete]
+    python content_store.py evict [--max-mb 200] [--max-age-days 90]
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+import instrument
+
+try:
+    import zstandard
+except ImportError:                 # optional dependency
+    zstandard = None
+
+CACHE_DIR = pathlib.Path("cache")
+DB_NAME = "store.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    key      TEXT PRIMARY KEY,
+    url      TEXT,
+    fetched  REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size     INTEGER NOT NULL,
+    stored   INTEGER NOT NULL,
+    sha256   TEXT NOT NULL,
+    codec    TEXT NOT NULL,
+    body     BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_accessed ON blobs(accessed);
+CREATE INDEX IF NOT EXISTS blobs_fetched  ON blobs(fetched);
+"""
+
+def compress(raw: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(raw)
+    return "gzip", gzip.compress(raw, compresslevel=6)
+
+def decompress(codec: str, body: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("entry is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    if codec == "gzip":
+        return gzip.decompress(body)
+    return body
+
+class ContentStore:
+    """SQLite-indexed store of compressed page bodies, safe across threads."""
+
+    def __init__(self, cache_dir: pathlib.Path = CACHE_DIR, legacy_fallback: bool = True):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self.path = self.cache_dir / DB_NAME
+        self.legacy_fallback = legacy_fallback
+        self.local = threading.local()
+        self.conn().executescript(SCHEMA)
+
+    def conn(self) -> sqlite3.Connection:
+        """One connection per thread (and therefore per process)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():   # never reuse across fork
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    # ------------------ read / write ------------------
+    def get_bytes(self, key: str) -> bytes | None:
+        row = self.conn().execute(
+            "SELECT codec, body FROM blobs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raw = self._import_legacy(key)
+            instrument.cache(key, raw is not None)
+            return raw
+        instrument.cache(key, True)
+        self.conn().execute(
+            "UPDATE blobs SET accessed = ? WHERE key = ?", (time.time(), key))
+        return decompress(*row)
+
+    def get(self, key: str) -> str | None:
+        raw = self.get_bytes(key)
+        return raw.decode("utf-8") if raw is not None else None
+
+    def put_bytes(self, key: str, raw: bytes, url: str | None = None,
+                  fetched: float | None = None):
+        codec, body = compress(raw)
+        now = time.time()
+        self.conn().execute(
+            "INSERT OR REPLACE INTO blobs "
+            "(key, url, fetched, accessed, size, stored, sha256, codec, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, url, fetched or now, now, len(raw), len(body),
+             hashlib.sha256(raw).hexdigest(), codec, body))
+
+    def put(self, key: str, text: str, url: str | None = None):
+        self.put_bytes(key, text.encode("utf-8"), url)
+
+    def sha256(self, key: str) -> str | None:
+        """Hash of an entry's raw body, without reading the body."""
+        row = self.conn().execute(
+            "SELECT sha256 FROM blobs WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, key: str) -> bool:
+        return self.conn().execute(
+            "SELECT 1 FROM blobs WHERE key = ?", (key,)).fetchone() is not None
+
+    def delete(self, key: str):
+        self.conn().execute("DELETE FROM blobs WHERE key = ?", (key,))
+
+    # ------------------ legacy cache/ files -----------
+    def _import_legacy(self, key: str) -> bytes | None:
+        if not self.legacy_fallback:
+            return None
+        path = self.cache_dir / key
+        if not path.is_file():
+            return None
+        raw = path.read_bytes()
+        self.put_bytes(key, raw, fetched=path.stat().st_mtime)
+        return raw
+
+    def migrate(self, delete: bool = False) -> int:
+        """Import every loose file in cache/ into the store."""
+        count = 0
+        for path in sorted(self.cache_dir.iterdir()):
+            if not path.is_file() or path.name.startswith(DB_NAME):
+                continue
+            if path.name not in self:
+                self.put_bytes(path.name, path.read_bytes(), fetched=path.stat().st_mtime)
+                count += 1
+            if delete:
+                path.unlink()
+        return count
+
+    # ------------------ maintenance -------------------
+    def stats(self) -> dict:
+        n, size, stored = self.conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored), 0) FROM blobs"
+        ).fetchone()
+        return {"entries": n, "bytes": size, "stored_bytes": stored}
+
+    def evict(self, max_bytes: int | None = None, max_age: float | None = None) -> int:
+        """
+        Drop entries fetched more than max_age seconds ago, then drop the
+        least recently accessed entries until the compressed total fits in
+        max_bytes.  Returns the number of entries removed.
+        """
+        conn = self.conn()
+        removed = 0
+        if max_age is not None:
+            removed += conn.execute(
+                "DELETE FROM blobs WHERE fetched < ?", (time.time() - max_age,)).rowcount
+        if max_bytes is not None:
+            total = self.stats()["stored_bytes"]
+            victims = []
+            for key, stored in conn.execute("SELECT key, stored FROM blobs ORDER BY accessed"):
+                if total <= max_bytes:
+                    break
+                victims.append((key,))
+                total -= stored
+            conn.executemany("DELETE FROM blobs WHERE key = ?", victims)
+            removed += len(victims)
+        if removed:
+            conn.execute("VACUUM")
+        return removed
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_store() -> ContentStore:
+    """Shared store rooted at ./cache, created on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ContentStore()
+        return _default
+
+def main():
+    ap = argparse.ArgumentParser(description="Manage the compressed page cache")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    mig = sub.add_parser("migrate", help="import legacy cache/ files")
+    mig.add_argument("--delete", action="store_true", help="remove files after import")
+    ev = sub.add_parser("evict")
+    ev.add_argument("--max-mb", type=float, default=None)
+    ev.add_argument("--max-age-days", type=float, default=None)
+    args = ap.parse_args()
+
+    store = default_store()
+    if args.cmd == "migrate":
+        print(f"Imported {store.migrate(delete=args.delete)} files into {store.path}")
+    elif args.cmd == "evict":
+        removed = store.evict(
+            max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None,
+            max_age=args.max_age_days * 86400 if args.max_age_days is not None else None)
+        print(f"Evicted {removed} entries")
+    s = store.stats()
+    print(f"{s['entries']} entries, {s['bytes'] / 1e6:.1f} MB raw, "
+          f"{s['stored_bytes'] / 1e6:.1f} MB stored")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+dataset_store.py - single canonical store for the Pokémon dataset
+
+Instead of five near-identical JSON snapshots, every stage keeps only the
+fields it adds or changes, one row per ndex, in dataset.sqlite:
+
+    layer        fields stored
+    base         ndex, english, kanaName, ... (scraped master list)
+    hiragana     hiragana
+    types        types
+    clean_types  types (only where cleaning changed them)
+    tcg_types    tcg_type
+    images       imageUrl (local path)
+    sprites      sprite (atlas file and offsets, see build_sprites.py)
+    origins      nameOriginDescription, nameOriginElements
+    footnotes    nameOriginDescription (footnotes stripped)
+    furigana     nameOriginRuby (ruby markup per element, see furigana.py)
+
+A view is a chain of layers merged left to right; a record is part of a
+view only if every layer in the chain has a row for it.  The legacy JSON
+files are exports of views and can be regenerated at any time.
+
+Usage:
+    python dataset_store.py import            # load the legacy JSON files
+    python dataset_store.py export [FILE ...] # regenerate legacy JSON files
+    python dataset_store.py get 25 [--view tcg_types]
+"""
+
+import argparse
+import json
+import pathlib
+import sqlite3
+
+DB_PATH = pathlib.Path("dataset.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fields (
+    layer TEXT    NOT NULL,
+    ndex  INTEGER NOT NULL,
+    data  TEXT    NOT NULL,         -- JSON object of the fields this layer sets
+    PRIMARY KEY (layer, ndex)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fingerprints (
+    layer TEXT    NOT NULL,
+    ndex  INTEGER NOT NULL,
+    fp    TEXT    NOT NULL,         -- fingerprint of the input record
+    PRIMARY KEY (layer, ndex)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stage_code (
+    layer TEXT PRIMARY KEY,
+    code  TEXT NOT NULL             -- fingerprint of the stage's code
+);
+"""
+
+# layer chains; later layers override fields of earlier ones
+VIEWS = {
+    "base":        ["base"],
+    "hiragana":    ["base", "hiragana"],
+    "types":       ["base", "types"],
+    "clean_types": ["base", "types", "clean_types"],
+    "tcg_types":   ["base", "types", "clean_types", "tcg_types"],
+    "images":      ["base", "images"],
+    "sprites":     ["base", "images", "sprites"],
+    "origins":     ["origins"],
+    "footnotes":   ["origins", "footnotes"],
+    "furigana":    ["origins", "footnotes", "furigana"],
+}
+# exported as {"<ndex>": {...}} rather than a list of records
+KEYED_VIEWS = {"origins", "footnotes", "furigana"}
+
+LEGACY_FILES = {
+    "pokemon_base_0001_1025.json":                   "base",
+    "pokemon_base_0001_1025_with_hiragana.json":     "hiragana",
+    "pokemon_base_0001_1025_with_types.json":        "clean_types",
+    "pokemon_base_0001_1025_with_tcg_types.json":    "tcg_types",
+    "pokemon_base_0001_1025_with_local_images.json": "images",
+    "name_origins_0001_1025.json":                   "origins",
+    "name_origins_0001_1025_cleaned.json":           "footnotes",
+    "name_origins_0001_1025_furigana.json":          "furigana",
+}
+VIEW_FILES = {view: name for name, view in LEGACY_FILES.items()}
+
+_MISSING = object()
+
+def delta(parent: dict, record: dict) -> dict:
+    """Fields of record that are new or different from parent."""
+    return {k: v for k, v in record.items() if parent.get(k, _MISSING) != v}
+
+class DatasetStore:
+    """Layered per-ndex records in one SQLite file."""
+
+    def __init__(self, path: pathlib.Path = DB_PATH):
+        self.path = pathlib.Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ------------------ layers ----------------------
+    def layer(self, layer: str) -> dict[int, dict]:
+        rows = self.conn.execute(
+            "SELECT ndex, data FROM fields WHERE layer = ? ORDER BY ndex", (layer,))
+        return {ndex: json.loads(data) for ndex, data in rows}
+
+    def ndexes(self, layer: str) -> set[int]:
+        rows = self.conn.execute("SELECT ndex FROM fields WHERE layer = ?", (layer,))
+        return {n for n, in rows}
+
+    def put_rows(self, layer: str, rows: dict[int, dict]):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fields (layer, ndex, data) VALUES (?, ?, ?)",
+                [(layer, int(n), json.dumps(d, ensure_ascii=False)) for n, d in rows.items()])
+
+    def delete_rows(self, layer: str, ndexes):
+        with self.conn:
+            self.conn.executemany("DELETE FROM fields WHERE layer = ? AND ndex = ?",
+                                  [(layer, int(n)) for n in ndexes])
+
+    def clear_layer(self, layer: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM fields WHERE layer = ?", (layer,))
+            self.conn.execute("DELETE FROM fingerprints WHERE layer = ?", (layer,))
+            self.conn.execute("DELETE FROM stage_code WHERE layer = ?", (layer,))
+
+    # ------------------ views -----------------------
+    def view(self, name: str) -> list[tuple[int, dict]]:
+        """All records of a view as (ndex, record) in ndex order."""
+        merged = None
+        for layer in VIEWS[name]:
+            rows = self.layer(layer)
+            if merged is None:
+                merged = rows
+            else:
+                merged = {n: {**rec, **rows[n]} for n, rec in merged.items() if n in rows}
+        return list(merged.items())
+
+    def get(self, ndex: int, name: str = "tcg_types") -> dict | None:
+        """One merged record by ndex: a primary-key lookup per layer."""
+        record = {}
+        for layer in VIEWS[name]:
+            row = self.conn.execute(
+                "SELECT data FROM fields WHERE layer = ? AND ndex = ?", (layer, ndex)).fetchone()
+            if row is None:
+                return None
+            record.update(json.loads(row[0]))
+        return record
+
+    # ------------------ pipeline bookkeeping --------
+    def fingerprints(self, layer: str) -> dict[int, str]:
+        rows = self.conn.execute("SELECT ndex, fp FROM fingerprints WHERE layer = ?", (layer,))
+        return dict(rows)
+
+    def set_fingerprints(self, layer: str, fps: dict[int, str], code: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM fingerprints WHERE layer = ?", (layer,))
+            self.conn.executemany("INSERT INTO fingerprints (layer, ndex, fp) VALUES (?, ?, ?)",
+                                  [(layer, int(n), fp) for n, fp in fps.items()])
+            self.conn.execute("INSERT OR REPLACE INTO stage_code (layer, code) VALUES (?, ?)",
+                              (layer, code))
+
+    def stage_code(self, layer: str) -> str | None:
+        row = self.conn.execute("SELECT code FROM stage_code WHERE layer = ?", (layer,)).fetchone()
+        return row[0] if row else None
+
+    # ------------------ legacy JSON -----------------
+    def export(self, name: str, path=None):
+        """Write a view in its legacy JSON shape."""
+        records = self.view(name)
+        data = ({str(n): r for n, r in records} if name in KEYED_VIEWS
+                else [r for _, r in records])
+        with open(path or VIEW_FILES[name], "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def import_view(self, name: str, data):
+        """Store a legacy file's records as the delta over its parent view."""
+        items = ([(int(k), v) for k, v in data.items()] if isinstance(data, dict)
+                 else [(r["ndex"], r) for r in data])
+        chain = VIEWS[name]
+        layer = chain[-1]
+        if name == "clean_types":
+            # the uncleaned types were never saved; treat the file as the types
+            # layer with nothing left for clean_types to change
+            self.clear_layer("types")
+            self.put_rows("types", {n: {"types": r.get("types", [])} for n, r in items})
+        parents = {}
+        if len(chain) > 1:
+            parent_view = next(v for v, c in VIEWS.items() if c == chain[:-1])
+            parents = dict(self.view(parent_view))
+        self.clear_layer(layer)
+        self.put_rows(layer, {n: delta(parents.get(n, {}), r) for n, r in items})
+
+    def import_legacy(self, directory: pathlib.Path = pathlib.Path(".")):
+        for name, view in LEGACY_FILES.items():
+            path = pathlib.Path(directory) / name
+            if path.exists():
+                with open(path, "r", encoding="utf-8") as f:
+                    self.import_view(view, json.load(f))
+                print(f"Imported {name} -> {view}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Canonical Pokémon dataset store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("import", help="load the legacy JSON files")
+    ex = sub.add_parser("export", help="regenerate legacy JSON files")
+    ex.add_argument("files", nargs="*", help="default: all legacy files")
+    g = sub.add_parser("get", help="print one record")
+    g.add_argument("ndex", type=int)
+    g.add_argument("--view", default="tcg_types", choices=list(VIEWS))
+    args = ap.parse_args()
+
+    store = DatasetStore()
+    if args.cmd == "import":
+        store.import_legacy()
+    elif args.cmd == "export":
+        for name in args.files or list(LEGACY_FILES):
+            store.export(LEGACY_FILES[name])
+            print(f"Exported {name}")
+    else:
+        print(json.dumps(store.get(args.ndex, args.view), ensure_ascii=False, indent=2))
+    store.close()
+
+if __name__ == "__main__":
+    main()
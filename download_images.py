@@ -4,93 +4,202 @@ download_images.py - Download Pokémon images and update JSON
 
 Downloads images from imageUrl fields in pokemon_base JSON files
 and updates the imageUrl to point to local files.
+
+Downloads run on a bounded thread pool and stream to a .part file that is
+renamed into place when complete.  Finished files are recorded in
+images/.download_journal.jsonl (url, size, sha256); files already present
+with a matching size (and hash, with --verify) are skipped, so an
+interrupted run resumes where it stopped and a rerun does no network work.
+
+Usage:
+    python download_images.py pokemon_base_0001_1025.json [--workers 8] [--verify]
 """
 
+import argparse
+import hashlib
 import json
-import requests
+import os
 import pathlib
-import time
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
-def download_image(url: str, local_path: pathlib.Path) -> bool:
-    """Download an image from URL to local path."""
+import http_client
+import instrument
+
+IMAGES_DIR = pathlib.Path("images")
+JOURNAL_NAME = ".download_journal.jsonl"
+CHUNK = 64 * 1024
+HEADERS = {
+    "User-Agent": "PokemonFlashcardsBot/0.3 (contact@example.com)"
+}
+
+def file_sha256(path: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class Journal:
+    """Append-only record of completed downloads, keyed by file name."""
+
+    def __init__(self, images_dir: pathlib.Path = IMAGES_DIR):
+        self.path = images_dir / JOURNAL_NAME
+        self.lock = threading.Lock()
+        self.entries = {}
+        if self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:     # torn last line after a crash
+                    continue
+                self.entries[entry["file"]] = entry
+
+    def is_complete(self, url: str, local_path: pathlib.Path, verify: bool = False) -> bool:
+        """True if local_path already holds this image."""
+        try:
+            size = local_path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size == 0:                   # failed or truncated: never counts, never adopted
+            return False
+        entry = self.entries.get(local_path.name)
+        if entry is None:
+            # present from an earlier (pre-journal) run: adopt it
+            self.record(url, local_path, size, file_sha256(local_path))
+            return True
+        if entry["size"] != size:
+            return False
+        return not verify or entry["sha256"] == file_sha256(local_path)
+
+    def record(self, url: str, local_path: pathlib.Path, size: int, sha256: str):
+        entry = {"file": local_path.name, "url": url, "size": size, "sha256": sha256}
+        with self.lock:
+            self.entries[entry["file"]] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+def download_image(url: str, local_path: pathlib.Path, journal: Journal | None = None) -> bool:
+    """Stream an image from URL to local path via a temp file and atomic rename."""
+    tmp = local_path.with_name(local_path.name + ".part")
     try:
-        headers = {
-            "User-Agent": "PokemonFlashcardsBot/0.3 (contact@example.com)"
-        }
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        local_path.write_bytes(response.content)
+        response = http_client.get(url, headers=HEADERS, timeout=(5, 30), stream=True)
+        h, size = hashlib.sha256(), 0
+        with response, open(tmp, "wb") as f:
+            for chunk in response.iter_content(CHUNK):
+                f.write(chunk)
+                h.update(chunk)
+                size += len(chunk)
+        os.replace(tmp, local_path)
+        if journal is not None:
+            journal.record(url, local_path, size, h.hexdigest())
         return True
     except Exception as e:
         print(f"Failed to download {url}: {e}")
+        tmp.unlink(missing_ok=True)
         return False
 
-def process_json_file(json_file: str):
+def image_filename(image_url: str) -> str:
+    """Local file name for an image URL."""
+    return pathlib.Path(urlparse(image_url).path).name
+
+def fetch_image(image_url: str, journal: Journal, verify: bool = False) -> tuple[str, bool]:
+    """Ensure one image is in images/; returns (local file name, downloaded?)."""
+    filename = image_filename(image_url)
+    local_path = IMAGES_DIR / filename
+    if journal.is_complete(image_url, local_path, verify):
+        return filename, False
+    if not download_image(image_url, local_path, journal):
+        raise RuntimeError(f"download failed: {image_url}")
+    return filename, True
+
+_journal = None
+
+def localize_image_record(pokemon: dict) -> dict:
+    """Download one Pokémon's image and return a copy pointing at images/."""
+    global _journal
+    image_url = pokemon["imageUrl"]
+    if not image_url.startswith(("http://", "https://")):
+        return pokemon
+    IMAGES_DIR.mkdir(exist_ok=True)
+    _journal = _journal or Journal()
+    try:
+        filename, _ = fetch_image(image_url, _journal)
+    except RuntimeError:
+        return pokemon
+    return {**pokemon, "imageUrl": f"images/{filename}"}
+
+def process_json_file(json_file: str, workers: int = 8, verify: bool = False):
     """Process a JSON file, download images, and update imageUrl fields."""
-    
+
     # Create images directory
-    images_dir = pathlib.Path("images")
-    images_dir.mkdir(exist_ok=True)
-    
+    IMAGES_DIR.mkdir(exist_ok=True)
+    journal = Journal()
+
     # Read the JSON file
     with open(json_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
-    
+
     print(f"Processing {len(data)} Pokémon...")
-    
+
+    def job(pokemon):
+        with instrument.span("record", "image", ident=pokemon["ndex"]):
+            return fetch_image(pokemon["imageUrl"], journal, verify)
+
     success_count = 0
+    skipped_count = 0
     failed_count = 0
-    
-    for pokemon in data:
-        ndex = pokemon["ndex"]
-        english_name = pokemon["english"]
-        image_url = pokemon["imageUrl"]
-        
-        # Extract filename from URL
-        parsed_url = urlparse(image_url)
-        filename = pathlib.Path(parsed_url.path).name
-        
-        # Create local path
-        local_path = images_dir / filename
-        
-        print(f"Downloading {ndex:04d} {english_name}...")
-        
-        # Download the image
-        if download_image(image_url, local_path):
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(job, pokemon) for pokemon in data]
+        for pokemon, future in zip(data, futures):
+            try:
+                filename, downloaded = future.result()
+            except RuntimeError:
+                failed_count += 1
+                continue
             # Update the imageUrl to point to local file
             pokemon["imageUrl"] = f"images/{filename}"
-            success_count += 1
-        else:
-            failed_count += 1
-        
-        # Small delay to be respectful to the server
-        time.sleep(0.1)
-    
+            if downloaded:
+                print(f"Downloaded {pokemon['ndex']:04d} {pokemon['english']}")
+                success_count += 1
+            else:
+                skipped_count += 1
+
     # Save the updated JSON
     output_file = json_file.replace('.json', '_with_local_images.json')
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with instrument.span("write", "json"), open(output_file, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
-    
+
     print(f"\nDownload complete!")
     print(f"Successfully downloaded: {success_count}")
+    print(f"Already present: {skipped_count}")
     print(f"Failed downloads: {failed_count}")
     print(f"Updated JSON saved to: {output_file}")
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python download_images.py <json_file>")
-        print("Example: python download_images.py pokemon_base_0001_1025.json")
-        sys.exit(1)
-    
-    json_file = sys.argv[1]
-    if not pathlib.Path(json_file).exists():
-        print(f"Error: File {json_file} not found")
+    parser = argparse.ArgumentParser(
+        description="Download Pokémon images and point imageUrl at images/",
+        epilog="Example: python download_images.py pokemon_base_0001_1025.json")
+    parser.add_argument("json_file")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="concurrent downloads (per-host caps still apply)")
+    parser.add_argument("--verify", action="store_true",
+                        help="also compare sha256 of files already present")
+    parser.add_argument("--base-url", help="send requests here instead (replay_server.py)")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    if args.base_url:
+        http_client.set_base_url(args.base_url)
+
+    if not pathlib.Path(args.json_file).exists():
+        print(f"Error: File {args.json_file} not found")
         sys.exit(1)
-    
-    process_json_file(json_file)
+
+    with instrument.session("download_images", args):
+        process_json_file(args.json_file, args.workers, args.verify)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -4,11 +4,12 @@ Download type icons and update types_info.json with local paths
 """
 
 import json
-import requests
 import pathlib
 import os
 from urllib.parse import urlparse
 
+import http_client
+
 def download_type_icons():
     """Download type icons and update types_info.json"""
     
@@ -35,10 +36,9 @@ def download_type_icons():
             # Download the icon
             try:
                 print(f"Downloading {type_name} icon: {filename}")
-                response = requests.get(icon_url, headers={
+                response = http_client.get(icon_url, headers={
                     'User-Agent': 'PokemonTypeIconDownloader/1.0'
                 })
-                response.raise_for_status()
                 
                 # Save the icon
                 with open(local_path, 'wb') as f:
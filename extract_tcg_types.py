@@ -4,14 +4,18 @@ Extract TCG types and Pokémon TCG type information from Bulbapedia
 Scrapes the TCG type page for type information and individual Pokémon TCG pages for their types
 """
 
+import argparse
 import json
-import requests
 import re
-import time
 import pathlib
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 
+import http_client
+import instrument
+import parallel
+from content_store import default_store
+
 # Constants
 BASE_URL = "https://bulbapedia.bulbagarden.net"
 HEADERS = {
@@ -19,25 +23,24 @@ HEADERS = {
 }
 
 def get_page_content(url, cache_name=None):
-    """Get page content with caching"""
-    cache_dir = pathlib.Path("cache")
-    cache_dir.mkdir(exist_ok=True)
+    """Get page content, reading through the shared content store"""
+    store = default_store()
     
     if cache_name:
-        cache_file = cache_dir / f"{cache_name}.html"
-        if cache_file.exists():
+        html = store.get(f"{cache_name}.html")
+        if html is not None:
             print(f"Using cached {cache_name}")
-            return cache_file.read_text(encoding='utf-8')
+            return html
     
     print(f"Downloading {url}")
-    response = requests.get(url, headers=HEADERS)
-    response.raise_for_status()
+    response = http_client.get(url, headers=HEADERS)
     
     if cache_name:
-        cache_file.write_text(response.text, encoding='utf-8')
+        store.put(f"{cache_name}.html", response.text, url=url)
     
     return response.text
 
+@instrument.timed("parse")
 def extract_tcg_types_from_page(html_content):
     """Extract TCG types and their colors from the TCG type page"""
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -85,6 +88,7 @@ def extract_tcg_types_from_page(html_content):
     
     return tcg_types
 
+@instrument.timed("parse")
 def extract_pokemon_tcg_type_from_page(html_content, pokemon_name):
     """Extract TCG type from a Pokémon's TCG page"""
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -120,7 +124,27 @@ def extract_pokemon_tcg_type_from_page(html_content, pokemon_name):
     
     return tcg_type
 
-def main():
+def tcg_page_url(pokemon):
+    return f"{BASE_URL}/wiki/{pokemon['english']}_(TCG)"
+
+def tcg_cache_name(pokemon):
+    return f"tcg_{pokemon['english'].lower()}"
+
+def pokemon_tcg_type_job(pokemon):
+    """TCG type for one Pokémon; module-level so process-pool workers can run it"""
+    tcg_html = get_page_content(tcg_page_url(pokemon), tcg_cache_name(pokemon))
+    return extract_pokemon_tcg_type_from_page(tcg_html, pokemon['english'])
+
+def add_tcg_type_record(pokemon):
+    """Return a copy of one Pokémon record with its TCG type"""
+    try:
+        tcg_type = pokemon_tcg_type_job(pokemon)
+    except Exception as e:
+        print(f"Error processing {pokemon['english']}: {e}")
+        tcg_type = None
+    return {**pokemon, 'tcg_type': tcg_type}
+
+def main(jobs=1):
     """Main function to extract TCG types and Pokémon TCG types"""
     
     print("Extracting TCG types and colors...")
@@ -134,7 +158,8 @@ def main():
     
     if tcg_types:
         # Save TCG types info
-        with open('tcg_types_info.json', 'w', encoding='utf-8') as f:
+        with instrument.span("write", "tcg_types_info.json"), \
+             open('tcg_types_info.json', 'w', encoding='utf-8') as f:
             json.dump(tcg_types, f, indent=2, ensure_ascii=False)
         
         print(f"Saved {len(tcg_types)} TCG types to tcg_types_info.json")
@@ -153,46 +178,56 @@ def main():
     # Process each Pokémon
     pokemon_with_tcg_types = []
     
+    if jobs > 1:
+        # Fetch missing pages here so the workers only parse cached HTML
+        store = default_store()
+        for pokemon in pokemon_data:
+            if f"{tcg_cache_name(pokemon)}.html" not in store:
+                try:
+                    get_page_content(tcg_page_url(pokemon), tcg_cache_name(pokemon))
+                except Exception as e:
+                    print(f"Error fetching {pokemon['english']}: {e}")
+        results = parallel.map_ordered(pokemon_tcg_type_job, pokemon_data, jobs, label="TCG types",
+                                       key=lambda p: p["ndex"])
+    else:
+        results = []
+        for pokemon in pokemon_data:
+            try:
+                with instrument.span("record", "TCG types", ident=pokemon['ndex']):
+                    results.append((pokemon_tcg_type_job(pokemon), None))
+            except Exception as e:
+                results.append((None, str(e)))
+    
     # Process all Pokémon
-    for pokemon in pokemon_data:
-        pokemon_name = pokemon['english'].lower()
+    for pokemon, (tcg_type, error) in zip(pokemon_data, results):
+        if error:
+            print(f"Error processing {pokemon['english']}: {error}")
+        elif tcg_type:
+            print(f"{pokemon['english']}: {tcg_type}")
+        else:
+            print(f"{pokemon['english']}: No TCG type found")
         
-        # Construct TCG page URL
-        tcg_page_url = f"{BASE_URL}/wiki/{pokemon['english']}_(TCG)"
-        
-        # Get TCG page
-        cache_name = f"tcg_{pokemon_name}"
-        try:
-            tcg_html = get_page_content(tcg_page_url, cache_name)
-            tcg_type = extract_pokemon_tcg_type_from_page(tcg_html, pokemon['english'])
-            
-            # Add TCG type to Pokémon data
-            pokemon_with_tcg_types.append({
-                **pokemon,
-                'tcg_type': tcg_type
-            })
-            
-            if tcg_type:
-                print(f"{pokemon['english']}: {tcg_type}")
-            else:
-                print(f"{pokemon['english']}: No TCG type found")
-            
-            # Small delay to be respectful
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"Error processing {pokemon['english']}: {e}")
-            # Add Pokémon without TCG type
-            pokemon_with_tcg_types.append({
-                **pokemon,
-                'tcg_type': None
-            })
+        # Add TCG type to Pokémon data (None if it failed)
+        pokemon_with_tcg_types.append({
+            **pokemon,
+            'tcg_type': tcg_type
+        })
     
     # Save Pokémon data with TCG types
-    with open('pokemon_base_0001_1025_with_tcg_types.json', 'w', encoding='utf-8') as f:
+    with instrument.span("write", "pokemon_base_0001_1025_with_tcg_types.json"), \
+         open('pokemon_base_0001_1025_with_tcg_types.json', 'w', encoding='utf-8') as f:
         json.dump(pokemon_with_tcg_types, f, indent=2, ensure_ascii=False)
     
     print(f"\nSaved Pokémon data with TCG types for {len(pokemon_with_tcg_types)} Pokémon")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='parse pages in N worker processes (0 = all cores)')
+    parser.add_argument('--base-url', help='send requests here instead (replay_server.py)')
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    if args.base_url:
+        http_client.set_base_url(args.base_url)
+    with instrument.session("extract_tcg_types", args):
+        main(args.jobs if args.jobs > 0 else parallel.default_jobs()) 
\ No newline at end of file
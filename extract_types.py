@@ -4,14 +4,18 @@ Extract Pokémon types and type information from Bulbapedia
 Scrapes individual Pokémon pages for their types and the main type page for type details
 """
 
+import argparse
 import json
-import requests
 import re
-import time
 import pathlib
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 
+import http_client
+import instrument
+import parallel
+from content_store import default_store
+
 # Constants
 BASE_URL = "https://bulbapedia.bulbagarden.net"
 HEADERS = {
@@ -19,25 +23,24 @@ HEADERS = {
 }
 
 def get_page_content(url, cache_name=None):
-    """Get page content with caching"""
-    cache_dir = pathlib.Path("cache")
-    cache_dir.mkdir(exist_ok=True)
+    """Get page content, reading through the shared content store"""
+    store = default_store()
     
     if cache_name:
-        cache_file = cache_dir / f"{cache_name}.html"
-        if cache_file.exists():
+        html = store.get(f"{cache_name}.html")
+        if html is not None:
             print(f"Using cached {cache_name}")
-            return cache_file.read_text(encoding='utf-8')
+            return html
     
     print(f"Downloading {url}")
-    response = requests.get(url, headers=HEADERS)
-    response.raise_for_status()
+    response = http_client.get(url, headers=HEADERS)
     
     if cache_name:
-        cache_file.write_text(response.text, encoding='utf-8')
+        store.put(f"{cache_name}.html", response.text, url=url)
     
     return response.text
 
+@instrument.timed("parse")
 def extract_type_info_from_types_page(html_content):
     """Extract type information from the main types page"""
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -94,6 +97,7 @@ def extract_type_info_from_types_page(html_content):
     print(f"Found {len(types_info)} types from types page")
     return types_info
 
+@instrument.timed("parse")
 def extract_pokemon_types_from_page(html_content, pokemon_name):
     """Extract Pokémon types from the infobox Type section"""
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -138,7 +142,26 @@ def extract_pokemon_types_from_page(html_content, pokemon_name):
     
     return types
 
-def main():
+def pokemon_cache_name(pokemon):
+    return f"pokemon_{pokemon['english'].lower()}"
+
+def pokemon_types_job(pokemon):
+    """Types for one Pokémon; module-level so process-pool workers can run it"""
+    pokemon_html = get_page_content(pokemon['link'], pokemon_cache_name(pokemon))
+    return extract_pokemon_types_from_page(pokemon_html, pokemon['english'])
+
+def add_types_record(pokemon):
+    """Return a copy of one Pokémon record with its types (None = no page link)"""
+    if not pokemon.get('link', ''):
+        return None
+    try:
+        pokemon_types = pokemon_types_job(pokemon)
+    except Exception as e:
+        print(f"Error processing {pokemon['english']}: {e}")
+        pokemon_types = []
+    return {**pokemon, 'types': pokemon_types}
+
+def main(jobs=1):
     """Main function to extract types and Pokémon type information"""
     
     # Load existing Pokémon data
@@ -153,7 +176,8 @@ def main():
     types_info = extract_type_info_from_types_page(types_html)
     
     # Save type information
-    with open('types_info.json', 'w', encoding='utf-8') as f:
+    with instrument.span("write", "types_info.json"), \
+         open('types_info.json', 'w', encoding='utf-8') as f:
         json.dump(types_info, f, indent=2, ensure_ascii=False)
     
     print(f"Saved type information for {len(types_info)} types")
@@ -163,39 +187,46 @@ def main():
     # Process each Pokémon
     pokemon_with_types = []
     
+    with_url = []
     for pokemon in pokemon_data:
-        pokemon_name = pokemon['english'].lower()
-        pokemon_url = pokemon.get('link', '')
-        
-        if not pokemon_url:
+        if not pokemon.get('link', ''):
             print(f"No URL found for {pokemon['english']}")
             continue
-        
-        # Get Pokémon page
-        cache_name = f"pokemon_{pokemon_name}"
-        try:
-            pokemon_html = get_page_content(pokemon_url, cache_name)
-            pokemon_types = extract_pokemon_types_from_page(pokemon_html, pokemon['english'])
-            
-            # Add types to Pokémon data
-            pokemon_with_types.append({
-                **pokemon,
-                'types': pokemon_types
-            })
-            
-            # Small delay to be respectful
-            time.sleep(0.1)
-            
-        except Exception as e:
-            print(f"Error processing {pokemon['english']}: {e}")
-            # Add Pokémon without types
-            pokemon_with_types.append({
-                **pokemon,
-                'types': []
-            })
+        with_url.append(pokemon)
+    
+    if jobs > 1:
+        # Fetch missing pages here so the workers only parse cached HTML
+        store = default_store()
+        for pokemon in with_url:
+            cache_name = pokemon_cache_name(pokemon)
+            if f"{cache_name}.html" not in store:
+                try:
+                    get_page_content(pokemon['link'], cache_name)
+                except Exception as e:
+                    print(f"Error fetching {pokemon['english']}: {e}")
+        results = parallel.map_ordered(pokemon_types_job, with_url, jobs, label="Pokémon types",
+                                       key=lambda p: p["ndex"])
+    else:
+        results = []
+        for pokemon in with_url:
+            try:
+                with instrument.span("record", "Pokémon types", ident=pokemon['ndex']):
+                    results.append((pokemon_types_job(pokemon), None))
+            except Exception as e:
+                results.append((None, str(e)))
+    
+    for pokemon, (pokemon_types, error) in zip(with_url, results):
+        if error:
+            print(f"Error processing {pokemon['english']}: {error}")
+        # Pokémon that failed are kept without types
+        pokemon_with_types.append({
+            **pokemon,
+            'types': pokemon_types or []
+        })
     
     # Save Pokémon data with types
-    with open('pokemon_base_0001_1025_with_types.json', 'w', encoding='utf-8') as f:
+    with instrument.span("write", "pokemon_base_0001_1025_with_types.json"), \
+         open('pokemon_base_0001_1025_with_types.json', 'w', encoding='utf-8') as f:
         json.dump(pokemon_with_types, f, indent=2, ensure_ascii=False)
     
     print(f"\nSaved Pokémon data with types for {len(pokemon_with_types)} Pokémon")
@@ -211,4 +242,13 @@ def main():
         print(f"  {pokemon_type}: {count} Pokémon")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='parse pages in N worker processes (0 = all cores)')
+    parser.add_argument('--base-url', help='send requests here instead (replay_server.py)')
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    if args.base_url:
+        http_client.set_base_url(args.base_url)
+    with instrument.session("extract_types", args):
+        main(args.jobs if args.jobs > 0 else parallel.default_jobs()) 
\ No newline at end of file
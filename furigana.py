@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+furigana.py - ruby readings for the kanji in name-origin elements
+
+The descriptions already spell out what each element means, in the form
+"<Japanese> <romaji> (<gloss>)":
+
+    不思議 fushigi (strange; mysterious) and 種 tane (seed)
+
+Every such triple with kanji in it becomes a dictionary entry (with a
+short table of extras for words the glosses use, like 英語): the romaji
+goes through kana.from_romaji(), and words with kana in them are aligned
+so that only the kanji get a reading (穿つ炎 ugatsu homura -> 穿[うが]つ
+炎[ほむら]).  Entries go into a character trie, and each
+nameOriginElements entry is annotated by longest match:
+
+    不思議 -> <ruby>不思議<rt>ふしぎ</rt></ruby>
+
+A kanji run only gets readings if one word covers all of it or it splits
+into known compounds; a lone kanji's reading inside a longer run is
+usually wrong (幸運 is not 幸[さち]運), so such runs stay plain.
+
+The pipeline stage adds "nameOriginRuby", one markup string per element
+(HTML-escaped, plain text where nothing matched), with the dictionary
+built from the store's footnotes view; the stage fingerprint includes the
+dictionary's contents, so records are redone only when a reading changes.
+name_origins_0001_1025_furigana.json is the exported view the front end
+reads.
+
+Usage:
+    python furigana.py build        # write name_origins_0001_1025_furigana.json
+    python furigana.py stats        # dictionary size and kanji coverage
+    python furigana.py show 1       # one record's elements with readings
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import re
+from collections import Counter, defaultdict
+
+import kana
+import stream
+
+ORIGINS_JSON = "name_origins_0001_1025_cleaned.json"
+FURIGANA_JSON = "name_origins_0001_1025_furigana.json"
+
+KANJI = re.compile(r"[々〆㐀-䶿一-鿿]+")
+# <Japanese> <romaji> (<gloss>)
+TRIPLE = re.compile(r"([々〆぀-ヿ㐀-䶿一-鿿～]+)\s+"
+                    r"([A-Za-zāīūēōâîûêôĀĪŪĒŌ'’ -]+?)\s*\(([^()]*)\)")
+
+# Words the descriptions never spell out: the kanji script.js used to carry
+# for speech, and the labels the element glosses use (英語: ...).
+# Readings from the descriptions take precedence.
+EXTRA_READINGS = {
+    "火": "ひ", "水": "みず", "土": "つち", "木": "き", "金": "きん", "石": "いし",
+    "草": "くさ", "花": "はな", "葉": "は", "根": "ね", "種": "たね", "実": "み",
+    "森": "もり", "林": "はやし", "山": "やま", "川": "かわ", "海": "うみ", "空": "そら",
+    "風": "かぜ", "雷": "かみなり", "雪": "ゆき", "氷": "こおり", "炎": "ほのお",
+    "光": "ひかり", "影": "かげ", "音": "おと", "声": "こえ", "目": "め", "口": "くち",
+    "手": "て", "足": "あし", "心": "こころ", "力": "ちから", "技": "わざ", "道": "みち",
+    "話": "はなし", "英語": "えいご", "英": "えい", "語": "ご", "国語": "こくご",
+    "中国語": "ちゅうごくご", "日本語": "にほんご", "名前": "なまえ", "学名": "がくめい",
+    "接辞": "せつじ", "擬音語": "ぎおんご", "擬態語": "ぎたいご", "鳴き声": "なきごえ",
+    "鳴く": "なく", "意味": "いみ", "由来": "ゆらい", "登場": "とうじょう",
+}
+
+# ------------------ dictionary ------------------
+def extract(description: str) -> list[tuple[str, str, str]]:
+    """(Japanese, romaji, gloss) triples whose Japanese part has kanji."""
+    triples = []
+    for word, romaji, gloss in TRIPLE.findall(description):
+        if KANJI.search(word):
+            romaji = romaji.split(" or ")[0].replace("’", "'")  # "kanoshishi or shishi"
+            triples.append((word, romaji.strip(), gloss.strip()))
+    return triples
+
+def align(word: str, reading: str) -> tuple | None:
+    """
+    Split word into (text, reading) segments, kanji runs getting their
+    share of the reading and kana getting None; None if they don't line up.
+    """
+    parts = [p for p in re.split(f"({KANJI.pattern})", word) if p]
+    pattern = "".join("(.+?)" if KANJI.fullmatch(p) else re.escape(kana.to_hiragana(p))
+                      for p in parts)
+    m = re.fullmatch(pattern, reading)
+    if not m:
+        return None
+    readings = iter(m.groups())
+    return tuple((p, next(readings)) if KANJI.fullmatch(p) else (p, None) for p in parts)
+
+class Trie:
+    """Character trie of words; longest() finds the longest word at a position."""
+
+    _END = ""                           # no character is the empty string
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, word: str, value):
+        node = self.root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        self.size += self._END not in node
+        node[self._END] = value
+
+    def longest(self, text: str, start: int):
+        """(end, value) of the longest word starting at text[start], or None."""
+        node, found = self.root, None
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if self._END in node:
+                found = (i + 1, node[self._END])
+        return found
+
+def readings(origins: dict) -> dict:
+    """word -> segments, using each word's most common reading."""
+    counts = defaultdict(Counter)
+    for record in origins.values():
+        for word, romaji, _gloss in extract(record.get("nameOriginDescription", "")):
+            reading = kana.from_romaji(romaji)
+            segments = align(word, reading) if reading else None
+            if segments is None:
+                continue
+            counts[word][segments] += 1
+            # the kanji runs of a longer word are words too (穿つ -> 穿)
+            if len(segments) > 1:
+                for text, part in segments:
+                    if part:
+                        counts[text][((text, part),)] += 1
+    for word, reading in EXTRA_READINGS.items():
+        segments = align(word, reading)
+        if word not in counts and segments:
+            counts[word][segments] += 1
+    return {word: found.most_common(1)[0][0] for word, found in counts.items()}
+
+def build_dictionary(origins: dict) -> Trie:
+    trie = Trie()
+    for word, segments in readings(origins).items():
+        trie.add(word, segments)
+    return trie
+
+# ------------------ markup ----------------------
+def split_run(text: str, start: int, run_end: int, trie: Trie):
+    """
+    Words covering the kanji run text[start:run_end] as (end, segments),
+    or None.  A word may end inside the run only if it is a compound of two
+    or more kanji; the last one may carry on into kana (okurigana).
+    """
+    words, i = [], start
+    while i < run_end:
+        hit = trie.longest(text, i)
+        if hit is None:
+            return None
+        end = hit[0]
+        if not (i == start and end >= run_end) and min(end, run_end) - i < 2:
+            return None                 # a lone kanji inside a longer run
+        words.append(hit)
+        i = end
+    return words
+
+def ruby(text: str, trie: Trie) -> str:
+    """text as HTML with <ruby> readings on every kanji run the trie can read."""
+    out = []
+    i = 0
+    while i < len(text):
+        run = KANJI.match(text, i)
+        if run:
+            words = split_run(text, i, run.end(), trie)
+            if words is None:
+                out.append(html.escape(run.group(), quote=False))
+                i = run.end()
+                continue
+        else:
+            hit = trie.longest(text, i) if text[i] in trie.root else None
+            # a kana-initial word must not end inside a kanji run either
+            if hit and hit[0] < len(text) and KANJI.match(text, hit[0] - 1) \
+                    and KANJI.match(text, hit[0]):
+                hit = None
+            if hit is None:
+                out.append(html.escape(text[i], quote=False))
+                i += 1
+                continue
+            words = [hit]
+        for i, segments in words:
+            for part, reading in segments:
+                part = html.escape(part, quote=False)
+                out.append(f"<ruby>{part}<rt>{reading}</rt></ruby>" if reading else part)
+    return "".join(out)
+
+# ------------------ pipeline stage --------------
+_trie = None
+
+def load_dictionary(origins: dict) -> str:
+    """Build the dictionary furigana_record() uses; returns its fingerprint."""
+    global _trie
+    words = readings(origins)
+    _trie = Trie()
+    for word, segments in words.items():
+        _trie.add(word, segments)
+    return hashlib.sha1(json.dumps(sorted(words.items()), ensure_ascii=False)
+                        .encode("utf-8")).hexdigest()
+
+def dictionary_fingerprint() -> str:
+    """Stage data fingerprint: the dictionary built from the footnotes layer."""
+    from dataset_store import DatasetStore
+    store = DatasetStore()
+    try:
+        return load_dictionary({str(n): r for n, r in store.view("footnotes")})
+    finally:
+        store.close()
+
+def furigana_record(origin: dict) -> dict:
+    """Return a copy of one name-origin record with ruby markup per element"""
+    if _trie is None:
+        dictionary_fingerprint()
+    elements = origin.get("nameOriginElements") or []
+    return {**origin, "nameOriginRuby": [ruby(e, _trie) for e in elements]}
+
+# ------------------ CLI -------------------------
+def stats(origins: dict):
+    trie = build_dictionary(origins)
+    kanji, covered = Counter(), Counter()
+    for record in origins.values():
+        for element in record.get("nameOriginElements") or []:
+            marked = ruby(element, trie)
+            for ch in element:
+                if KANJI.fullmatch(ch):
+                    kanji[ch] += 1
+            for word in re.findall(r"<ruby>(.*?)<rt>", marked):
+                covered.update(ch for ch in word if KANJI.fullmatch(ch))
+    triples = sum(len(extract(r.get("nameOriginDescription", ""))) for r in origins.values())
+    print(f"{triples} kanji triples in the descriptions, {trie.size} dictionary words")
+    print(f"Kanji in elements: {len(kanji)} distinct, {len(covered)} with a reading "
+          f"({sum(covered.values())}/{sum(kanji.values())} occurrences)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Ruby readings for name-origin elements")
+    ap.add_argument("cmd", choices=["build", "stats", "show"])
+    ap.add_argument("ndex", nargs="?", help="record to show")
+    args = ap.parse_args()
+
+    with open(ORIGINS_JSON, "r", encoding="utf-8") as f:
+        origins = json.load(f)
+    load_dictionary(origins)
+    if args.cmd == "build":
+        total, changed = stream.run(ORIGINS_JSON, FURIGANA_JSON,
+                                    [("furigana", furigana_record)], indent=2)
+        print(f"Annotated {total} records; saved to {FURIGANA_JSON}")
+    elif args.cmd == "stats":
+        stats(origins)
+    else:
+        if args.ndex not in origins:
+            ap.error(f"no record {args.ndex}")
+        for element in furigana_record(origins[args.ndex])["nameOriginRuby"]:
+            print(element)
+
+if __name__ == "__main__":
+    main()
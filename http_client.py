@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+http_client.py - shared HTTP layer for the scrapers and downloaders
+
+One keep-alive requests.Session (pooled connections per host), uniform
+timeouts, retries with exponential backoff + jitter that honour
+Retry-After, and per-host politeness throttles.
+
+Each host's throttle is an adaptive token bucket charged only by requests
+that actually go out (cache hits never reach this module).  It starts at
+the rate in HOST_LIMITS and halves on a 429/5xx or connection failure,
+at most once per RATE_WINDOW (the retries of one flaky page or a burst
+of parallel failures count once) and never below RATE_FLOOR times the
+starting rate; a Retry-After holds off the whole host.  After a whole
+RATE_WINDOW without failures each success steps the rate back up by
+RATE_STEP, at most once per window, up to RATE_CEILING times the
+starting rate.
+
+With a base-URL override (set_base_url(), the scripts' --base-url, or
+SCRAPER_BASE_URL in the environment) every request goes to that server
+instead, same path and query, with the original host in X-Forwarded-Host;
+replay_server.py answers those from recordings.  Throttles still apply
+per original host.
+
+Usage:
+    import http_client
+    html = http_client.get(url, headers=HEAD).text
+"""
+
+import email.utils
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrument
+
+DEFAULT_HEADERS = {"User-Agent": "PokemonFlashcardsBot/0.3 (contact@example.com)"}
+DEFAULT_TIMEOUT = (5, 20)          # (connect, read) seconds
+RETRY_STATUS = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 1.0                 # seconds, doubled per attempt
+BACKOFF_MAX = 60.0
+
+# per-host politeness: (max requests in flight, starting seconds between starts)
+HOST_LIMITS = {
+    "bulbapedia.bulbagarden.net": (4, 0.3),
+    "wiki.xn--rckteqa2e.com":     (2, 0.3),
+    "archives.bulbagarden.net":   (4, 0.1),
+}
+DEFAULT_LIMIT = (1, 0.3)
+RATE_FLOOR = 0.25                   # slowest a host gets, as a multiple of its starting rate
+RATE_CEILING = 3.0                  # and fastest
+RATE_STEP = 1.25
+RATE_WINDOW = 10.0                  # seconds: at most one cut or one step up per window
+
+# ------------------ throttling ------------------
+class HostThrottle:
+    """
+    Cap concurrent requests to one host and pace their starts with a token
+    bucket whose rate adapts to how the host responds.
+    """
+
+    def __init__(self, max_in_flight: int, interval: float, host: str = ""):
+        self.host = host
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.base_rate = 1 / interval if interval > 0 else float("inf")
+        self.rate = self.base_rate
+        self.burst = 1.0                # no bursts: starts stay evenly spaced
+        self.tokens = self.burst
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0         # Retry-After from the host
+        self.failed = float("-inf")     # last failure
+        self.changed = float("-inf")    # last cut or step up
+
+    def _wait(self) -> float:
+        """Take a token (possibly on credit); returns how long to wait for it."""
+        with self.lock:
+            now = time.monotonic()
+            if self.rate == float("inf"):
+                return max(0.0, self.paused_until - now)
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+            self.refilled = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    @contextmanager
+    def slot(self):
+        with self.slots:
+            instrument.sleep(self._wait(), "throttle")
+            yield
+
+    def _set_rate(self, rate: float):
+        if rate != self.rate:
+            self.rate = rate
+            instrument.emit("rate", host=self.host, rate=round(rate, 3))
+
+    def success(self):
+        """Step the rate up once a window has passed without failures."""
+        with self.lock:
+            now = time.monotonic()
+            if now - max(self.failed, self.changed) >= RATE_WINDOW:
+                if self.rate < self.base_rate * RATE_CEILING:
+                    self.changed = now
+                    self._set_rate(min(self.base_rate * RATE_CEILING, self.rate * RATE_STEP))
+
+    def failure(self, retry_after: float | None = None):
+        """A 429/5xx or connection failure: halve the rate, honour Retry-After."""
+        with self.lock:
+            now = time.monotonic()
+            self.failed = now
+            if self.rate != float("inf") and now - self.changed >= RATE_WINDOW:
+                self.changed = now
+                self._set_rate(max(self.base_rate * RATE_FLOOR, self.rate / 2))
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+_throttles: dict[str, HostThrottle] = {}
+_throttles_lock = threading.Lock()
+
+def throttle(url: str) -> HostThrottle:
+    host = urlparse(url).netloc
+    with _throttles_lock:
+        if host not in _throttles:
+            _throttles[host] = HostThrottle(*HOST_LIMITS.get(host, DEFAULT_LIMIT), host=host)
+        return _throttles[host]
+
+def set_host_limit(max_in_flight: int):
+    """Override the in-flight cap for every known host (keeps the starting rate)."""
+    global DEFAULT_LIMIT
+    with _throttles_lock:
+        for host, (_, interval) in list(HOST_LIMITS.items()):
+            HOST_LIMITS[host] = (max_in_flight, interval)
+        DEFAULT_LIMIT = (max_in_flight, DEFAULT_LIMIT[1])
+        _throttles.clear()
+
+# ------------------ base-URL override ------------
+_base_url = os.environ.get("SCRAPER_BASE_URL") or None
+
+def set_base_url(url: str | None):
+    """Send every request to url (e.g. http://localhost:8800) instead; None undoes it."""
+    global _base_url
+    _base_url = url.rstrip("/") if url else None
+
+def route(url: str, headers=None) -> tuple[str, dict | None]:
+    """The URL and headers a request actually uses, after the override."""
+    if not _base_url:
+        return url, headers
+    parts = urlparse(url)
+    target = _base_url + (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    return target, {**(headers or {}), "X-Forwarded-Host": parts.netloc}
+
+# ------------------ session ---------------------
+_session = None
+_session_lock = threading.Lock()
+
+def session() -> requests.Session:
+    """Process-wide Session; connections are kept alive and reused."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update(DEFAULT_HEADERS)
+            _session = s
+        return _session
+
+# ------------------ retries ---------------------
+def retry_after(resp) -> float | None:
+    """Seconds requested by a Retry-After header (delta or HTTP date)."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+def received(resp, stream: bool = False) -> int:
+    """Body bytes of a response (the declared length when streamed)."""
+    if resp is None:
+        return 0
+    if stream:
+        return int(resp.headers.get("Content-Length") or 0)
+    return len(resp.content)
+
+def backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def request(method: str, url: str, *, params=None, data=None, headers=None,
+            timeout=DEFAULT_TIMEOUT, retries: int = 3,
+            stream: bool = False) -> requests.Response:
+    """
+    Send a request through the shared session and the host's throttle.
+
+    Connection errors, timeouts and 429/5xx responses are retried up to
+    `retries` times, and slow the host's throttle down; other HTTP errors
+    raise immediately.  The final failure is raised as a
+    requests.exceptions.RequestException.
+    """
+    target, headers = route(url, headers)
+    host = urlparse(url).netloc
+    limiter = throttle(url)
+    for attempt in range(retries + 1):
+        resp = None
+        try:
+            with limiter.slot():
+                started = time.perf_counter()
+                try:
+                    resp = session().request(method, target, params=params, data=data,
+                                             headers=headers, timeout=timeout,
+                                             stream=stream)
+                finally:
+                    instrument.fetch(host, resp.status_code if resp is not None else "error",
+                                     received(resp, stream), time.perf_counter() - started)
+            if resp.status_code not in RETRY_STATUS:
+                limiter.success()       # a 404 is still the host keeping up
+                resp.raise_for_status()
+                return resp
+            error = requests.exceptions.HTTPError(
+                f"{resp.status_code} for {resp.url}", response=resp)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout) as exc:
+            error = exc
+        delay = retry_after(resp)
+        limiter.failure(delay)
+        if attempt == retries:
+            raise error
+        instrument.sleep(delay if delay is not None else backoff(attempt), "retry")
+        if resp is not None:
+            resp.close()
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+instrument.py - shared timings and counters for the pipeline scripts
+
+Everything a run spends time on is reported here, as events:
+
+    span    a timed block, by kind and name: stage, record, parse, write
+    fetch   one HTTP attempt: host, status, bytes, seconds (http_client.py)
+    sleep   time slept on purpose: throttle, retry, polite (sleep())
+    cache   one content-store read, hit or miss (content_store.py)
+
+http_client and content_store report on their own, so a script only
+marks its stages, records and parse calls:
+
+    with instrument.span("stage", "types_page"): ...
+    @instrument.timed("parse")
+    def extract_type_info_from_types_page(html): ...
+
+Outside a session() these are no-ops.  Inside one, each event is appended
+to a JSON-lines trace (<script>.trace.jsonl next to the outputs) and a
+summary table is printed when the run ends.  Spans timed in process-pool
+workers are only seen as the "record" span parallel.py books per item.
+
+With --profile the run is also wrapped in cProfile and tracemalloc, and
+<script>.prof (python -m pstats) and <script>.memory.txt (largest
+allocation sites and peak) are written next to the trace.
+
+Usage:
+    instrument.add_arguments(parser)
+    with instrument.session("extract_types", args):
+        main()
+
+    python instrument.py summary extract_types.trace.jsonl
+"""
+
+import argparse
+import cProfile
+import functools
+import json
+import os
+import pathlib
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# ------------------ summary ---------------------
+class Summary:
+    """Totals over a stream of events (live, or read back from a trace)."""
+
+    def __init__(self):
+        self.spans = defaultdict(lambda: [0, 0.0, 0.0, None])    # (kind, name) -> calls, total, max, slowest id
+        self.fetches = defaultdict(lambda: [0, 0.0, 0.0, None])  # host -> same
+        self.statuses = Counter()
+        self.sleeps = defaultdict(lambda: [0, 0.0, 0.0, None])   # why -> same
+        self.bytes = 0
+        self.cache = Counter()
+        self.elapsed = 0.0
+
+    @staticmethod
+    def _add(row, seconds, ident=None):
+        row[0] += 1
+        row[1] += seconds
+        if seconds >= row[2]:
+            row[2], row[3] = seconds, ident
+
+    def add(self, event: dict):
+        ev, seconds = event["ev"], event.get("s", 0.0)
+        self.elapsed = max(self.elapsed, event.get("t", 0.0))
+        if ev == "span":
+            self._add(self.spans[event["kind"], event["name"]], seconds, event.get("id"))
+        elif ev == "fetch":
+            self._add(self.fetches[event["host"]], seconds, event.get("status"))
+            self.statuses[event.get("status")] += 1
+            self.bytes += event.get("bytes", 0)
+        elif ev == "sleep":
+            self._add(self.sleeps[event["why"]], seconds)
+        elif ev == "cache":
+            self.cache["hit" if event["hit"] else "miss"] += 1
+
+    def table(self) -> str:
+        def ms(seconds):
+            return f"{seconds:8.2f} s " if seconds >= 1 else f"{seconds * 1000:8.1f} ms"
+
+        lines = [f"{'':8s}{'name':34s}{'calls':>7s}{'total':>12s}{'avg':>12s}{'max':>12s}"]
+        def rows(kind, table):
+            for name, (calls, total, peak, ident) in sorted(table.items(), key=lambda kv: -kv[1][1]):
+                slowest = f"  ({ident})" if ident is not None and kind in ("record", "parse") else ""
+                lines.append(f"{kind:8s}{str(name)[:33]:34s}{calls:7d}{ms(total):>12s}"
+                             f"{ms(total / calls):>12s}{ms(peak):>12s}{slowest}".rstrip())
+        for kind in ("stage", "record", "parse", "write"):
+            rows(kind, {name: row for (k, name), row in self.spans.items() if k == kind})
+        rows("fetch", self.fetches)
+        rows("sleep", self.sleeps)
+
+        fetches = sum(row[0] for row in self.fetches.values())
+        hits, misses = self.cache["hit"], self.cache["miss"]
+        statuses = ", ".join(f"{n} × {status}" for status, n in sorted(
+            self.statuses.items(), key=lambda kv: str(kv[0])))
+        lines.append(f"{fetches} fetches ({statuses or 'none'}), {self.bytes / 1e6:.1f} MB received; "
+                     f"cache {hits} hit / {misses} miss"
+                     + (f" ({hits / (hits + misses):.0%} hit)" if hits + misses else ""))
+        lines.append(f"{sum(row[1] for row in self.sleeps.values()):.1f} s slept "
+                     f"(summed over threads) in {self.elapsed:.1f} s")
+        return "\n".join(lines)
+
+# ------------------ recording -------------------
+class Run:
+    """One script run: its trace file and live summary."""
+
+    def __init__(self, name: str, trace_path: pathlib.Path | None):
+        self.name = name
+        self.pid = os.getpid()          # events from forked workers are dropped
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.summary = Summary()
+        self.trace = open(trace_path, "w", encoding="utf-8") if trace_path else None
+
+    def emit(self, event: dict):
+        if os.getpid() != self.pid:
+            return
+        event["t"] = round(time.monotonic() - self.started, 6)
+        with self.lock:
+            self.summary.add(event)
+            if self.trace:
+                self.trace.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self.trace:
+            self.trace.close()
+
+_run = None
+
+def emit(ev: str, **fields):
+    if _run is not None:
+        _run.emit({"ev": ev, **fields})
+
+@contextmanager
+def span(kind: str, name: str, ident=None):
+    """Time a block as one span; ident names the record in the trace."""
+    if _run is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit("span", kind=kind, name=name, id=ident, s=round(time.perf_counter() - started, 6))
+
+def add_span(kind: str, name: str, seconds: float, ident=None):
+    """Book a span timed elsewhere (e.g. in a worker process)."""
+    emit("span", kind=kind, name=name, id=ident, s=round(seconds, 6))
+
+def timed(kind: str):
+    """Decorator: every call of the function is a span named after it."""
+    def wrap(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _run is None:
+                return func(*args, **kwargs)
+            with span(kind, func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return wrap
+
+def fetch(host: str, status, nbytes: int, seconds: float):
+    emit("fetch", host=host, status=status, bytes=nbytes, s=round(seconds, 6))
+
+def cache(key: str, hit: bool):
+    emit("cache", key=key, hit=hit)
+
+def sleep(seconds: float, why: str = "polite"):
+    """time.sleep, booked as sleep time."""
+    if seconds <= 0:
+        return
+    time.sleep(seconds)
+    emit("sleep", why=why, s=round(seconds, 6))
+
+# ------------------ sessions --------------------
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--trace", metavar="FILE",
+                        help="JSON-lines trace (default <script>.trace.jsonl, '' for none)")
+    parser.add_argument("--profile", action="store_true",
+                        help="also write cProfile and tracemalloc results next to the trace")
+
+@contextmanager
+def session(name: str, args=None):
+    """Record a whole run; prints the summary table at the end."""
+    global _run
+    trace = getattr(args, "trace", None)
+    trace_path = pathlib.Path(f"{name}.trace.jsonl" if trace is None else trace) if trace != "" else None
+    out = trace_path.parent if trace_path else pathlib.Path(".")
+    run = _run = Run(name, trace_path)
+    profiler = None
+    if getattr(args, "profile", False):
+        tracemalloc.start(25)
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with span("stage", name):
+            yield run
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(out / f"{name}.prof")
+            write_memory(out / f"{name}.memory.txt", tracemalloc.take_snapshot(),
+                         tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        _run = None
+        run.close()
+        print(f"\n{run.summary.table()}")
+        if trace_path:
+            print(f"Trace written to {trace_path}")
+        if profiler:
+            print(f"Profile written to {out / f'{name}.prof'} and {out / f'{name}.memory.txt'}")
+
+def write_memory(path: pathlib.Path, snapshot, peak: int, top: int = 30):
+    stats = snapshot.statistics("lineno")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"peak traced memory: {peak / 1e6:.1f} MB\n")
+        f.write(f"still allocated at exit: {sum(s.size for s in stats) / 1e6:.1f} MB\n\n")
+        for stat in stats[:top]:
+            f.write(f"{stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {stat.traceback}\n")
+
+def main():
+    ap = argparse.ArgumentParser(description="Summarise instrumentation traces")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("summary", help="print the summary table of a trace")
+    p.add_argument("trace")
+    args = ap.parse_args()
+
+    summary = Summary()
+    with open(args.trace, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                summary.add(json.loads(line))
+            except json.JSONDecodeError:        # torn last line of a killed run
+                continue
+    print(summary.table())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+kana.py - table-driven kana conversion
+
+Katakana and hiragana sit 0x60 code points apart, so both directions are
+single str.translate calls on tables built once at import.  normalize()
+folds half-width katakana (ｶﾞ -> ガ) and full-width ASCII with NFKC.
+romaji() gives modified Hepburn with macrons, the style of the dataset's
+hepburnName (フシギソウ -> Fushigisō, ピカチュウ -> Pikachū).
+
+    to_hiragana("ヴァイオリン")   -> "ゔぁいおりん"
+    to_katakana("ふしぎだね")     -> "フシギダネ"
+    romaji("リザードン")          -> "Rizādon"
+    fold_macrons("Rizādon")      -> "Rizadon"
+    from_romaji("fushigi")       -> "ふしぎ"
+
+Usage:
+    python kana.py check        # compare romaji() with hepburnName
+    python kana.py bench        # per-name cost against the old converter
+"""
+
+import argparse
+import json
+import re
+import time
+import unicodedata
+
+# ------------------ script tables ---------------
+# ァ..ヶ -> ぁ..ゖ (includes ヴ ヵ ヶ), plus the iteration marks ヽ ヾ.
+# ヷ..ヺ have no hiragana form and are left alone; ー is shared.
+_KATA_TO_HIRA = {k: k - 0x60 for k in range(ord("ァ"), ord("ヶ") + 1)}
+_KATA_TO_HIRA.update({ord("ヽ"): ord("ゝ"), ord("ヾ"): ord("ゞ")})
+_HIRA_TO_KATA = {h: k for k, h in _KATA_TO_HIRA.items()}
+
+def normalize(text: str) -> str:
+    """NFKC: half-width katakana to full width, full-width ASCII to ASCII."""
+    return unicodedata.normalize("NFKC", text)
+
+def to_hiragana(text: str) -> str:
+    return normalize(text).translate(_KATA_TO_HIRA)
+
+def to_katakana(text: str) -> str:
+    return normalize(text).translate(_HIRA_TO_KATA)
+
+# ------------------ Hepburn ---------------------
+_ROWS = {
+    "":  "アイウエオ", "k": "カキクケコ", "g": "ガギグゲゴ", "s": "サシスセソ",
+    "z": "ザジズゼゾ", "t": "タチツテト", "d": "ダヂヅデド", "n": "ナニヌネノ",
+    "h": "ハヒフヘホ", "b": "バビブベボ", "p": "パピプペポ", "m": "マミムメモ",
+    "r": "ラリルレロ",
+}
+_SYLLABLES = {}
+for _c, _row in _ROWS.items():
+    for _kana, _vowel in zip(_row, "aiueo"):
+        _SYLLABLES[_kana] = _c + _vowel
+_SYLLABLES.update({
+    "シ": "shi", "チ": "chi", "ツ": "tsu", "フ": "fu", "ジ": "ji", "ヂ": "ji", "ヅ": "zu",
+    "ヤ": "ya", "ユ": "yu", "ヨ": "yo", "ワ": "wa", "ヰ": "i", "ヱ": "e", "ヲ": "o",
+    "ン": "n", "ヴ": "vu", "ヵ": "ka", "ヶ": "ke",
+    "ァ": "a", "ィ": "i", "ゥ": "u", "ェ": "e", "ォ": "o", "ャ": "ya", "ュ": "yu",
+    "ョ": "yo", "ヮ": "wa",
+})
+# yōon: キャ kya, シャ sha, チャ cha, ジャ ja ...
+for _kana, _base in [("キ", "ky"), ("ギ", "gy"), ("シ", "sh"), ("ジ", "j"), ("チ", "ch"),
+                     ("ヂ", "j"), ("ニ", "ny"), ("ヒ", "hy"), ("ビ", "by"), ("ピ", "py"),
+                     ("ミ", "my"), ("リ", "ry")]:
+    for _small, _vowel in zip("ャュョ", "auo"):
+        _SYLLABLES[_kana + _small] = _base + _vowel
+# loanword combinations
+_SYLLABLES.update({
+    "シェ": "she", "ジェ": "je", "チェ": "che", "ティ": "ti", "ディ": "di", "トゥ": "tu",
+    "ドゥ": "du", "テュ": "tyu", "デュ": "dyu", "ツァ": "tsa", "ツィ": "tsi", "ツェ": "tse",
+    "ツォ": "tso", "ファ": "fa", "フィ": "fi", "フェ": "fe", "フォ": "fo", "フュ": "fyu",
+    "ウィ": "wi", "ウェ": "we", "ウォ": "wo", "ヴァ": "va", "ヴィ": "vi", "ヴェ": "ve",
+    "ヴォ": "vo", "ヴュ": "vyu", "イェ": "ye", "クァ": "kwa", "クィ": "kwi", "クェ": "kwe",
+    "クォ": "kwo", "グァ": "gwa", "スィ": "si", "ズィ": "zi", "キェ": "kye", "ニェ": "nye",
+    "ヒェ": "hye",
+})
+_MACRON = str.maketrans("aiueo", "āīūēō")
+_UNMACRON = str.maketrans("āīūēōĀĪŪĒŌâîûêô", "aiueoAIUEOaiueo")
+_SYMBOLS = {"♀": " Mesu", "♂": " Osu", "・": " "}
+# a kana that only lengthens the vowel before it: (previous vowel, kana)
+_LENGTHENERS = {("o", "ウ"), ("u", "ウ"), ("o", "オ"), ("a", "ア"), ("a", "ァ"),
+                ("i", "ィ"), ("u", "ゥ"), ("e", "ェ"), ("o", "ォ")}
+
+def romaji(text: str) -> str:
+    """Modified Hepburn with macrons for long vowels, words capitalized."""
+    kata = to_katakana(text)
+    out = []                            # one romanized syllable per entry
+    geminate = False
+    i = 0
+    while i < len(kata):
+        pair = kata[i:i + 2]
+        ch = kata[i]
+        last = out[-1][-1:] if out else ""
+        if len(pair) == 2 and pair in _SYLLABLES:
+            syl, i = _SYLLABLES[pair], i + 2
+        elif ch == "ッ":
+            geminate, i = True, i + 1
+            continue
+        elif ch == "ー" or ((last, ch) in _LENGTHENERS
+                            and (ch in "ァィゥェォ" or kata[i + 1:i + 2] != "ー")):
+            if last in ("a", "i", "u", "e", "o"):
+                out[-1] = out[-1][:-1] + last.translate(_MACRON)
+            i += 1
+            continue
+        else:
+            syl, i = _SYLLABLES.get(ch) or _SYMBOLS.get(ch, ch), i + 1
+        if out and out[-1] == "n" and syl[:1] in ("a", "i", "u", "e", "o", "y"):
+            out[-1] = "n'"              # ン before a vowel: Yan'yanma
+        if geminate and syl[:1].isalpha() and syl[0] not in "aiueon":
+            syl = ("t" if syl.startswith("ch") else syl[0]) + syl
+        geminate = False
+        out.append(syl)
+    words = "".join(out).strip()
+    return "".join(w[:1].upper() + w[1:] for w in _WORD_BREAK.split(words))
+
+_WORD_BREAK = re.compile(r"(?<=[ :])")
+
+def fold_macrons(text: str) -> str:
+    """Drop macrons/circumflexes: Fushigisō -> Fushigiso (for search and comparisons)."""
+    return text.translate(_UNMACRON)
+
+# ------------------ romaji -> kana --------------
+# the Hepburn table run backwards; the first kana listed for a spelling wins
+# (ジ over ヂ, ア over ァ), plus the spellings romaji() never produces
+_FROM_ROMAJI = {}
+for _kana, _rom in _SYLLABLES.items():
+    _FROM_ROMAJI.setdefault(_rom, to_hiragana(_kana))
+_FROM_ROMAJI.update({"n'": "ん", "nn": "ん", "wo": "を", "si": "し", "ti": "ち", "tu": "つ",
+                     "hu": "ふ", "zi": "じ", "jya": "じゃ", "jyu": "じゅ", "jyo": "じょ"})
+_LONGEST = max(map(len, _FROM_ROMAJI))
+# long vowels: ō is おう far more often than おお in the words of the dataset
+_LONG_VOWELS = {"ā": "aa", "ī": "ii", "ū": "uu", "ē": "ee", "ō": "ou",
+                "â": "aa", "î": "ii", "û": "uu", "ê": "ee", "ô": "ou"}
+
+def from_romaji(text: str) -> str | None:
+    """Hiragana for a Hepburn spelling (fushigi -> ふしぎ); None if it doesn't parse."""
+    rom = "".join(_LONG_VOWELS.get(ch, ch) for ch in text.lower() if ch not in " -")
+    out = []
+    i = 0
+    while i < len(rom):
+        ch = rom[i]
+        nxt = rom[i + 1:i + 2]
+        if ch == nxt and ch not in "aiueon" or (ch == "t" and rom[i + 1:i + 3] == "ch"):
+            out.append("っ")            # doubled consonant: kitte, matcha
+            i += 1
+            continue
+        if ch in "nm" and (not nxt or nxt not in "aiueoy'" and (ch == "n" or nxt in "bmp")):
+            out.append("ん")            # n before a consonant, m in shimbun
+            i += 1
+            continue
+        for size in range(min(_LONGEST, len(rom) - i), 0, -1):
+            kana = _FROM_ROMAJI.get(rom[i:i + size])
+            if kana:
+                out.append(kana)
+                i += size
+                break
+        else:
+            return None
+    return "".join(out)
+
+# ------------------ batch -----------------------
+def convert_records(records, fields=("hiragana", "romaji")) -> list[dict]:
+    """Add the requested readings of kanaName to every record in one pass."""
+    convert = {"hiragana": to_hiragana, "katakana": to_katakana, "romaji": romaji}
+    return [{**r, **{f: convert[f](r["kanaName"]) for f in fields}} for r in records]
+
+# ------------------ CLI -------------------------
+def check(path: str):
+    """Report names whose romaji() differs from hepburnName."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    readings = convert_records(data, ("romaji",))
+    misses = [(p["ndex"], p["kanaName"], p["romaji"], p["hepburnName"])
+              for p in readings if p["romaji"] != p["hepburnName"]]
+    for ndex, kana, got, want in misses:
+        print(f"{ndex:04d} {kana}: {got} != {want}")
+    print(f"{len(data) - len(misses)}/{len(data)} match hepburnName")
+    # publishedName is the trademarked spelling; only count exact agreements
+    published = sum(fold_macrons(p["romaji"]) == p["publishedName"] for p in readings)
+    print(f"{published}/{len(data)} match publishedName once macrons are folded")
+
+def _legacy_to_hiragana(text: str) -> str:
+    """The old add_hiragana converter: a fresh dict per call, += per character."""
+    table = {chr(k): chr(h) for k, h in _KATA_TO_HIRA.items()}
+    result = ""
+    for char in text:
+        result += table.get(char, char)
+    return result
+
+def bench(path: str, rounds: int = 20):
+    """Per-name cost of each conversion over the whole dataset."""
+    with open(path, "r", encoding="utf-8") as f:
+        names = [p["kanaName"] for p in json.load(f)]
+    for label, func in [("legacy dict loop", _legacy_to_hiragana),
+                        ("to_hiragana", to_hiragana), ("to_katakana", to_katakana),
+                        ("romaji", romaji)]:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for name in names:
+                func(name)
+        per_name = (time.perf_counter() - started) / (rounds * len(names))
+        print(f"{label:18s} {per_name * 1e6:7.2f} µs/name")
+    started = time.perf_counter()
+    convert_records([{"kanaName": n} for n in names])
+    print(f"convert_records    {(time.perf_counter() - started) * 1e3:7.2f} ms "
+          f"for {len(names)} names (hiragana + romaji)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Kana conversion checks and benchmark")
+    ap.add_argument("cmd", choices=["check", "bench"])
+    ap.add_argument("--json", default="pokemon_base_0001_1025.json")
+    args = ap.parse_args()
+    check(args.json) if args.cmd == "check" else bench(args.json)
+
+if __name__ == "__main__":
+    main()
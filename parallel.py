@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+parallel.py - ordered process-pool map with progress and per-item errors
+
+Used by the extractors to spread CPU-bound BeautifulSoup parsing over all
+cores.  `func` must be a module-level function so it can be pickled.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import instrument
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+def _capture(func, item):
+    started = time.perf_counter()
+    try:
+        return func(item), None, time.perf_counter() - started
+    except Exception as exc:        # reported per item, never kills the pool
+        return None, f"{type(exc).__name__}: {exc}", time.perf_counter() - started
+
+def map_ordered(func, items, jobs: int | None = None, label: str = "items",
+                every: int = 50, chunksize: int = 4, key=None) -> list[tuple]:
+    """
+    Run func(item) for every item across `jobs` processes.
+
+    Returns [(result, error), ...] in input order; error is None on success
+    and a "Type: message" string if func raised.  Each item's time in its
+    worker is booked as an instrument "record" span under `label`, named
+    by key(item) (default: its position).
+    """
+    items = list(items)
+    total = len(items)
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs or default_jobs()) as pool:
+        for done, (result, error, seconds) in enumerate(
+                pool.map(_capture, repeat(func), items, chunksize=chunksize), 1):
+            results.append((result, error))
+            item = items[done - 1]
+            instrument.add_span("record", label, seconds,
+                                ident=key(item) if key else done - 1)
+            if done % every == 0 or done == total:
+                rate = done / max(time.perf_counter() - started, 1e-9)
+                print(f"  {label}: {done}/{total} ({rate:.1f}/s)")
+    return results
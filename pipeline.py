@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+pipeline.py - incremental runner for the JSON stage chain
+
+Declares the dataset stages and reruns only what changed.  Stages read
+and write layers of the canonical dataset store (dataset_store.py).  Every
+input record is fingerprinted (sha1 of its canonical JSON) and every
+stage's code is fingerprinted (sha1 of the source of the modules it uses);
+a record is recomputed only when its own fingerprint or its stage's code
+fingerprint differs from the last run.
+
+    base (pokemon_base_0001_1025.json)
+      ├─ hiragana
+      ├─ types
+      │   └─ clean_types
+      │       └─ tcg_types
+      └─ images
+          └─ sprites (after build_sprites.py)
+    origins (name_origins_0001_1025.json)
+      └─ footnotes
+          └─ furigana
+
+types_info.json / tcg_types_info.json (the type pages themselves) are not
+per-record and are still produced by extract_types.py / extract_tcg_types.py.
+
+Usage:
+    python pipeline.py --import-legacy  # seed the store from the JSON files
+    python pipeline.py                  # run every stage incrementally
+    python pipeline.py tcg_types        # run one stage
+    python pipeline.py --force types    # ignore fingerprints for a stage
+    python pipeline.py --export         # also regenerate the legacy JSON files
+"""
+
+import argparse
+import copy
+import hashlib
+import importlib
+import json
+import pathlib
+import sys
+import time
+import types
+
+import instrument
+from dataset_store import DatasetStore, VIEW_FILES, delta
+
+class Stage:
+    """One record-at-a-time step: func(record) -> record (None drops it)."""
+
+    def __init__(self, name, source, module, func, data_files=(), data_func=None):
+        self.name = name                # also the dataset_store layer it writes
+        self.source = source            # dataset_store view it reads
+        self.module = module
+        self.func = func
+        self.data_files = data_files    # non-code inputs hashed with the code
+        self.data_func = data_func      # module function fingerprinting other inputs
+
+    def load(self):
+        mod = importlib.import_module(self.module)
+        return getattr(mod, self.func)
+
+    def code_fingerprint(self) -> str:
+        """Changes whenever the stage module or a local module it imports does."""
+        mod = importlib.import_module(self.module)
+        here = pathlib.Path(__file__).resolve().parent
+        deps = {mod.__name__}
+        for value in vars(mod).values():
+            if isinstance(value, types.ModuleType):
+                deps.add(value.__name__)
+            elif callable(value) and getattr(value, "__module__", None):
+                deps.add(value.__module__)
+        h = hashlib.sha1(self.func.encode())
+        for name in sorted(deps):
+            path = getattr(sys.modules.get(name), "__file__", None)
+            if path and pathlib.Path(path).resolve().parent == here:
+                h.update(pathlib.Path(path).read_bytes())
+        for path in map(pathlib.Path, self.data_files):
+            h.update(path.read_bytes() if path.exists() else b"")
+        if self.data_func:
+            h.update(getattr(mod, self.data_func)().encode())
+        return h.hexdigest()
+
+STAGES = [
+    Stage("hiragana",    "base",        "add_hiragana",      "add_hiragana_record"),
+    Stage("types",       "base",        "extract_types",     "add_types_record"),
+    Stage("clean_types", "types",       "clean_types",       "clean_record_types"),
+    Stage("tcg_types",   "clean_types", "extract_tcg_types", "add_tcg_type_record"),
+    Stage("images",      "base",        "download_images",   "localize_image_record"),
+    Stage("footnotes",   "origins",     "clean_footnotes",   "clean_origin_record"),
+    Stage("furigana",    "footnotes",   "furigana",          "furigana_record",
+          data_func="dictionary_fingerprint"),
+    Stage("sprites",     "images",      "build_sprites",     "sprite_record",
+          data_files=("images/atlas/manifest.json",)),
+]
+BY_NAME = {s.name: s for s in STAGES}
+
+def fingerprint(record) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True, ensure_ascii=False)
+                        .encode("utf-8")).hexdigest()
+
+# ------------------ runner ----------------------
+def run_stage(store: DatasetStore, stage: Stage, force: bool = False) -> tuple[int, int]:
+    """Apply one stage; returns (records in, number recomputed)."""
+    records = store.view(stage.source)
+    code = stage.code_fingerprint()
+    same_code = store.stage_code(stage.name) == code and not force
+    cached = store.fingerprints(stage.name) if same_code else {}
+    existing = store.ndexes(stage.name)
+    func = None
+    fps, rows, dropped = {}, {}, []
+    for ndex, record in records:
+        fp = fps[ndex] = fingerprint(record)
+        if cached.get(ndex) == fp:
+            continue
+        func = func or stage.load()
+        with instrument.span("record", stage.name, ident=ndex):
+            result = func(copy.deepcopy(record))
+        if result is not None:
+            rows[ndex] = delta(record, result)
+        elif ndex in existing:
+            dropped.append(ndex)
+    dropped += [n for n in existing if n not in fps]
+
+    store.put_rows(stage.name, rows)
+    store.delete_rows(stage.name, dropped)
+    recomputed = sum(1 for n in fps if cached.get(n) != fps[n])
+    if recomputed or dropped or not same_code:
+        store.set_fingerprints(stage.name, fps, code)
+    return len(records), recomputed
+
+def adopt(store: DatasetStore):
+    """Mark the layers already in the store as up to date with the current code."""
+    for stage in STAGES:
+        if not store.ndexes(stage.name):
+            continue                    # nothing imported for this stage
+        fps = {n: fingerprint(r) for n, r in store.view(stage.source)}
+        store.set_fingerprints(stage.name, fps, stage.code_fingerprint())
+
+def run(store: DatasetStore, names=None, force=(), export=False):
+    """Run the named stages (default: all) in declaration order."""
+    for stage in STAGES:
+        if names and stage.name not in names:
+            continue
+        started = time.perf_counter()
+        with instrument.span("stage", stage.name):
+            total, changed = run_stage(store, stage, force=stage.name in force)
+        elapsed = time.perf_counter() - started
+        print(f"{stage.name:12s} {changed:5d} recomputed, "
+              f"{total - changed:5d} reused  ({elapsed:.2f} s)")
+        if export and stage.name in VIEW_FILES:
+            with instrument.span("write", VIEW_FILES[stage.name]):
+                store.export(stage.name)
+            print(f"{'':12s} exported {VIEW_FILES[stage.name]}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Incrementally rebuild the dataset")
+    ap.add_argument("stages", nargs="*",
+                    help=f"stages to run (default: all): {', '.join(BY_NAME)}")
+    ap.add_argument("--force", action="append", default=[], choices=list(BY_NAME),
+                    help="recompute every record of this stage")
+    ap.add_argument("--export", action="store_true",
+                    help="regenerate the legacy JSON file of every stage run")
+    ap.add_argument("--import-legacy", action="store_true",
+                    help="load the legacy JSON files into the store and trust them")
+    instrument.add_arguments(ap)
+    args = ap.parse_args()
+    unknown = set(args.stages) - set(BY_NAME)
+    if unknown:
+        ap.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    store = DatasetStore()
+    with instrument.session("pipeline", args):
+        if args.import_legacy:
+            store.import_legacy()
+            adopt(store)
+        else:
+            run(store, args.stages or None, set(args.force), args.export)
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+prerender_tts.py - render the speech for every card ahead of time
+
+Renders the kana name and the published (romaji) name of every Pokémon,
+the two texts the speak buttons read, and optionally every
+nameOriginElements entry, into tts_server's audio cache (tts_cache/) across
+a process pool.  Files are named by the same (text, lang, voice) key the
+server uses, so the server serves them as cache hits, and anything already
+rendered is skipped.
+
+Writes tts_cache/manifest.json, which script.js loads to play the files
+directly (no server round trip):
+
+    {"voice": "", "audio": {"ja-JP": {"フシギダネ": "<key>.wav", ...}}}
+
+Keep tts_server's --cache-mb above the size of the pre-rendered set or it
+will start evicting it.
+
+Usage:
+    python prerender_tts.py [--origins] [--jobs N] [--voice ja]
+"""
+
+import argparse
+import json
+import os
+import pathlib
+
+import parallel
+from tts_server import RenderError, cache_key, render
+
+POKEMON_JSON = "pokemon_base_0001_1025_with_tcg_types.json"
+ORIGINS_JSON = "name_origins_0001_1025_cleaned.json"
+CACHE_DIR = pathlib.Path("tts_cache")
+LANG = "ja-JP"
+
+def card_texts(with_origins: bool = False) -> list[str]:
+    """Distinct texts to render, in card order."""
+    with open(POKEMON_JSON, "r", encoding="utf-8") as f:
+        pokemon = json.load(f)
+    texts = []
+    for p in pokemon:
+        texts += [p.get("kanaName"), p.get("publishedName")]
+    if with_origins:
+        with open(ORIGINS_JSON, "r", encoding="utf-8") as f:
+            origins = json.load(f)
+        for p in pokemon:
+            texts += origins.get(str(p["ndex"]), {}).get("nameOriginElements", [])
+    return list(dict.fromkeys(t for t in texts if t))
+
+def render_job(job: tuple) -> int:
+    """Render one (text, lang, voice, path); returns the file size."""
+    text, lang, voice, path = job
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        render(text, lang, voice, tmp)
+        os.replace(tmp, path)
+    except RenderError as e:
+        raise RuntimeError(str(e)) from None
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return os.path.getsize(path)
+
+def prerender(with_origins: bool = False, voice: str = "", jobs: int | None = None) -> dict:
+    CACHE_DIR.mkdir(exist_ok=True)
+    texts = card_texts(with_origins)
+    files = {t: f"{cache_key(t, LANG, voice)}.wav" for t in texts}
+    todo = [(t, LANG, voice, str(CACHE_DIR / name))
+            for t, name in files.items() if not (CACHE_DIR / name).exists()]
+    print(f"{len(texts)} texts, {len(texts) - len(todo)} already rendered, {len(todo)} to render")
+
+    failed = 0
+    for (text, *_), (_, error) in zip(todo, parallel.map_ordered(render_job, todo, jobs,
+                                                               label="utterances")):
+        if error:
+            print(f"  failed {text}: {error}")
+            del files[text]
+            failed += 1
+
+    manifest = {"voice": voice, "audio": {LANG: files}}
+    with open(CACHE_DIR / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"Rendered {len(todo) - failed}, failed {failed}")
+    print(f"Manifest saved to {CACHE_DIR / 'manifest.json'}")
+    return manifest
+
+def main():
+    ap = argparse.ArgumentParser(description="Pre-render card speech into tts_cache/")
+    ap.add_argument("--origins", action="store_true",
+                    help="also render every nameOriginElements entry")
+    ap.add_argument("--voice", default="",
+                    help="espeak-ng voice (default: the server's choice for ja-JP)")
+    ap.add_argument("--jobs", type=int, default=0, help="processes (0 = all cores)")
+    args = ap.parse_args()
+    prerender(args.origins, args.voice, args.jobs or parallel.default_jobs())
+
+if __name__ == "__main__":
+    main()
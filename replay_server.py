@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+replay_server.py - local stand-in for Bulbapedia, its API and the JP wiki
+
+Serves the scrapers from recordings so they can run at full scale without
+touching the live sites, under controlled network conditions:
+
+    /wiki/...                pages (Bulbapedia and the JP wiki, told apart
+                             by X-Forwarded-Host)
+    /w/api.php               action=parse (sections, text, POSTed wikitext)
+                             and action=query (revisions) JSON
+    /media/upload/...        images (archives.bulbagarden.net)
+
+Responses come from, in order:
+  1. the content store (cache/store.sqlite): every entry recorded with its URL
+  2. images/ for image URLs, by file name
+  3. with --synthetic, pages built from bench_fixtures/ in the same formats
+     (one of a few sample pages per Pokémon), so a cold full run works even
+     with an empty cache
+
+Point a script at it with --base-url (see http_client.py), from a scratch
+copy of the repo so its own cache and outputs start empty:
+
+    python replay_server.py 8800 --synthetic --latency 80 --error-rate 0.02
+    python scrape_pokemon_flashcards.py 1 1025 --workers 8 --base-url http://localhost:8800
+
+Conditions: --latency/--jitter (ms before the first byte), --error-rate
+(random 500/503), --throttle-rate (random 429) and --max-rps (429 once
+requests exceed a server-wide rate), both with Retry-After: --retry-after,
+and --bandwidth (KB/s per response).  GET /_stats returns the counters,
+which are also printed on exit.
+
+Usage:
+    python replay_server.py [port] [--store cache] [--synthetic] [--latency MS]
+                            [--jitter MS] [--error-rate P] [--throttle-rate P]
+                            [--max-rps N] [--retry-after S] [--bandwidth KBPS]
+"""
+
+import argparse
+import html
+import json
+import pathlib
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, unquote, urlencode, urlparse
+
+IMAGES_DIR = pathlib.Path("images")
+FIXTURES = pathlib.Path("bench_fixtures")
+BULBAPEDIA = "bulbapedia.bulbagarden.net"
+JP_WIKI = "wiki.xn--rckteqa2e.com"
+# query parameters that vary per request without changing the answer
+IGNORED_PARAMS = {"maxlag", "origin"}
+
+def canonical(host, path, query):
+    """Lookup key for a request: host, decoded path and sorted query."""
+    params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+                    if k not in IGNORED_PARAMS)
+    return host, unquote(path), urlencode(params)
+
+# ------------------ recordings ------------------
+class Recordings:
+    """Recorded bodies by (host, path, query), plus images by file name."""
+
+    def __init__(self, store_dir=None, images_dir=IMAGES_DIR):
+        self.bodies = {}                # canonical key -> (content type, bytes)
+        self.images = {p.name: p for p in images_dir.glob("*") if p.is_file()} \
+            if images_dir.is_dir() else {}
+        if store_dir:
+            self.load_store(store_dir)
+
+    def load_store(self, store_dir):
+        import content_store
+        if not (pathlib.Path(store_dir) / content_store.DB_NAME).exists():
+            return
+        store = content_store.ContentStore(pathlib.Path(store_dir), legacy_fallback=False)
+        rows = store.conn().execute(
+            "SELECT key, url, codec, body FROM blobs WHERE url IS NOT NULL")
+        for key, url, codec, body in rows:
+            parts = urlparse(url)
+            host = parts.netloc
+            if parts.path.endswith("api.php"):
+                if not parts.query:
+                    continue            # POSTed batch renders have no replayable URL
+                host = BULBAPEDIA       # stored as resp.url, so maybe a replay server's
+            if not host:
+                continue
+            kind = "application/json" if key.endswith(".json") else "text/html; charset=utf-8"
+            self.bodies[canonical(host, parts.path, parts.query)] = (
+                kind, content_store.decompress(codec, body))
+
+    def lookup(self, host, path, query):
+        found = self.bodies.get(canonical(host, path, query))
+        if found:
+            return found
+        name = pathlib.PurePosixPath(unquote(path)).name
+        if name in self.images and path.startswith("/media/"):
+            kind = "image/png" if name.endswith(".png") else "application/octet-stream"
+            return kind, self.images[name].read_bytes()
+        return None
+
+class Synthetic:
+    """Pages in the recorded formats, built from bench_fixtures/ (see bench.py)."""
+
+    TCG_TYPES = ("Grass", "Fire", "Water", "Lightning", "Psychic", "Fighting",
+                 "Darkness", "Metal", "Dragon", "Colorless")
+
+    def __init__(self, fixtures=FIXTURES):
+        import bench
+        self.bench = bench
+        read = lambda name: (fixtures / name).read_text(encoding="utf-8")
+        self.list_page = read("list.html")
+        self.types_page = read("types.html")
+        self.tcg_types_page = read("tcg_types.html")
+        self.pokemon = [read(f"pokemon_{n:04d}.html") for n in bench.SAMPLE]
+        self.jp = [read(f"jp_{n:04d}.html") for n in bench.SAMPLE]
+        self.origins = [re.search(r"<p>(.*?)</p>", read(f"origin_{n:04d}.html")).group(1)
+                        for n in bench.SAMPLE]
+        self.any_image = next(IMAGES_DIR.glob("*.png"), None) if IMAGES_DIR.is_dir() else None
+
+    @staticmethod
+    def pick(items, name):
+        return items[zlib.crc32(name.encode()) % len(items)]
+
+    def page(self, host, path):
+        title = unquote(path.removeprefix("/wiki/"))
+        if host == JP_WIKI:
+            return self.pick(self.jp, title)
+        if title == "List_of_Japanese_Pokémon_names":
+            return self.list_page
+        if title == "Type":
+            return self.types_page
+        if title == "Type_(TCG)":
+            return self.tcg_types_page
+        if title.endswith("_(TCG)"):
+            tcg_type = self.pick(self.TCG_TYPES, title)
+            return self.bench._page(title, f"<table><tr><td><img alt='{tcg_type}' "
+                                           f"src='/media/upload/{tcg_type}-attack.png'>"
+                                           f"</td></tr></table>", filler_rows=100)
+        if title.endswith("_(Pokémon)"):
+            return self.pick(self.pokemon, title)
+        return None
+
+    def api(self, params):
+        """JSON for the action=parse / action=query calls the scraper makes."""
+        if params.get("action") == "parse" and "text" in params:
+            # batched render: echo each marker followed by its section as HTML
+            parts = re.split(r"(@@ORIGIN-\d+@@)", params["text"])
+            out = "".join(p if p.startswith("@@ORIGIN-")
+                          else f"<p>{html.escape(re.sub(r'^=+.*?=+$', '', p, flags=re.M).strip())}</p>"
+                          for p in parts if p.strip())
+            return {"parse": {"title": params.get("title", ""), "text": out}}
+        if params.get("action") == "parse":
+            page = params.get("page", "")
+            if params.get("prop") == "sections":
+                return {"parse": {"title": page, "sections": [
+                    {"index": "1", "line": "Biology"}, {"index": "2", "line": "Name origin"}]}}
+            return {"parse": {"title": page, "text":
+                              f"<div class='mw-parser-output'><p>{self.pick(self.origins, page)}"
+                              f"</p></div>"}}
+        if params.get("action") == "query":
+            titles = [t for t in params.get("titles", "").split("|") if t]
+            return {"query": {"pages": [
+                {"title": t, "revisions": [{"slots": {"main": {"content":
+                    f"== Biology ==\n...\n== Name origin ==\n"
+                    f"{html.unescape(self.pick(self.origins, t))}\n== Trivia ==\n..."}}}]}
+                for t in titles]}}
+        return {"error": {"code": "badvalue", "info": "Unsupported request"}}
+
+    def lookup(self, host, path, query, body=None):
+        if path.endswith("/api.php"):
+            params = dict(parse_qsl(query))
+            if body:
+                params.update(parse_qsl(body))
+            return "application/json", json.dumps(self.api(params), ensure_ascii=False).encode()
+        if path.startswith("/wiki/"):
+            page = self.page(host, path)
+            return ("text/html; charset=utf-8", page.encode()) if page is not None else None
+        if path.startswith("/media/") and self.any_image:
+            return "image/png", self.any_image.read_bytes()
+        return None
+
+# ------------------ conditions ------------------
+class Conditions:
+    """Injected latency, failures, rate limiting and bandwidth caps."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 max_rps=0.0, retry_after=1, bandwidth=0.0, seed=None):
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.bandwidth = bandwidth * 1024   # bytes per second, 0 = unlimited
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = max_rps
+        self.refilled = time.monotonic()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency + jitter))
+
+    def failure(self):
+        """(status, headers) to answer with instead of the page, or None."""
+        with self.lock:
+            if self.max_rps:
+                now = time.monotonic()
+                self.tokens = min(self.max_rps,
+                                  self.tokens + (now - self.refilled) * self.max_rps)
+                self.refilled = now
+                if self.tokens < 1:
+                    return 429, {"Retry-After": str(self.retry_after)}
+                self.tokens -= 1
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429, {"Retry-After": str(self.retry_after)}
+        if roll < self.throttle_rate + self.error_rate:
+            return (500 if roll * 1000 % 2 < 1 else 503), {}
+        return None
+
+    def send(self, wfile, body):
+        """Write body, paced to the bandwidth cap."""
+        if not self.bandwidth:
+            wfile.write(body)
+            return
+        chunk = max(1024, int(self.bandwidth / 20))     # ~20 writes a second
+        started = time.monotonic()
+        for sent in range(0, len(body), chunk):
+            wfile.write(body[sent:sent + chunk])
+            ahead = (sent + chunk) / self.bandwidth - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+# ------------------ server ----------------------
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    sources = []                        # Recordings / Synthetic, set in main()
+    conditions = Conditions()
+    stats = Counter()
+    stats_lock = threading.Lock()
+
+    def count(self, **fields):
+        with self.stats_lock:
+            self.stats.update(fields)
+
+    def respond(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.conditions.send(self.wfile, body)
+        self.count(**{"requests": 1, f"status_{status}": 1, "bytes": len(body)})
+
+    def replay(self, body=None):
+        url = urlparse(self.path)
+        if url.path == "/_stats":
+            with self.stats_lock:
+                payload = json.dumps(dict(self.stats)).encode()
+            self.respond(200, "application/json", payload)
+            return
+        self.conditions.delay()
+        failure = self.conditions.failure()
+        if failure:
+            status, headers = failure
+            self.respond(status, "text/html", f"<h1>{status}</h1>".encode(), headers)
+            return
+        host = self.headers.get("X-Forwarded-Host") or BULBAPEDIA
+        for source in self.sources:
+            found = (source.lookup(host, url.path, url.query, body)
+                     if isinstance(source, Synthetic) else source.lookup(host, url.path, url.query))
+            if found:
+                self.count(**{type(source).__name__.lower(): 1})
+                self.respond(200, *found)
+                return
+        self.count(missing=1)
+        self.respond(404, "text/html", b"<h1>Not recorded</h1>")
+
+    def do_GET(self):
+        self.replay()
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.replay(self.rfile.read(length).decode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass                            # thousands of requests; see /_stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded pages for the scrapers")
+    parser.add_argument("port", nargs="?", type=int, default=8800)
+    parser.add_argument("--store", default="cache", help="content store directory to replay")
+    parser.add_argument("--synthetic", action="store_true",
+                        help=f"build unrecorded pages from {FIXTURES}/")
+    parser.add_argument("--latency", type=float, default=0, help="ms before each response")
+    parser.add_argument("--jitter", type=float, default=0, help="± ms around --latency")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction answered 500/503")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="fraction answered 429")
+    parser.add_argument("--max-rps", type=float, default=0,
+                        help="answer 429 above this many requests a second")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    parser.add_argument("--bandwidth", type=float, default=0, help="KB/s per response")
+    parser.add_argument("--seed", type=int, help="make the injected failures repeatable")
+    args = parser.parse_args()
+
+    recordings = Recordings(args.store)
+    ReplayHandler.sources = [recordings] + ([Synthetic()] if args.synthetic else [])
+    ReplayHandler.conditions = Conditions(args.latency, args.jitter, args.error_rate,
+                                          args.throttle_rate, args.max_rps, args.retry_after,
+                                          args.bandwidth, args.seed)
+    print(f"Replaying {len(recordings.bodies)} recorded responses and "
+          f"{len(recordings.images)} images" + (" (plus synthetic pages)" if args.synthetic else ""))
+    server = ThreadingHTTPServer(("localhost", args.port), ReplayHandler)
+    print(f"Replay server at http://localhost:{args.port} (stats at /_stats)")
+    started = time.monotonic()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+    elapsed = time.monotonic() - started
+    stats = ReplayHandler.stats
+    print(f"\n{stats['requests']} requests, {stats['bytes'] / 1e6:.1f} MB in {elapsed:.0f} s")
+    for key, value in sorted(stats.items()):
+        print(f"  {key:16s} {value}")
+
+if __name__ == "__main__":
+    main()
@@ -8,67 +8,73 @@ for Pokémon Japanese flashcards.
 Outputs:
   • pokemon_base_<start>_<end>.json
   • name_origins_<start>_<end>.json
+  • the base / origins layers of dataset.sqlite (see dataset_store.py)
 
 Example:
     python scrape_pokemon_flashcards.py 1 12
+    python scrape_pokemon_flashcards.py 1 1025 --workers 8 --batch
 """
 
-import sys, json, time, random, re, pathlib, requests, urllib
+import sys, json, time, random, re, pathlib, requests, urllib, argparse
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote
 from bs4 import BeautifulSoup
 from json.decoder import JSONDecodeError
 
+import http_client
+import instrument
+from content_store import default_store
+from dataset_store import DatasetStore
+
 BASE  = "https://bulbapedia.bulbagarden.net"
 API   = BASE + "/w/api.php"
 LIST  = BASE + "/wiki/List_of_Japanese_Pok%C3%A9mon_names"
 HEAD  = { "User-Agent": "PokemonFlashcardsBot/0.3 (contact@example.com)" }
 JP_CHARS = r"[一-龯ぁ-んァ-ヶ]"
-
-CACHE = pathlib.Path("cache")
-CACHE.mkdir(exist_ok=True)
-
-def cfile(name: str) -> pathlib.Path:
-    return CACHE / name
-
-def wait(): time.sleep(0.3)
+MASTER_INDEX = "master_index.json"  # parsed list.html, see master_index()
+MASTER_FIELDS = ("ndex", "english", "kanaName", "hepburnName", "publishedName",
+                 "imageUrl", "link", "jpPage")
 
 # ------------------ robust API ------------------
 def api_json(params, *, cache=None, retries=3):
-    path = cfile(cache) if cache else None
-    if path and path.exists():
-        return json.loads(path.read_text(encoding="utf-8"))
+    store = default_store()
+    cached = store.get(cache) if cache else None
+    if cached is not None:
+        return json.loads(cached)
 
     for _ in range(retries):
-        wait()
-        resp = requests.get(API, params=params, headers=HEAD, timeout=20)
         try:
+            resp = http_client.get(API, params=params, headers=HEAD)
             data = resp.json()
-        except JSONDecodeError:
+        except JSONDecodeError:     # HTML error page instead of JSON
             time.sleep(5 + random.random())
             continue
+        except requests.exceptions.RequestException as exc:
+            print("API request failed for", params.get("page"), exc)
+            return None
         if "error" in data:
             print("API error", data["error"].get("code"), "for", params.get("page"))
             return None
-        if path:
-            path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        if cache:
+            store.put(cache, json.dumps(data, ensure_ascii=False), url=resp.url)
         return data
     return None
 
 # ------------------ master list -----------------
 def list_html() -> str:
-    p = cfile("list.html")
-    if p.exists():
-        return p.read_text(encoding="utf-8")
-    wait()
-    html = requests.get(LIST, headers=HEAD, timeout=20).text
-    p.write_text(html, encoding="utf-8")
+    store = default_store()
+    html = store.get("list.html")
+    if html is not None:
+        return html
+    html = http_client.get(LIST, headers=HEAD).text
+    store.put("list.html", html, url=LIST)
     return html
 
-def parse_master(start: int, end: int) -> list[dict]:
-    """Return rows 001 … end_ndex from ALL generation tables."""
-    print("start", start)
-    print("end", end)
-    soup = BeautifulSoup(list_html(), "html.parser")
+@instrument.timed("parse")
+def parse_list(html: str) -> list[tuple]:
+    """Every row of ALL generation tables in list.html, as MASTER_FIELDS tuples."""
+    soup = BeautifulSoup(html, "html.parser")
 
     # collect every table whose header row contains “Ndex”
     tables = [
@@ -77,12 +83,8 @@ def parse_master(start: int, end: int) -> list[dict]:
     ]
 
     rows_out = []
-
-    data= []
     for table in tables:
-
-        rows = table.select("tbody tr")[2:]
-        for tr in rows:
+        for tr in table.select("tbody tr")[2:]:
             td = tr.find_all("td")
             if len(td) < 6:
                 continue
@@ -90,59 +92,64 @@ def parse_master(start: int, end: int) -> list[dict]:
             ndex_txt = re.sub(r"\D", "", td[0].get_text(strip=True))
             if not ndex_txt:
                 continue
-            ndex = int(ndex_txt)
-            if ndex < start:
-                continue
-            if ndex > end:
-                break
 
             img = tr.find("img")
             if not img:
                 continue
             img_url = ("https:" + img["src"]) if img["src"].startswith("//") else img["src"]
 
-            print("td", td)
-
             english    = td[2].get_text(strip=True)   # Bulbasaur
             kana_td    = td[3]
             kana_name  = kana_td.get_text(strip=True)  # フシギダネ
             romaji     = td[4].get_text(strip=True)   # Fushigidane
-            trademark  = td[5].get_text(strip=True)   # same value on Gen-I rowsk
-            print("english", english)
-            print("kana_name", kana_name)
-            print("romaji", romaji)
-            print("trademark", trademark)   
+            trademark  = td[5].get_text(strip=True)   # same value on Gen-I rows
 
             jp_anchor = kana_td.find("a", href=True)
-            print("jp_anchor", jp_anchor)
-
             if jp_anchor and jp_anchor.has_attr("data-url"):
                 jp_page = jp_anchor["data-url"]                # ext-link supplied
-                print("jp_page", jp_page)
             else:
-                kana_q  = urllib.parse.quote(kana_name)
-                jp_page = f"https://wiki.xn--rckteqa2e.com/wiki/{kana_q}"
-                print("jp_page", jp_page)
-
+                jp_page = f"https://wiki.xn--rckteqa2e.com/wiki/{urllib.parse.quote(kana_name)}"
 
             en_anchor = td[1].find("a", href=True)
             en_page   = BASE + en_anchor["href"] if en_anchor else ""
 
+            rows_out.append((int(ndex_txt), english, kana_name, romaji, trademark,
+                             img_url, en_page, jp_page))
 
-            data.append({
-                "ndex": ndex,
-                "english": english,
-                "kanaName": kana_name,
-                "hepburnName": romaji,          # Fushigidane
-                "publishedName": trademark,       # trademarked EN
-                "imageUrl": img_url,
-                "link": en_page,
-                "jpPage": jp_page
-            })
+    rows_out.sort(key=lambda r: r[0])               # stable: table order within an ndex
+    return rows_out
 
+_master = None                  # (list.html sha256, rows, ndexes) for this process
 
-    print("data", data)
-    return data
+def master_index() -> tuple[list[tuple], list[int]]:
+    """
+    Parsed master list, sorted by ndex, plus the ndexes for bisecting.
+    Parsed once per version of list.html and kept in the content store
+    under MASTER_INDEX, tagged with the page's sha256.
+    """
+    global _master
+    store = default_store()
+    source = store.sha256("list.html")
+    if source is None:
+        list_html()                                 # fetch (or import) the page first
+        source = store.sha256("list.html")
+    if _master and _master[0] == source:
+        return _master[1], _master[2]
+
+    cached = store.get(MASTER_INDEX)
+    index = json.loads(cached) if cached else None
+    if not index or index.get("source") != source or index.get("fields") != list(MASTER_FIELDS):
+        index = {"source": source, "fields": MASTER_FIELDS, "rows": parse_list(list_html())}
+        store.put(MASTER_INDEX, json.dumps(index, ensure_ascii=False, separators=(",", ":")))
+    rows = [tuple(r) for r in index["rows"]]
+    _master = (source, rows, [r[0] for r in rows])
+    return rows, _master[2]
+
+def parse_master(start: int, end: int) -> list[dict]:
+    """Return the master-list rows with start <= ndex <= end."""
+    rows, ndexes = master_index()
+    lo, hi = bisect_left(ndexes, start), bisect_right(ndexes, end)
+    return [dict(zip(MASTER_FIELDS, row)) for row in rows[lo:hi]]
 
 # ------------------ Name origin ----------------
 def origin_html(slug: str) -> str:
@@ -159,6 +166,7 @@ def origin_html(slug: str) -> str:
                    cache=f"sec_{slug}_{idx}.json")
     return sec["parse"]["text"] if sec else ""
 
+@instrument.timed("parse")
 def clean_origin(html: str) -> str:
     soup = BeautifulSoup(html, "html.parser")
     paras = [p.get_text(" ", strip=True) for p in soup.find_all("p") if p.get_text(strip=True)]
@@ -168,6 +176,105 @@ def clean_origin(html: str) -> str:
     keep = jp if jp else (paras[:2] if len(paras) > 1 else paras[:1])
     return "  ".join(keep)
 
+# ------------------ batched Name origin -------
+BATCH_TITLES = 50                       # MediaWiki multi-title limit (non-bot)
+HEADING = re.compile(r"^(=+)\s*(.*?)\s*\1\s*$", re.M)
+MARKER  = "@@ORIGIN-{}@@"
+MARKER_RE = re.compile(r"@@ORIGIN-(\d+)@@")
+
+def origin_wikitext(wikitext: str) -> str:
+    """Wikitext of the first "Name origin…" section, subsections included."""
+    heads = list(HEADING.finditer(wikitext))
+    for i, h in enumerate(heads):
+        if h.group(2).lower().startswith("name origin"):
+            level = len(h.group(1))
+            stop = next((n.start() for n in heads[i + 1:] if len(n.group(1)) <= level),
+                        len(wikitext))
+            return wikitext[h.start():stop]
+    return ""
+
+def batch_wikitext(slugs: list[str]) -> dict[str, str]:
+    """Page wikitext for up to BATCH_TITLES slugs in one action=query call."""
+    data = api_json({"action":"query","prop":"revisions","rvprop":"content",
+                     "rvslots":"main","titles":"|".join(slugs),"redirects":1,
+                     "format":"json","formatversion":2})
+    if not data:
+        return {}
+    query = data.get("query", {})
+    alias = {}
+    for m in query.get("normalized", []) + query.get("redirects", []):
+        alias[m["from"]] = m["to"]
+    pages = {}
+    for page in query.get("pages", []):
+        revs = page.get("revisions")
+        if revs:
+            pages[page["title"]] = revs[0]["slots"]["main"]["content"]
+    out = {}
+    for slug in slugs:
+        title = slug
+        while title in alias:
+            title = alias[title]
+        if title in pages:
+            out[slug] = pages[title]
+    return out
+
+def render_sections(sections: list[str], title: str) -> list[str | None]:
+    """
+    Render many wikitext fragments with one action=parse call.  A fragment
+    that could not be rendered (the call failed, or its marker is missing
+    from the output) comes back as None.
+    """
+    text = "\n\n".join(MARKER.format(i) + "\n\n" + sec for i, sec in enumerate(sections))
+    try:
+        resp = http_client.post(API, data={"action":"parse","text":text,"title":title,
+                                           "contentmodel":"wikitext","prop":"text",
+                                           "disablelimitreport":1,"disableeditsection":1,
+                                           "format":"json","formatversion":2},
+                                headers=HEAD)
+        html = resp.json()["parse"]["text"]
+    except (requests.exceptions.RequestException, JSONDecodeError, KeyError) as exc:
+        print("Batch parse failed:", exc)
+        return [None] * len(sections)
+    parts = MARKER_RE.split(html)
+    rendered = [None] * len(sections)
+    for i in range(1, len(parts) - 1, 2):
+        rendered[int(parts[i])] = parts[i + 1]
+    return rendered
+
+def origin_html_batch(slugs: list[str]) -> dict[str, str]:
+    """
+    Name-origin section HTML for many pages.  Pages already cached by
+    origin_html() are served from there; the rest are resolved
+    BATCH_TITLES at a time with one action=query (wikitext) and one
+    action=parse (render) call per batch.
+    """
+    store = default_store()
+    out, todo = {}, []
+    for slug in slugs:
+        key = f"origin_{slug}.html"
+        if f"idx_{slug}.json" in store:
+            out[slug] = origin_html(slug)
+        elif key in store:
+            out[slug] = store.get(key)
+        else:
+            todo.append(slug)
+
+    for i in range(0, len(todo), BATCH_TITLES):
+        chunk = todo[i:i + BATCH_TITLES]
+        wikitext = batch_wikitext(chunk)
+        found = [(slug, origin_wikitext(wikitext[slug])) for slug in chunk if slug in wikitext]
+        found = [(slug, sec) for slug, sec in found if sec]
+        html = render_sections([sec for _, sec in found], found[0][0]) if found else []
+        rendered = dict(zip((slug for slug, _ in found), html))
+        for slug in chunk:
+            section = rendered.get(slug, "")
+            out[slug] = section or ""
+            # only remember pages the API answered for, and never a failed render
+            if slug in wikitext and section is not None:
+                store.put(f"origin_{slug}.html", section, url=API)
+        print(f"Resolved name origins {i + len(chunk)}/{len(todo)}")
+    return out
+
 # ------------------ JP wiki elements ----------
 import re, urllib.parse, pathlib, requests
 from bs4 import BeautifulSoup
@@ -185,18 +292,21 @@ def jp_elements(url: str) -> list[str]:
     if not url:
         return []
 
-    cache = cfile("jp_" + pathlib.Path(url).name + ".html")
-    if cache.exists():
-        html = cache.read_text(encoding="utf-8")
-    else:
+    store = default_store()
+    cache = "jp_" + pathlib.Path(url).name + ".html"
+    html = store.get(cache)
+    if html is None:
         try:
-            wait()
-            html = requests.get(url, headers=HEAD, timeout=15).text  # 15-s hard cap
+            html = http_client.get(url, headers=HEAD, timeout=(5, 15)).text  # 15-s hard cap
         except requests.exceptions.RequestException as exc:
             print("⚠️  JP page fetch failed:", url.split('/')[-1], exc)
             return []               # silently skip this Pokémon
-        cache.write_text(html, encoding="utf-8")
+        store.put(cache, html, url=url)
+    return parse_jp_elements(html)
 
+@instrument.timed("parse")
+def parse_jp_elements(html: str) -> list[str]:
+    """The Japanese name and origin elements from a JP wiki page."""
     soup = BeautifulSoup(html, "html.parser")
 
     # find the heading 「名称と由来」 then the first table after it
@@ -231,29 +341,74 @@ def jp_elements(url: str) -> list[str]:
  
 
 # ------------------ orchestrator -------------
-def scrape(start: int, end: int):
-    base = [r for r in parse_master(start, end) if start <= r["ndex"] <= end]
-    origins = {}
-    for row in base:
-        slug = unquote(pathlib.Path(row["link"]).name)
-        desc = clean_origin(origin_html(slug))
-        elements = jp_elements(row["jpPage"])
-        origins[row["ndex"]] = {
-            "nameOriginDescription": desc,
-            "nameOriginElements": elements
+def row_slug(row: dict) -> str:
+    return unquote(pathlib.Path(row["link"]).name)
+
+def row_origin(row: dict, html: str | None = None) -> dict:
+    with instrument.span("record", "origin", ident=row["ndex"]):
+        if html is None:
+            html = origin_html(row_slug(row))
+        return {
+            "nameOriginDescription": clean_origin(html),
+            "nameOriginElements": jp_elements(row["jpPage"])
         }
+
+def scrape(start: int, end: int, workers: int = 1, batch: bool = False):
+    """
+    Scrape rows start … end.  With workers > 1 the per-row fetches run on a
+    thread pool; http_client's HostThrottle still caps each host, and results are
+    collected in ndex order so the output files are identical.  With batch
+    the name-origin sections are resolved up front via origin_html_batch.
+    """
+    with instrument.span("stage", "master"):
+        base = parse_master(start, end)
+    if batch:
+        with instrument.span("stage", "origin_batch"):
+            by_slug = origin_html_batch([row_slug(r) for r in base])
+        htmls = [by_slug.get(row_slug(r), "") for r in base]
+    else:
+        htmls = [None] * len(base)
+    with instrument.span("stage", "origins"):
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(row_origin, base, htmls))
+        else:
+            results = [row_origin(row, html) for row, html in zip(base, htmls)]
+    origins = {row["ndex"]: res for row, res in zip(base, results)}
     return base, origins
 
 def main():
-    start = int(sys.argv[1]) if len(sys.argv) > 1 else 1
-    end   = int(sys.argv[2]) if len(sys.argv) > 2 else 12
-    base, orig = scrape(start, end)
-    tag = f"{start:04d}_{end:04d}"
-    with open(f"pokemon_base_{tag}.json", "w", encoding="utf-8") as f:
-        json.dump(base, f, ensure_ascii=False, indent=2)
-    with open(f"name_origins_{tag}.json", "w", encoding="utf-8") as f:
-        json.dump(orig, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(base)} Pokémon (Ndex {start}-{end}).")
+    ap = argparse.ArgumentParser(description="Scrape Pokémon flashcard JSON")
+    ap.add_argument("start", nargs="?", type=int, default=1)
+    ap.add_argument("end",   nargs="?", type=int, default=12)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="rows fetched concurrently (default 1 = serial)")
+    ap.add_argument("--per-host", type=int, default=None,
+                    help="override max requests in flight per host")
+    ap.add_argument("--batch", action="store_true",
+                    help="resolve name origins with batched API calls")
+    ap.add_argument("--base-url", help="send requests here instead (replay_server.py)")
+    instrument.add_arguments(ap)
+    args = ap.parse_args()
+    start, end = args.start, args.end
+    if args.base_url:
+        http_client.set_base_url(args.base_url)
+    if args.per_host:
+        http_client.set_host_limit(args.per_host)
+    with instrument.session("scrape_pokemon_flashcards", args):
+        base, orig = scrape(start, end, args.workers, args.batch)
+        tag = f"{start:04d}_{end:04d}"
+        with instrument.span("write", "json"):
+            with open(f"pokemon_base_{tag}.json", "w", encoding="utf-8") as f:
+                json.dump(base, f, ensure_ascii=False, indent=2)
+            with open(f"name_origins_{tag}.json", "w", encoding="utf-8") as f:
+                json.dump(orig, f, ensure_ascii=False, indent=2)
+        with instrument.span("write", "dataset_store"):
+            store = DatasetStore()                   # pipeline.py picks these up
+            store.put_rows("base", {r["ndex"]: r for r in base})
+            store.put_rows("origins", orig)
+            store.close()
+        print(f"Saved {len(base)} Pokémon (Ndex {start}-{end}).")
 
 if __name__ == "__main__":
     main()
@@ -2,6 +2,16 @@
 let pokemonData = [];
 let originsData = {};
 let tcgTypesData = {};
+let cards = []; // card objects in ndex order, from bundle/ (build_bundle.py) or joined here
+let spriteManifest = null; // images/atlas/manifest.json from build_sprites.py, if built
+
+// Local TTS server (tts_server.py); falls back to speechSynthesis when unreachable
+const TTS_SERVER = 'http://localhost:3000';
+let ttsServerAvailable = null; // null = untested, false after the first failure
+const ttsClientId = Math.random().toString(36).slice(2); // lets the server drop superseded requests
+let currentAudio = null;
+let ttsManifest = null; // tts_cache/manifest.json from prerender_tts.py, if rendered
+let searchIndex = null; // search_index.json from search_index.py, if built
 
 // Global variables for mobile navigation
 let navigateToCard = null;
@@ -42,257 +52,35 @@ window.addEventListener('resize', () => {
     mobileDetectionCache = null;
 });
 
-// Function to add furigana readings to kanji
-function addFurigana(text) {
-    // Simple kanji to reading mappings for common characters
-    const kanjiReadings = {
-        '火': 'ひ',
-        '水': 'みず',
-        '土': 'つち',
-        '木': 'き',
-        '金': 'かね',
-        '石': 'いし',
-        '草': 'くさ',
-        '花': 'はな',
-        '葉': 'は',
-        '根': 'ね',
-        '種': 'たね',
-        '実': 'み',
-        '果': 'か',
-        '森': 'もり',
-        '林': 'はやし',
-        '山': 'やま',
-        '川': 'かわ',
-        '海': 'うみ',
-        '空': 'そら',
-        '風': 'かぜ',
-        '雷': 'かみなり',
-        '雪': 'ゆき',
-        '氷': 'こおり',
-        '炎': 'ほのお',
-        '光': 'ひかり',
-        '影': 'かげ',
-        '音': 'おと',
-        '声': 'こえ',
-        '目': 'め',
-        '口': 'くち',
-        '手': 'て',
-        '足': 'あし',
-        '心': 'こころ',
-        '力': 'ちから',
-        '技': 'わざ',
-        '術': 'じゅつ',
-        '道': 'みち',
-        '学': 'がく',
-        '文': 'ぶん',
-        '字': 'じ',
-        '語': 'ご',
-        '言': 'こと',
-        '話': 'はなし',
-        '聞': 'き',
-        '見': 'み',
-        '知': 'し',
-        '思': 'おも',
-        '考': 'かんが',
-        '覚': 'おぼ',
-        '忘': 'わす',
-        '記': 'き',
-        '憶': 'おく',
-        '想': 'そう',
-        '念': 'ねん',
-        '意': 'い',
-        '志': 'こころざ',
-        '願': 'ねが',
-        '望': 'のぞ',
-        '夢': 'ゆめ',
-        '現': 'あらわ',
-        '実': 'じつ',
-        '真': 'ま',
-        '正': 'ただ',
-        '確': 'たし',
-        '定': 'さだ',
-        '決': 'き',
-        '断': 'だん',
-        '判': 'はん',
-        '別': 'べつ',
-        '分': 'わ',
-        '解': 'かい',
-        '明': 'あか',
-        '暗': 'くら',
-        '新': 'あたら',
-        '古': 'ふる',
-        '大': 'おお',
-        '小': 'ちい',
-        '高': 'たか',
-        '低': 'ひく',
-        '長': 'なが',
-        '短': 'みじか',
-        '広': 'ひろ',
-        '狭': 'せま',
-        '深': 'ふか',
-        '浅': 'あさ',
-        '重': 'おも',
-        '軽': 'かる',
-        '強': 'つよ',
-        '弱': 'よわ',
-        '速': 'はや',
-        '遅': 'おそ',
-        '早': 'はや',
-        '晩': 'ばん',
-        '朝': 'あさ',
-        '昼': 'ひる',
-        '夜': 'よる',
-        '今': 'いま',
-        '昔': 'むかし',
-        '未来': 'みらい',
-        '過去': 'かこ',
-        '現在': 'げんざい',
-        '時間': 'じかん',
-        '時': 'とき',
-        '分': 'ふん',
-        '秒': 'びょう',
-        '年': 'とし',
-        '月': 'つき',
-        '日': 'ひ',
-        '週': 'しゅう',
-        '曜': 'よう',
-        '季節': 'きせつ',
-        '春': 'はる',
-        '夏': 'なつ',
-        '秋': 'あき',
-        '冬': 'ふゆ',
-        '天': 'てん',
-        '地': 'ち',
-        '人': 'ひと',
-        '物': 'もの',
-        '事': 'こと',
-        '場': 'ば',
-        '所': 'ところ',
-        '方': 'かた',
-        '辺': 'へん',
-        '中': 'なか',
-        '外': 'そと',
-        '内': 'うち',
-        '上': 'うえ',
-        '下': 'した',
-        '前': 'まえ',
-        '後': 'うしろ',
-        '左': 'ひだり',
-        '右': 'みぎ',
-        '東': 'ひがし',
-        '西': 'にし',
-        '南': 'みなみ',
-        '北': 'きた',
-        '中央': 'ちゅうおう',
-        '中心': 'ちゅうしん',
-        '周': 'まわ',
-        '回': 'まわ',
-        '転': 'ころ',
-        '動': 'うご',
-        '静': 'しず',
-        '止': 'と',
-        '進': 'すす',
-        '退': 'しりぞ',
-        '来': 'き',
-        '去': 'さ',
-        '帰': 'かえ',
-        '出': 'で',
-        '入': 'はい',
-        '開': 'ひら',
-        '閉': 'し',
-        '始': 'はじ',
-        '終': 'お',
-        '続': 'つづ',
-        '続': 'つづ',
-        '変': 'か',
-        '化': 'か',
-        '成': 'な',
-        '立': 'た',
-        '建': 'たて',
-        '作': 'つく',
-        '造': 'つく',
-        '生': 'う',
-        '産': 'う',
-        '育': 'そだ',
-        '養': 'やしな',
-        '教': 'おし',
-        '習': 'なら',
-        '練': 'ね',
-        '修': 'しゅう',
-        '研': 'けん',
-        '究': 'きゅう',
-        '発': 'はつ',
-        '見': 'み',
-        '発見': 'はっけん',
-        '発明': 'はつめい',
-        '創造': 'そうぞう',
-        '制作': 'せいさく',
-        '生産': 'せいさん',
-        '製造': 'せいぞう',
-        '開発': 'かいはつ',
-        '設計': 'せっけい',
-        '計画': 'けいかく',
-        '準備': 'じゅんび',
-        '実行': 'じっこう',
-        '実現': 'じつげん',
-        '完成': 'かんせい',
-        '成功': 'せいこう',
-        '失敗': 'しっぱい',
-        '勝利': 'しょうり',
-        '敗北': 'はいぼく',
-        '戦': 'たたか',
-        '闘': 'たたか',
-        '競': 'きそ',
-        '争': 'あらそ',
-        '勝': 'か',
-        '負': 'ま',
-        '勝負': 'しょうぶ',
-        '試合': 'しあい',
-        '試練': 'しれん',
-        '挑戦': 'ちょうせん',
-        '挑': 'いど',
-        '戦': 'せん',
-        '闘': 'とう',
-        '競': 'きょう',
-        '争': 'そう',
-        '勝': 'しょう',
-        '負': 'ふ',
-        '試': 'し',
-        '練': 'れん',
-        '挑': 'ちょう',
-        '戦': 'せん',
-        '闘': 'とう',
-        '競': 'きょう',
-        '争': 'そう',
-        '勝': 'しょう',
-        '負': 'ふ',
-        '試': 'し',
-        '練': 'れん',
-        '挑': 'ちょう'
-    };
-    
-    // Add furigana to kanji characters
-    let result = text;
-    for (const [kanji, reading] of Object.entries(kanjiReadings)) {
-        if (result.includes(kanji)) {
-            // Replace kanji with reading for speech synthesis
-            result = result.replace(new RegExp(kanji, 'g'), reading);
-        }
+// Play audio pre-rendered by prerender_tts.py, or rendered and cached by tts_server.py
+function playServerAudio(text, lang) {
+    if (currentAudio) {
+        currentAudio.pause();
     }
-    
-    return result;
+    const prerendered = ttsManifest?.audio?.[lang]?.[text];
+    const params = new URLSearchParams({ text, lang, client: ttsClientId });
+    currentAudio = new Audio(prerendered ? `tts_cache/${prerendered}` : `${TTS_SERVER}/speak?${params}`);
+    return currentAudio.play();
 }
 
 // Simple speech synthesis function that works better in Firefox
 function speakText(text, lang = 'ja-JP') {
     console.log('speakText called with:', text, lang);
     
-    // Add furigana readings for kanji if it's Japanese text
-    let textToSpeak = text;
-    if (lang === 'ja-JP') {
-        textToSpeak = addFurigana(text);
-        console.log('Original text:', text);
-        console.log('Text with furigana:', textToSpeak);
+    const prerendered = ttsManifest?.audio?.[lang]?.[text];
+    if (ttsServerAvailable !== false || prerendered) {
+        playServerAudio(text, lang)
+            .then(() => { if (!prerendered) ttsServerAvailable = true; })
+            .catch((error) => {
+                console.log('Audio playback failed, using speech synthesis:', error);
+                if (prerendered) {
+                    delete ttsManifest.audio[lang][text];
+                } else {
+                    ttsServerAvailable = false;
+                }
+                speakText(text, lang);
+            });
+        return;
     }
     
     if ('speechSynthesis' in window) {
@@ -301,7 +89,7 @@ function speakText(text, lang = 'ja-JP') {
         // Stop any currently speaking
         window.speechSynthesis.cancel();
         
-        const utterance = new SpeechSynthesisUtterance(textToSpeak);
+        const utterance = new SpeechSynthesisUtterance(text);
         utterance.lang = lang;
         utterance.rate = 0.8;
         utterance.pitch = 1.0;
@@ -349,7 +137,7 @@ function speakText(text, lang = 'ja-JP') {
             // If Japanese failed, try with English
             if (lang === 'ja-JP' && event.error !== 'canceled') {
                 console.log('Japanese failed, trying English fallback...');
-                const englishUtterance = new SpeechSynthesisUtterance(textToSpeak);
+                const englishUtterance = new SpeechSynthesisUtterance(text);
                 englishUtterance.lang = 'en-US';
                 englishUtterance.rate = 0.8;
                 englishUtterance.pitch = 1.0;
@@ -419,49 +207,97 @@ function showTTSNotAvailable() {
     }, 5000);
 }
 
+// Cards from the prebuilt bundle when there is one: the first shard is
+// enough for the first sheets, the rest arrive in the background.
+// Without a bundle, fetch the three source files and join them here.
+async function loadCards() {
+    const index = await fetch('bundle/index.json')
+        .then(response => response.ok ? response.json() : null)
+        .catch(() => null);
+    if (index && index.shards.length) {
+        const shard = s => fetch(`bundle/${s.file}`).then(response => {
+            if (!response.ok) throw new Error(`${s.file}: ${response.status}`);
+            return response.json();
+        });
+        const first = await shard(index.shards[0]);
+        const rest = index.shards.length > 1
+            ? Promise.all(index.shards.slice(1).map(shard)).then(parts => parts.flat())
+            : null;
+        return { first, rest };
+    }
+    
+    const [pokemonResponse, originsResponse, tcgTypesResponse] = await Promise.all([
+        fetch('pokemon_base_0001_1025_with_tcg_types.json'),
+        fetch('name_origins_0001_1025_furigana.json'),
+        fetch('tcg_types_info.json')
+    ]);
+    
+    pokemonData = await pokemonResponse.json();
+    originsData = await originsResponse.json();
+    tcgTypesData = await tcgTypesResponse.json();
+    
+    // Transform data to match the expected format (build_bundle.py's make_card does the same)
+    const joined = pokemonData.map(pokemon => {
+        const origin = originsData[pokemon.ndex] || {};
+        const elements = origin.nameOriginElements || [];
+        const tcgType = pokemon.tcg_type || 'Colorless';
+        const tcgTypeInfo = tcgTypesData[tcgType] || tcgTypesData['Colorless'];
+        
+        return {
+            id: pokemon.ndex,
+            kana: pokemon.kanaName,
+            hiragana: pokemon.hiragana || pokemon.kanaName, // Use hiragana field
+            pub: pokemon.publishedName,
+            hep: pokemon.hepburnName,
+            english: pokemon.english, // Add English name
+            img: pokemon.imageUrl,
+            jp: elements.slice(1), // Skip the first element (Japanese name)
+            jpRuby: (origin.nameOriginRuby || elements).slice(1), // furigana from furigana.py
+            en: [], // We'll leave this empty for now
+            desc: origin.nameOriginDescription || "",
+            tcgType: tcgType,
+            tcgTypeIcon: tcgTypeInfo?.icon_url || null
+        };
+    });
+    return { first: joined, rest: null };
+}
+
 // Function to load JSON files
 async function loadData() {
     try {
-        const [pokemonResponse, originsResponse, tcgTypesResponse] = await Promise.all([
-            fetch('pokemon_base_0001_1025_with_tcg_types.json'),
-            fetch('name_origins_0001_1025_cleaned.json'),
-            fetch('tcg_types_info.json')
-        ]);
-        
-        pokemonData = await pokemonResponse.json();
-        originsData = await originsResponse.json();
-        tcgTypesData = await tcgTypesResponse.json();
-        
-        // Transform data to match the expected format
-        const cards = pokemonData.map(pokemon => {
-            const origin = originsData[pokemon.ndex] || {};
-            const elements = origin.nameOriginElements || [];
-            const tcgType = pokemon.tcg_type || 'Colorless';
-            const tcgTypeInfo = tcgTypesData[tcgType] || tcgTypesData['Colorless'];
-            
-            const card = {
-                id: pokemon.ndex,
-                kana: pokemon.kanaName,
-                hiragana: pokemon.hiragana || pokemon.kanaName, // Use hiragana field
-                pub: pokemon.publishedName,
-                hep: pokemon.hepburnName,
-                english: pokemon.english, // Add English name
-                img: pokemon.imageUrl,
-                jp: elements.slice(1), // Skip the first element (Japanese name)
-                en: [], // We'll leave this empty for now
-                desc: origin.nameOriginDescription || "",
-                tcgType: tcgType,
-                tcgTypeIcon: tcgTypeInfo?.icon_url || null
-            };
-            
-            return card;
-        });
+        const { first, rest } = await loadCards();
+        cards = first;
+        
+        // Sprite atlases are optional; fall back to individual images without them
+        spriteManifest = await fetch('images/atlas/manifest.json')
+            .then(response => response.ok ? response.json() : null)
+            .catch(() => null);
+        ttsManifest = await fetch('tts_cache/manifest.json')
+            .then(response => response.ok ? response.json() : null)
+            .catch(() => null);
+        searchIndex = await fetch('search_index.json')
+            .then(response => response.ok ? response.json() : null)
+            .then(data => data && prepareSearchIndex(data))
+            .catch(() => null);
         
         console.log('Data transformation complete, cards created:', cards.length);
         
         // Build the flashcards
         buildSheets(cards);
         buildPager();
+        buildSearch();
+        
+        // The first shard is on screen; add the rest without losing the current page
+        if (rest) {
+            rest.then(more => {
+                const page = [...document.querySelectorAll('.sheet')].findIndex(s => !s.classList.contains('hidden'));
+                cards = cards.concat(more);
+                buildSheets(cards);
+                buildPager();
+                if (page > 0 && window.showPage) window.showPage(page);
+                console.log('Remaining shards loaded, cards:', cards.length);
+            }).catch(error => console.error('Error loading card shards:', error));
+        }
         
         // Add resize listener for mobile responsiveness
         window.addEventListener('resize', () => {
@@ -589,9 +425,29 @@ async function loadData() {
     }
 }
 
-const jpFace = c => `<div class='card' data-tcg-type='${c.tcgType}'><div class='card-header'><div class='type-icon'>${c.tcgTypeIcon ? `<img src='${c.tcgTypeIcon}' alt='${c.tcgType}'/>` : ''}</div></div><div class='card-title'><span class='english-name'>${c.english}</span><span class='japanese-name'>${c.pub} (${c.kana})<button class='speak-btn' onclick='speakText("${c.kana}", "ja-JP")' title='Speak'>🔊</button></span></div><div class='line'></div><div class='image-box'><div class='frame'><img src='${c.img}' alt='${c.kana}'/></div></div><div class='section'>日本語で名前の意味</div><div class='content'>${c.jp.map(t=>`<p>・${t}</p>`).join('')}</div></div>`;
+const supportsWebp = document.createElement('canvas').toDataURL('image/webp').startsWith('data:image/webp');
+
+// Draw an image from its sprite atlas when build_sprites.py has packed it.
+// It stays an <img> (a blank one with the sprite's own size) so the .frame
+// and .type-icon img rules still size it, and the atlas is positioned and
+// scaled in percentages so the sprite follows whatever size they give it.
+function imageHTML(src, alt) {
+    const file = src ? src.split('/').pop() : '';
+    const placed = spriteManifest && spriteManifest.images[file];
+    if (!placed) {
+        return `<img src='${src}' alt='${alt}'/>`;
+    }
+    const [atlasIndex, x, y, w, h] = placed;
+    const atlas = spriteManifest.atlases[atlasIndex];
+    const url = (supportsWebp && atlas.webp) || atlas.png;
+    const blank = 'data:image/svg+xml,' + encodeURIComponent(`<svg xmlns="http://www.w3.org/2000/svg" width="${w}" height="${h}"/>`);
+    const percent = (offset, size, total) => total > size ? offset / (total - size) * 100 : 0;
+    return `<img class='sprite' src='${blank}' alt='${alt}' style='background-image:url("${url}");background-size:${atlas.w / w * 100}% ${atlas.h / h * 100}%;background-position:${percent(x, w, atlas.w)}% ${percent(y, h, atlas.h)}%'/>`;
+}
+
+const jpFace = c => `<div class='card' data-tcg-type='${c.tcgType}'><div class='card-header'><div class='type-icon'>${c.tcgTypeIcon ? `${imageHTML(c.tcgTypeIcon, c.tcgType)}` : ''}</div></div><div class='card-title'><span class='english-name'>${c.english}</span><span class='japanese-name'>${c.pub} (${c.kana})<button class='speak-btn' onclick='speakText("${c.kana}", "ja-JP")' title='Speak'>🔊</button></span></div><div class='line'></div><div class='image-box'><div class='frame'>${imageHTML(c.img, c.kana)}</div></div><div class='section'>日本語で名前の意味</div><div class='content'>${(c.jpRuby || c.jp).map(t=>`<p>・${t}</p>`).join('')}</div></div>`;
 
-const enFace = c => `<div class='card' data-tcg-type='${c.tcgType}'><div class='card-header'><div class='type-icon'>${c.tcgTypeIcon ? `<img src='${c.tcgTypeIcon}' alt='${c.tcgType}'/>` : ''}</div></div><div class='card-title'><span class='english-name'>${c.english}</span><span class='japanese-name'>${c.pub} (${c.kana})<button class='speak-btn' onclick='speakText("${c.pub}", "ja-JP")' title='Speak'>🔊</button></span></div><div class='line'></div><div class='image-box'><div class='frame'><img src='${c.img}' alt='${c.english}'/></div></div><div class='section'>Name Origin</div><div class='content'>${c.en.map(t=>`<p>・${t}</p>`).join('')}<p style='margin-top:6px'>${c.desc}</p><p style='margin-top:6px'><strong>English:</strong> ${c.english}</p></div></div>`;
+const enFace = c => `<div class='card' data-tcg-type='${c.tcgType}'><div class='card-header'><div class='type-icon'>${c.tcgTypeIcon ? `${imageHTML(c.tcgTypeIcon, c.tcgType)}` : ''}</div></div><div class='card-title'><span class='english-name'>${c.english}</span><span class='japanese-name'>${c.pub} (${c.kana})<button class='speak-btn' onclick='speakText("${c.pub}", "ja-JP")' title='Speak'>🔊</button></span></div><div class='line'></div><div class='image-box'><div class='frame'>${imageHTML(c.img, c.english)}</div></div><div class='section'>Name Origin</div><div class='content'>${c.en.map(t=>`<p>・${t}</p>`).join('')}<p style='margin-top:6px'>${c.desc}</p><p style='margin-top:6px'><strong>English:</strong> ${c.english}</p></div></div>`;
 
 function buildSheets(cards) {
     const container = document.getElementById('sheets');
@@ -692,6 +548,12 @@ function buildPager() {
         return html;
     }
     
+    // Let search results jump straight to a page
+    window.showPage = (page) => {
+        current = Math.max(0, Math.min(totalPages - 1, page));
+        render();
+    };
+    
     const render = () => {
         sheets.forEach((s, i) => s.classList.toggle('hidden', i !== current));
         pager.innerHTML = generatePaginationHTML(current, totalPages);
@@ -734,6 +596,112 @@ function buildPager() {
     render();
 }
 
+// ---- Search (same normalization and matching as search_index.py) ----
+const MACRONS = { 'ā': 'a', 'ī': 'i', 'ū': 'u', 'ē': 'e', 'ō': 'o', 'Ā': 'A', 'Ī': 'I', 'Ū': 'U',
+                  'Ē': 'E', 'Ō': 'O', 'â': 'a', 'î': 'i', 'û': 'u', 'ê': 'e', 'ô': 'o' };
+
+function normalizeSearch(text) {
+    return text.normalize('NFKC')
+        .replace(/[\u30a1-\u30f6\u30fd\u30fe]/g, ch => String.fromCharCode(ch.charCodeAt(0) - 0x60))
+        .replace(/[āīūēōĀĪŪĒŌâîûêô]/g, ch => MACRONS[ch])
+        .toLowerCase()
+        .trim();
+}
+
+function prepareSearchIndex(data) {
+    const grams = new Map(); // bigram (or non-ASCII character) -> term ids
+    data.terms.forEach((term, id) => {
+        const own = new Set();
+        for (let i = 0; i < term.length - 1; i++) own.add(term.slice(i, i + 2));
+        for (const ch of term) if (ch.charCodeAt(0) > 0x7f) own.add(ch);
+        own.forEach(g => {
+            if (!grams.has(g)) grams.set(g, []);
+            grams.get(g).push(id);
+        });
+    });
+    return { terms: data.terms, postings: data.postings, grams };
+}
+
+function searchCards(text, limit = 10) {
+    const query = normalizeSearch(text);
+    if (!searchIndex || !query) return [];
+    const { terms, postings, grams } = searchIndex;
+    
+    // prefix: binary search for the first term >= query
+    let lo = 0, hi = terms.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (terms[mid] < query) lo = mid + 1; else hi = mid;
+    }
+    const prefix = [];
+    for (let i = lo; i < terms.length && terms[i].startsWith(query); i++) prefix.push(i);
+    const exact = prefix.filter(i => terms[i] === query);
+    
+    // substring: intersect gram lists, then verify
+    let substring = [];
+    if (query.length === 1) {
+        substring = grams.get(query) || [];
+    } else {
+        const lists = [];
+        for (let i = 0; i < query.length - 1; i++) lists.push(grams.get(query.slice(i, i + 2)) || []);
+        lists.sort((a, b) => a.length - b.length);
+        let candidates = new Set(lists[0]);
+        lists.slice(1).forEach(ids => {
+            const keep = new Set(ids);
+            candidates = new Set([...candidates].filter(id => keep.has(id)));
+        });
+        substring = [...candidates].filter(id => terms[id].includes(query));
+    }
+    
+    const ranked = [];
+    const seen = new Set();
+    for (const ids of [exact, prefix, substring]) {
+        const ndexes = [...new Set(ids.flatMap(id => postings[id]))]
+            .filter(n => !seen.has(n))
+            .sort((a, b) => a - b);
+        for (const n of ndexes) {
+            seen.add(n);
+            ranked.push(n);
+            if (ranked.length >= limit) return ranked;
+        }
+    }
+    return ranked;
+}
+
+function jumpToCard(ndex) {
+    const index = cards.findIndex(c => c.id === ndex);
+    if (index < 0) return;
+    if (isMobileDevice()) {
+        if (window.navigateToCard) window.navigateToCard(index * 2); // two faces per card
+    } else if (window.showPage) {
+        window.showPage(Math.floor(index / 4)); // four cards per sheet
+    }
+}
+
+function buildSearch() {
+    const box = document.getElementById('search');
+    if (!box || !searchIndex || box.dataset.ready) return;
+    box.dataset.ready = 'true';
+    box.hidden = false;
+    const input = box.querySelector('input');
+    const results = box.querySelector('ul');
+    
+    input.addEventListener('input', () => {
+        const byNdex = new Map(cards.map(c => [c.id, c]));
+        results.innerHTML = searchCards(input.value).filter(n => byNdex.has(n)).map(n => {
+            const c = byNdex.get(n);
+            return `<li><button data-ndex='${n}'>${String(n).padStart(4, '0')} ${c.english} ${c.kana}</button></li>`;
+        }).join('');
+    });
+    results.addEventListener('click', (e) => {
+        const button = e.target.closest('button');
+        if (!button) return;
+        jumpToCard(parseInt(button.dataset.ndex));
+        results.innerHTML = '';
+        input.value = '';
+    });
+}
+
 // Initialize speech synthesis
 function initSpeechSynthesis() {
     console.log('Initializing speech synthesis...');
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+search_index.py - prebuilt search index over names, readings and origins
+
+Indexes every card under its english name, kana name (folded to
+hiragana, so either script matches), Hepburn and published names
+(macrons folded: "fushigiso" finds Fushigisō) and each nameOriginElements
+entry (不思議 finds Bulbasaur, Ivysaur and Venusaur; 火 finds every
+origin with 火 in it).
+
+search_index.json holds the sorted normalized terms and, for each, the
+ndexes it belongs to:
+
+    {"version": 1, "terms": ["ふしぎ", ...], "postings": [[1, 2, 3], ...]}
+
+Prefix queries bisect the sorted terms; substring queries intersect a
+bigram (and, for kana/kanji, unigram) index built from the terms at load
+time, so the file stays small and script.js builds the same index.
+
+Usage:
+    python search_index.py build
+    python search_index.py query 不思議 [--limit 10]
+    python search_index.py bench
+"""
+
+import argparse
+import bisect
+import json
+import time
+from collections import defaultdict
+
+import kana
+
+POKEMON_JSON = "pokemon_base_0001_1025_with_tcg_types.json"
+ORIGINS_JSON = "name_origins_0001_1025_cleaned.json"
+INDEX_JSON = "search_index.json"
+NAME_FIELDS = ("english", "kanaName", "hiragana", "hepburnName", "publishedName")
+
+def normalize(text: str) -> str:
+    """Query/term form: NFKC, katakana -> hiragana, macrons folded, lower case."""
+    return kana.fold_macrons(kana.to_hiragana(text)).lower().strip()
+
+def grams(term: str) -> set[str]:
+    """Bigrams of a term, plus single characters outside ASCII (kana, kanji)."""
+    out = {term[i:i + 2] for i in range(len(term) - 1)}
+    out.update(ch for ch in term if ord(ch) > 0x7F)
+    return out
+
+def build(pokemon_json: str = POKEMON_JSON, origins_json: str = ORIGINS_JSON) -> dict:
+    with open(pokemon_json, "r", encoding="utf-8") as f:
+        pokemon = json.load(f)
+    with open(origins_json, "r", encoding="utf-8") as f:
+        origins = json.load(f)
+    postings = defaultdict(set)
+    for p in pokemon:
+        ndex = p["ndex"]
+        values = [p.get(field) for field in NAME_FIELDS]
+        values += origins.get(str(ndex), {}).get("nameOriginElements", [])
+        for value in values:
+            term = normalize(value) if value else ""
+            if term:
+                postings[term].add(ndex)
+    terms = sorted(postings)
+    return {"version": 1, "terms": terms, "postings": [sorted(postings[t]) for t in terms]}
+
+class SearchIndex:
+    def __init__(self, data: dict):
+        self.terms = data["terms"]
+        self.postings = data["postings"]
+        self.grams = defaultdict(list)      # gram -> term ids
+        for i, term in enumerate(self.terms):
+            for g in grams(term):
+                self.grams[g].append(i)
+
+    @classmethod
+    def load(cls, path: str = INDEX_JSON) -> "SearchIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def prefix(self, query: str) -> list[int]:
+        """Ids of terms starting with an already-normalized query."""
+        i = bisect.bisect_left(self.terms, query)
+        out = []
+        while i < len(self.terms) and self.terms[i].startswith(query):
+            out.append(i)
+            i += 1
+        return out
+
+    def substring(self, query: str) -> list[int]:
+        """Ids of terms containing an already-normalized query."""
+        if len(query) == 1:
+            return list(self.grams.get(query, ()))
+        lists = sorted((self.grams.get(query[i:i + 2], ()) for i in range(len(query) - 1)),
+                       key=len)
+        if not lists[0]:
+            return []
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            candidates.intersection_update(ids)
+            if not candidates:
+                return []
+        return sorted(i for i in candidates if query in self.terms[i])
+
+    def search(self, text: str, limit: int = 20) -> list[int]:
+        """ndexes matching text: exact terms first, then prefixes, then substrings."""
+        query = normalize(text)
+        if not query:
+            return []
+        prefix = self.prefix(query)
+        exact = [i for i in prefix if self.terms[i] == query]
+        ranked = []
+        seen = set()
+        for ids in (exact, prefix, self.substring(query)):
+            for ndex in sorted({n for i in ids for n in self.postings[i]} - seen):
+                seen.add(ndex)
+                ranked.append(ndex)
+                if len(ranked) >= limit:
+                    return ranked
+        return ranked
+
+def main():
+    ap = argparse.ArgumentParser(description="Build and query the card search index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build", help=f"write {INDEX_JSON}")
+    q = sub.add_parser("query", help="print matching cards")
+    q.add_argument("text")
+    q.add_argument("--limit", type=int, default=20)
+    sub.add_parser("bench", help="time a set of typical queries")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        data = build()
+        with open(INDEX_JSON, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"Indexed {len(data['terms'])} terms; saved to {INDEX_JSON}")
+        return
+
+    index = SearchIndex.load()
+    if args.cmd == "query":
+        with open(POKEMON_JSON, "r", encoding="utf-8") as f:
+            names = {p["ndex"]: p for p in json.load(f)}
+        started = time.perf_counter()
+        hits = index.search(args.text, args.limit)
+        elapsed = time.perf_counter() - started
+        for ndex in hits:
+            p = names[ndex]
+            print(f"{ndex:04d} {p['english']} {p['kanaName']} {p['hepburnName']}")
+        print(f"{len(hits)} results in {elapsed * 1e3:.3f} ms")
+    else:
+        queries = ["pika", "ピカ", "ぴか", "fushigiso", "不思議", "火", "dragon", "saur",
+                   "チュウ", "ōn", "z", "リザ"]
+        rounds = 200
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for text in queries:
+                index.search(text)
+        per_query = (time.perf_counter() - started) / (rounds * len(queries))
+        print(f"{per_query * 1e6:.1f} µs/query over {len(queries)} queries")
+
+if __name__ == "__main__":
+    main()
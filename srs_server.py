@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Spaced-repetition server for the flashcards
+Schedules reviews of cards (by ndex) per learner with SM-2
+
+Review history and each card's current state (ease, interval, due time)
+live in srs.sqlite.  Each learner's due times are also kept in an
+in-memory min-heap, so "next card" is a heap peek rather than a query over
+the whole history; reviews arrive in batches and are written in one
+transaction.
+
+Endpoints:
+    GET  /next?learner=NAME[&count=1]   -> {"cards": [ndex, ...], "next_due": ts}
+    POST /review {"learner": NAME, "reviews": [{"ndex": 25, "grade": 4, "ts": ...}]}
+    GET  /stats?learner=NAME            -> counts of new, learning and due cards
+
+Grades are SM-2's 0-5 (below 3 counts as forgotten).  Cards never seen
+are introduced in ndex order, at most --new-per-day a day.
+
+Usage:
+    python srs_server.py [port] [--db srs.sqlite] [--new-per-day 20]
+    python srs_server.py --bench [--learners 20] [--years 3]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+DAY = 86400
+DECK_JSON = 'pokemon_base_0001_1025.json'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    learner  TEXT    NOT NULL,
+    ndex     INTEGER NOT NULL,
+    ease     REAL    NOT NULL,
+    interval REAL    NOT NULL,      -- days
+    reps     INTEGER NOT NULL,      -- successful reviews in a row
+    lapses   INTEGER NOT NULL,
+    due      REAL    NOT NULL,      -- unix time
+    PRIMARY KEY (learner, ndex)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reviews (
+    learner  TEXT    NOT NULL,
+    ndex     INTEGER NOT NULL,
+    ts       REAL    NOT NULL,
+    grade    INTEGER NOT NULL,
+    interval REAL    NOT NULL       -- days scheduled by this review
+);
+CREATE INDEX IF NOT EXISTS reviews_learner ON reviews (learner, ts);
+"""
+
+def sm2(state, grade):
+    """Next (ease, interval, reps, lapses) after a review graded 0-5."""
+    ease, interval, reps, lapses = state
+    if grade >= 3:
+        interval = 1 if reps == 0 else 6 if reps == 1 else interval * ease
+        reps += 1
+    else:
+        interval, reps, lapses = 1, 0, lapses + 1
+    ease = max(1.3, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return ease, interval, reps, lapses
+
+class Deck:
+    """One learner's card states with a min-heap of due times."""
+
+    def __init__(self, learner, ndexes, states, introduced_today=0, today=0):
+        self.learner = learner
+        self.ndexes = set(ndexes)
+        self.states = states            # ndex -> (ease, interval, reps, lapses, due)
+        self.heap = [(s[4], n) for n, s in states.items()]
+        heapq.heapify(self.heap)
+        self.unseen = sorted((n for n in self.ndexes if n not in states), reverse=True)
+        self.introduced_today = introduced_today
+        self.today = today
+
+    def _clean_top(self):
+        # entries are never updated in place; skip ones a later review replaced
+        while self.heap and self.states[self.heap[0][1]][4] != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def due(self, now, count=1):
+        """Up to `count` ndexes due by `now`, earliest first."""
+        taken = []
+        while len(taken) < count:
+            self._clean_top()
+            if not self.heap or self.heap[0][0] > now:
+                break
+            taken.append(heapq.heappop(self.heap))
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return [n for _, n in taken]
+
+    def next_due(self):
+        self._clean_top()
+        return self.heap[0][0] if self.heap else None
+
+    def next_cards(self, now, count, new_per_day):
+        """Due reviews first, then unseen cards within today's allowance."""
+        cards = self.due(now, count)
+        day = int(now // DAY)
+        if day != self.today:
+            self.today, self.introduced_today = day, 0
+        allowance = max(0, new_per_day - self.introduced_today)
+        new = min(count - len(cards), allowance)
+        cards += self.unseen[:-new - 1:-1] if new > 0 else []
+        return cards
+
+    def review(self, ndex, grade, ts):
+        """Apply one review; returns the new state."""
+        state = self.states.get(ndex)
+        if state is None:
+            state = (2.5, 0, 0, 0, ts)
+            if self.unseen[-1] == ndex:  # the usual case: lowest unseen ndex first
+                self.unseen.pop()
+            else:
+                self.unseen.remove(ndex)
+            day = int(ts // DAY)
+            if day != self.today:
+                self.today, self.introduced_today = day, 0
+            self.introduced_today += 1
+        ease, interval, reps, lapses = sm2(state[:4], grade)
+        new = (ease, interval, reps, lapses, ts + interval * DAY)
+        self.states[ndex] = new
+        heapq.heappush(self.heap, (new[4], ndex))
+        if len(self.heap) > 2 * len(self.states) + 64:
+            self.heap = [(s[4], n) for n, s in self.states.items()]
+            heapq.heapify(self.heap)
+        return new
+
+class Scheduler:
+    """Decks for every learner, backed by SQLite."""
+
+    def __init__(self, db_path, ndexes, new_per_day=20):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.ndexes = list(ndexes)
+        self.new_per_day = new_per_day
+        self.decks = {}
+        self.lock = threading.Lock()
+
+    def deck(self, learner):
+        deck = self.decks.get(learner)
+        if deck is None:
+            rows = self.conn.execute(
+                "SELECT ndex, ease, interval, reps, lapses, due FROM cards WHERE learner = ?",
+                (learner,))
+            states = {n: (e, i, r, l, d) for n, e, i, r, l, d in rows}
+            today = int(time.time() // DAY)
+            introduced = self.conn.execute(
+                "SELECT COUNT(*) FROM (SELECT ndex FROM reviews WHERE learner = ? "
+                "GROUP BY ndex HAVING MIN(ts) >= ?)", (learner, today * DAY)).fetchone()[0]
+            deck = self.decks[learner] = Deck(learner, self.ndexes, states, introduced, today)
+        return deck
+
+    def next(self, learner, now=None, count=1):
+        now = time.time() if now is None else now
+        with self.lock:
+            deck = self.deck(learner)
+            return deck.next_cards(now, count, self.new_per_day), deck.next_due()
+
+    def review(self, learner, reviews):
+        """Apply a batch of {"ndex", "grade", "ts"} reviews in one transaction."""
+        now = time.time()
+        with self.lock:
+            deck = self.deck(learner)
+            batch = sorted(((float(r.get('ts', now)), int(r['ndex']), int(r['grade']))
+                            for r in reviews), key=lambda r: r[0])
+            # validate the whole batch before touching the deck
+            for ts, ndex, grade in batch:
+                if ndex not in deck.ndexes:
+                    raise ValueError(f"unknown card {ndex}")
+                if not 0 <= grade <= 5:
+                    raise ValueError(f"grade must be 0-5, got {grade}")
+            cards, history = [], []
+            for ts, ndex, grade in batch:
+                state = deck.review(ndex, grade, ts)
+                cards.append((learner, ndex, *state))
+                history.append((learner, ndex, ts, grade, state[1]))
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO cards (learner, ndex, ease, interval, reps, "
+                    "lapses, due) VALUES (?, ?, ?, ?, ?, ?, ?)", cards)
+                self.conn.executemany(
+                    "INSERT INTO reviews (learner, ndex, ts, grade, interval) "
+                    "VALUES (?, ?, ?, ?, ?)", history)
+            return len(history)
+
+    def stats(self, learner, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            deck = self.deck(learner)
+            learning = sum(1 for s in deck.states.values() if s[2] < 2)
+            return {'learner': learner, 'new': len(deck.unseen), 'seen': len(deck.states),
+                    'learning': learning, 'due': len(deck.due(now, len(deck.states))),
+                    'next_due': deck.next_due()}
+
+class SRSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    scheduler = None                    # Scheduler, set in main()
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        learner = query.get('learner', ['default'])[0]
+        if url.path == '/next':
+            try:
+                count = max(1, min(100, int(query.get('count', ['1'])[0])))
+            except ValueError as e:
+                self.send_json(400, {'status': 'error', 'message': str(e)})
+                return
+            cards, next_due = self.scheduler.next(learner, count=count)
+            self.send_json(200, {'cards': cards, 'next_due': next_due})
+        elif url.path == '/stats':
+            self.send_json(200, self.scheduler.stats(learner))
+        else:
+            self.send_json(404, {'status': 'error', 'message': 'Not found'})
+
+    def do_POST(self):
+        if self.path != '/review':
+            self.send_json(404, {'status': 'error', 'message': 'Not found'})
+            return
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+            if not isinstance(data, dict):
+                raise ValueError('expected a JSON object')
+            reviews, learner = data.get('reviews'), data.get('learner', 'default')
+            if not isinstance(reviews, list) or not all(isinstance(r, dict) for r in reviews):
+                raise ValueError('reviews must be a list of objects')
+            if not isinstance(learner, str):
+                raise ValueError('learner must be a string')
+            saved = self.scheduler.review(learner, reviews)
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            self.send_json(400, {'status': 'error', 'message': str(e)})
+            return
+        self.send_json(200, {'status': 'success', 'saved': saved})
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {format % args}")
+
+# ------------------ benchmark -------------------
+# (name, probability of recalling a card, cards studied per day)
+PROFILES = [('diligent', 0.92, 200), ('casual', 0.80, 60), ('struggling', 0.65, 120)]
+
+def bench(learners=20, years=3, new_per_day=20, seed=1):
+    """Simulate daily sessions and report "next card" latency as history grows."""
+    rng = random.Random(seed)
+    path = os.path.join(tempfile.mkdtemp(), 'srs_bench.sqlite')
+    scheduler = Scheduler(path, range(1, 1026), new_per_day)
+    people = [(f"{PROFILES[i % len(PROFILES)][0]}-{i}", *PROFILES[i % len(PROFILES)][1:])
+              for i in range(learners)]
+    start = 1_700_000_000
+    print(f"{learners} learners, {years} years, {new_per_day} new cards/day")
+    print(f"{'year':>4} {'reviews':>10} {'next() µs':>10} {'p99 µs':>8} {'review() µs/card':>17}")
+    total = 0
+    for year in range(years):
+        next_times, review_time, reviewed = [], 0.0, 0
+        for day in range(365):
+            now = start + (year * 365 + day) * DAY + 9 * 3600
+            for name, recall, per_day in people:
+                studied = 0
+                while studied < per_day:
+                    t0 = time.perf_counter()
+                    cards, _ = scheduler.next(name, now, 1)
+                    next_times.append(time.perf_counter() - t0)
+                    if not cards:
+                        break
+                    # study in sessions of ten and submit each as one batch
+                    cards, _ = scheduler.next(name, now, min(10, per_day - studied))
+                    batch = [{'ndex': n, 'ts': now,
+                              'grade': rng.choice((4, 5)) if rng.random() < recall
+                              else rng.choice((1, 2))} for n in cards]
+                    t0 = time.perf_counter()
+                    scheduler.review(name, batch)
+                    review_time += time.perf_counter() - t0
+                    studied += len(batch)
+                    now += 60
+                reviewed += studied
+        total += reviewed
+        next_times.sort()
+        mean = sum(next_times) / len(next_times) * 1e6
+        p99 = next_times[int(len(next_times) * 0.99)] * 1e6
+        print(f"{year + 1:>4} {total:>10} {mean:>10.1f} {p99:>8.1f} "
+              f"{review_time / max(reviewed, 1) * 1e6:>17.1f}")
+    print(f"History: {os.path.getsize(path) / 1e6:.1f} MB in {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Flashcard spaced-repetition server')
+    parser.add_argument('port', nargs='?', type=int, default=3001)
+    parser.add_argument('--db', default='srs.sqlite')
+    parser.add_argument('--new-per-day', type=int, default=20)
+    parser.add_argument('--bench', action='store_true', help='run the simulation benchmark')
+    parser.add_argument('--learners', type=int, default=20)
+    parser.add_argument('--years', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.learners, args.years, args.new_per_day)
+        return
+
+    with open(DECK_JSON, 'r', encoding='utf-8') as f:
+        ndexes = [p['ndex'] for p in json.load(f)]
+    SRSHandler.scheduler = Scheduler(args.db, ndexes, args.new_per_day)
+
+    print(f"Starting SRS Server on port {args.port} ({len(ndexes)} cards, {args.db})")
+    print("Press Ctrl+C to stop the server")
+    try:
+        server = ThreadingHTTPServer(('localhost', args.port), SRSHandler)
+        print(f"Server running at http://localhost:{args.port}")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down server...")
+        server.shutdown()
+    except OSError as e:
+        print(f"Error starting server: {e}")
+
+if __name__ == '__main__':
+    main()
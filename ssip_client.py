@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+ssip_client.py - long-lived connections to speech-dispatcher
+
+spd-say opens a new SSIP connection, names the client, sets the language
+and exits for every utterance.  SSIPConnection keeps one socket open and
+only resends settings that changed; SSIPPool hands a few of them out to
+tts_server's request threads.
+
+Protocol reference: "SSIP" chapter of the speech-dispatcher manual.  Every
+command is one CRLF-terminated line; replies are "NNN-text" continuation
+lines ending with a "NNN text" line, 2xx meaning success.
+
+Usage:
+    python ssip_client.py "こんにちは" [--lang ja]
+"""
+
+import argparse
+import os
+import queue
+import socket
+from contextlib import contextmanager
+
+CLIENT_NAME = "user:pokemon-flashcards:tts"
+CONNECT_TIMEOUT = 2.0
+
+class SSIPError(Exception):
+    """speech-dispatcher is unreachable or rejected a command.
+
+    `sent` is how many items of a speak_many() batch were queued before it.
+    """
+
+    def __init__(self, message: str, sent: int = 0):
+        super().__init__(message)
+        self.sent = sent
+
+def check_value(name: str, value: str | None):
+    """Refuse a setting that would end the command line early (CR/LF) or smuggle in another."""
+    if value and any(ord(c) < 0x20 or c == "\x7f" for c in value):
+        raise ValueError(f"invalid {name}: control characters are not allowed")
+
+def socket_path() -> str:
+    """Where speech-dispatcher listens, following its own lookup order."""
+    address = os.environ.get("SPEECHD_ADDRESS", "")
+    if address.startswith("unix_socket:"):
+        return address.split(":", 1)[1]
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "speech-dispatcher", "speechd.sock")
+    return os.path.expanduser("~/.cache/speech-dispatcher/speechd.sock")
+
+class SSIPConnection:
+    """One SSIP session; not thread-safe (use SSIPPool)."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or socket_path()
+        self.sock = None
+        self.reader = None
+        self.settings = {}
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise SSIPError(f"cannot connect to {self.path}: {e}") from None
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self.settings = {}
+        self.command(f"SET self CLIENT_NAME {CLIENT_NAME}")
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.sendall(b"QUIT\r\n")
+            except OSError:
+                pass
+            self.reader.close()
+            self.sock.close()
+        self.sock = self.reader = None
+
+    def send(self, data: bytes) -> list[str]:
+        """Write raw bytes and read one (possibly multi-line) reply."""
+        if self.sock is None:
+            self.connect()
+        try:
+            self.sock.sendall(data)
+            lines = []
+            while True:
+                line = self.reader.readline().decode("utf-8", "replace").rstrip("\r\n")
+                if not line:
+                    raise OSError("connection closed by speech-dispatcher")
+                lines.append(line)
+                if len(line) < 4 or line[3] != "-":
+                    break
+        except OSError as e:
+            self.close()
+            raise SSIPError(str(e)) from None
+        if not lines[-1].startswith("2"):
+            raise SSIPError(lines[-1])
+        return lines
+
+    def command(self, line: str) -> list[str]:
+        return self.send(line.encode("utf-8") + b"\r\n")
+
+    def set(self, name: str, value: str):
+        """SET self NAME value, skipped when the session already has it."""
+        if self.settings.get(name) != value:
+            self.command(f"SET self {name} {value}")
+            self.settings[name] = value
+
+    def speak(self, text: str, language: str | None = None, voice: str | None = None) -> str:
+        """Queue one utterance; returns speech-dispatcher's message id."""
+        check_value("language", language)
+        check_value("voice", voice)
+        if self.sock is None:
+            self.connect()
+        if language:
+            self.set("LANGUAGE", language)
+        if voice:
+            self.set("SYNTHESIS_VOICE", voice)
+        self.command("SPEAK")
+        # message body: one line per text line, leading dots doubled
+        body = "\r\n".join("." + l if l.startswith(".") else l
+                           for l in text.splitlines() or [""])
+        reply = self.send(body.encode("utf-8") + b"\r\n.\r\n")
+        return reply[0][4:] if len(reply) > 1 else ""
+
+    def cancel(self):
+        """Stop this client's current and queued speech."""
+        self.command("CANCEL self")
+
+class SSIPPool:
+    """A few SSIPConnections shared between threads, reconnecting on failure.
+
+    A failed send closes its connection, so the next use reconnects.
+    """
+
+    def __init__(self, size: int = 2, path: str | None = None):
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(SSIPConnection(path))
+
+    @contextmanager
+    def connection(self):
+        conn = self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def speak(self, text: str, language: str | None = None, voice: str | None = None) -> str:
+        return self.speak_many([(text, language, voice)])[0]
+
+    def speak_many(self, items) -> list[str]:
+        """Queue (text, language, voice) items in order on one connection.
+
+        Settings are checked before anything is queued (ValueError); an
+        SSIPError carries how many items were queued before it.
+        """
+        items = list(items)
+        for _, language, voice in items:
+            check_value("language", language)
+            check_value("voice", voice)
+        ids = []
+        retried = False
+        with self.connection() as conn:
+            while len(ids) < len(items):
+                text, language, voice = items[len(ids)]
+                try:
+                    ids.append(conn.speak(text, language, voice))
+                except SSIPError as e:
+                    if conn.sock is not None or retried:
+                        # speech-dispatcher said no, or is down
+                        raise SSIPError(str(e), sent=len(ids)) from None
+                    retried = True      # stale socket (daemon restarted): reconnect once
+        return ids
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get().close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Speak text through speech-dispatcher")
+    ap.add_argument("text")
+    ap.add_argument("--lang", default="ja")
+    ap.add_argument("--voice")
+    args = ap.parse_args()
+    conn = SSIPConnection()
+    try:
+        print(f"Queued message {conn.speak(args.text, args.lang, args.voice)}")
+    except SSIPError as e:
+        print(f"Error: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
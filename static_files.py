@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+static_files.py - conditional, compressed static serving for the app
+
+Serves the app directory (index.html, the JSON files, images/, bundle/,
+tts_cache/) from a BaseHTTPRequestHandler so one process can answer both
+the page and /speak (tts_server.py --static .):
+
+  * strong ETags from the file contents, and 304 for a matching If-None-Match
+  * Cache-Control: immutable for content-hashed names (cards_000.3f2a9c1e.json,
+    tts_cache/<sha1>.wav), no-cache (always revalidate) for everything else
+  * JSON/CSS/JS/HTML/SVG gzip- or brotli-encoded: a .gz/.br sibling no older
+    than the file is sent as is, otherwise gzip is done once and kept in memory
+  * everything else (images, audio) goes out with socket.sendfile(), which
+    is os.sendfile() where the platform has it, with single byte ranges
+
+Only file types in CONTENT_TYPES are served, and never dotfiles.
+
+Usage (standalone, without TTS):
+    python static_files.py [port] [--root .]
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import pathlib
+import re
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlparse
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js':   'text/javascript; charset=utf-8',
+    '.css':  'text/css; charset=utf-8',
+    '.json': 'application/json',
+    '.svg':  'image/svg+xml',
+    '.png':  'image/png',
+    '.webp': 'image/webp',
+    '.jpg':  'image/jpeg',
+    '.gif':  'image/gif',
+    '.ico':  'image/x-icon',
+    '.wav':  'audio/wav',
+}
+COMPRESSIBLE = {'.html', '.js', '.css', '.json', '.svg'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+# cards_000.3f2a9c1e.json (build_bundle.py), <sha1>.wav (tts_server.py)
+HASHED_NAME = re.compile(r'(\.[0-9a-f]{8,}\.[a-z0-9]+|^[0-9a-f]{40}\.[a-z0-9]+)$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def etag_matches(etag, request_headers):
+    """If-None-Match with the weak comparison RFC 9110 asks for."""
+    tags = [t.strip() for t in request_headers.get('If-None-Match', '').split(',')]
+    return '*' in tags or etag in [t[2:] if t.startswith('W/') else t for t in tags]
+
+def file_response(size, etag, content_type, cache_control, request_headers, ranges=True):
+    """
+    Status, headers and byte range for sending `size` bytes of one entity.
+
+    Handles If-None-Match against a strong ETag and, when ranges is true,
+    a single Range (bytes=a-b, a- or -n).  Returns (status, headers,
+    start, length).
+    """
+    headers = {'ETag': etag, 'Cache-Control': cache_control,
+               'Access-Control-Allow-Origin': '*'}
+    if etag_matches(etag, request_headers):
+        headers['Content-Length'] = '0'
+        return 304, headers, 0, 0
+
+    start, end = 0, size - 1
+    status = 200
+    match = RANGE.match(request_headers.get('Range', '').strip()) if ranges else None
+    if match and (match.group(1) or match.group(2)):
+        if match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        else:                                # suffix range: last N bytes
+            start = max(0, size - int(match.group(2)))
+        if start > end or start >= size:
+            headers.update({'Content-Range': f'bytes */{size}', 'Content-Length': '0'})
+            return 416, headers, 0, 0
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    headers.update({'Content-type': content_type, 'Content-Length': str(end - start + 1)})
+    if ranges:
+        headers['Accept-Ranges'] = 'bytes'
+    return status, headers, start, end - start + 1
+
+def accepts(request_headers, coding):
+    """Whether Accept-Encoding allows coding (q=0 means no)."""
+    for part in request_headers.get('Accept-Encoding', '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip().lower() == coding:
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+class StaticFiles:
+    """The files under one directory, with ETags and compressed copies cached."""
+
+    def __init__(self, root, gzip_cache_bytes=32 * 1024 * 1024):
+        self.root = pathlib.Path(root).resolve()
+        self.etags = {}                 # (path, mtime_ns, size) -> ETag
+        self.gzipped = OrderedDict()    # (path, mtime_ns, size) -> gzip bytes, LRU
+        self.gzip_cache_bytes = gzip_cache_bytes
+        self.gzip_total = 0
+        self.lock = threading.Lock()
+
+    def resolve(self, url_path):
+        """The file a URL path names, or None if it is missing or not servable."""
+        parts = [p for p in unquote(url_path).split('/') if p]
+        if any(p.startswith('.') or '\\' in p for p in parts):
+            return None
+        path = self.root.joinpath(*parts) if parts else self.root
+        if path.is_dir():
+            path = path / 'index.html'
+        if path.suffix not in CONTENT_TYPES or not path.is_file():
+            return None
+        if self.root not in path.resolve().parents:
+            return None                 # a symlink out of the tree
+        return path
+
+    def etag(self, path, stat, suffix=''):
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            tag = self.etags.get(key)
+        if tag is None:
+            h = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    h.update(chunk)
+            tag = h.hexdigest()[:20]
+            with self.lock:
+                self.etags[key] = tag
+        return f'"{tag}{suffix}"'
+
+    def gzip(self, path, stat):
+        """gzip of a file, compressed once per version and kept in an LRU."""
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            body = self.gzipped.get(key)
+            if body is not None:
+                self.gzipped.move_to_end(key)
+                return body
+        body = gzip.compress(path.read_bytes(), compresslevel=6, mtime=0)
+        with self.lock:
+            if key not in self.gzipped:
+                self.gzipped[key] = body
+                self.gzip_total += len(body)
+                while self.gzip_total > self.gzip_cache_bytes and len(self.gzipped) > 1:
+                    _, old = self.gzipped.popitem(last=False)
+                    self.gzip_total -= len(old)
+        return body
+
+    def encoded(self, path, stat, request_headers):
+        """(coding, sibling path or bytes) for the best encoding the client takes."""
+        for coding, ext in (('br', '.br'), ('gzip', '.gz')):
+            if not accepts(request_headers, coding):
+                continue
+            sibling = path.with_name(path.name + ext)
+            try:
+                if sibling.stat().st_mtime_ns >= stat.st_mtime_ns:
+                    return coding, sibling
+            except FileNotFoundError:
+                pass
+        if accepts(request_headers, 'gzip') and stat.st_size > 1024:
+            return 'gzip', self.gzip(path, stat)
+        return None, None
+
+    def serve(self, handler):
+        """Answer a GET/HEAD for handler.path; returns False if no file matches."""
+        path = self.resolve(urlparse(handler.path).path)
+        if path is None:
+            return False
+        stat = path.stat()
+        content_type = CONTENT_TYPES[path.suffix]
+        cache_control = IMMUTABLE if HASHED_NAME.search(path.name) else REVALIDATE
+        coding, body = (self.encoded(path, stat, handler.headers)
+                        if path.suffix in COMPRESSIBLE else (None, None))
+
+        if coding:
+            if isinstance(body, pathlib.Path):
+                source, size = body, body.stat().st_size
+            else:
+                source, size = None, len(body)
+            etag = self.etag(path, stat, f'-{coding}')
+            status, headers, start, length = file_response(
+                size, etag, content_type, cache_control, handler.headers, ranges=False)
+            headers['Content-Encoding'] = coding
+        else:
+            source, size = path, stat.st_size
+            etag = self.etag(path, stat)
+            status, headers, start, length = file_response(
+                size, etag, content_type, cache_control, handler.headers)
+        if path.suffix in COMPRESSIBLE:
+            headers['Vary'] = 'Accept-Encoding'
+
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        if handler.command == 'HEAD' or not length:
+            return True
+        if source is None:
+            handler.wfile.write(body[start:start + length])
+        else:
+            send_file(handler, source, start, length)
+        return True
+
+def send_file(handler, path, start, length):
+    """Send part of a file; zero-copy where the OS supports it."""
+    handler.wfile.flush()
+    with open(path, 'rb') as f:
+        handler.connection.sendfile(f, start, length)
+
+class StaticHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    static = None                       # StaticFiles, set in main()
+
+    def do_GET(self):
+        if not self.static.serve(self):
+            self.send_error(404, 'Not found')
+
+    do_HEAD = do_GET
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the flashcard app')
+    parser.add_argument('port', nargs='?', type=int, default=8000)
+    parser.add_argument('--root', default='.')
+    args = parser.parse_args()
+    StaticHandler.static = StaticFiles(args.root)
+    server = ThreadingHTTPServer(('localhost', args.port), StaticHandler)
+    print(f"Serving {StaticHandler.static.root} at http://localhost:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down server...")
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
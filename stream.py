@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+stream.py - record-at-a-time transforms for the cleanup scripts
+
+Records flow through chained generator stages as (key, record) pairs, one
+at a time, so a cleanup pass never holds more than one record plus the
+read buffer:
+
+    read_records(path)  ->  stage  ->  stage  ->  write_json / write_ndjson
+
+The key is the ndex for list files and the object key for keyed files
+(name_origins_*.json).  Inputs can be the existing JSON files, read
+incrementally, or NDJSON with one [key, record] array per line.  The
+writers are compact by default; indent=2 reproduces the legacy files
+byte for byte.
+
+The cleanup scripts define the stages; cleanup.py chains them.
+"""
+
+import itertools
+import json
+import os
+from collections import Counter
+
+CHUNK = 64 * 1024
+_WS = " \t\r\n,"
+
+# ------------------ readers ---------------------
+def _iter_values(path):
+    """Yield top-level (key, value) pairs from a JSON array or object file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(CHUNK)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            return not eof
+
+        def skip():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        def value():
+            nonlocal pos
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                    if end < len(buf) or eof:   # a number may continue in the next chunk
+                        pos = end
+                        return obj
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                if not fill():
+                    obj, pos = decoder.raw_decode(buf, pos)
+                    return obj
+
+        skip()
+        opener = buf[pos:pos + 1]
+        if opener not in ("[", "{"):
+            raise ValueError(f"{path}: expected a JSON array or object")
+        pos += 1
+        index = 0
+        while True:
+            skip()
+            if buf[pos:pos + 1] in ("]", "}"):
+                return
+            if opener == "{":
+                key = value()
+                skip()
+                if buf[pos:pos + 1] != ":":
+                    raise ValueError(f"{path}: expected ':' after key {key!r}")
+                pos += 1
+                skip()
+                yield key, value()
+            else:
+                record = value()
+                yield (record.get("ndex", index) if isinstance(record, dict) else index), record
+                index += 1
+
+def read_records(path):
+    """(key, record) pairs from a .json file or an .ndjson/.jsonl file."""
+    if str(path).endswith((".ndjson", ".jsonl")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    key, record = json.loads(line)
+                    yield key, record
+    else:
+        yield from _iter_values(path)
+
+def is_keyed(path) -> bool | None:
+    """True for a JSON object file, False for an array, None for NDJSON."""
+    if str(path).endswith((".ndjson", ".jsonl")):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(CHUNK)
+            text = chunk.lstrip(_WS)
+            if text or not chunk:
+                break
+    if text[:1] not in ("[", "{"):
+        raise ValueError(f"{path}: expected a JSON array or object")
+    return text[:1] == "{"
+
+# ------------------ writers ---------------------
+def write_ndjson(pairs, path) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for key, record in pairs:
+            f.write(json.dumps([key, record], ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    return count
+
+def write_json(pairs, path, indent: int | None = None, keyed: bool | None = None) -> int:
+    """
+    Write pairs as one JSON value without building it.
+
+    keyed gives an object, otherwise a list; left as None it is guessed
+    from the first key (a string from an object file), which turns an
+    empty object into [], so pass is_keyed(source) when there is one.
+    """
+    sep = (",", ":") if indent is None else (",", ": ")
+    nl = "" if indent is None else "\n"
+    pad = "" if indent is None else " " * indent
+    count = 0
+    pairs = iter(pairs)
+    first = next(pairs, None)
+    if keyed is None:
+        keyed = first is not None and isinstance(first[0], str)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{" if keyed else "[")
+        for key, record in itertools.chain([first] if first else [], pairs):
+            body = json.dumps(record, ensure_ascii=False, indent=indent, separators=sep)
+            body = body.replace("\n", "\n" + pad)
+            if keyed:
+                body = json.dumps(str(key), ensure_ascii=False) + sep[1] + body
+            f.write(("," if count else "") + nl + pad + body)
+            count += 1
+        f.write((nl if count else "") + ("}" if keyed else "]"))
+    return count
+
+def write(pairs, path, indent: int | None = None, keyed: bool | None = None) -> int:
+    """Write to a temp file and rename, so a file can be rewritten in place."""
+    tmp = f"{path}.tmp"
+    try:
+        if str(path).endswith((".ndjson", ".jsonl")):
+            count = write_ndjson(pairs, tmp)
+        else:
+            count = write_json(pairs, tmp, indent, keyed)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+# ------------------ stages ----------------------
+def map_records(func, name: str, counts: Counter):
+    """Stage applying func(record) -> record, counting records it changed."""
+    def stage(pairs):
+        for key, record in pairs:
+            new = func(record)
+            if new != record:
+                counts[name] += 1
+            yield key, new
+    return stage
+
+def run(source, dest, stages, indent: int | None = None) -> tuple[int, Counter]:
+    """
+    Stream source through stages into dest.
+
+    stages is a list of (name, func) with func(record) -> record.  Returns
+    (records written, Counter of records each stage changed).
+    """
+    counts = Counter()
+    pairs = read_records(source)
+    for name, func in stages:
+        pairs = map_records(func, name, counts)(pairs)
+    return write(pairs, dest, indent, is_keyed(source)), counts
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+tts_async.py - asyncio serving mode for tts_server.py
+
+One event loop accepts every connection; speech is rendered by a fixed
+number of synthesis workers fed from a bounded queue.
+
+- identical in-flight (text, lang, voice) requests share one render
+- when the queue is full new renders get 503 + Retry-After instead of
+  piling up behind a 10 s subprocess timeout
+- a client (X-Client-Id header or ?client=, else its address) waiting on
+  a render that has not started yet is answered 409 as soon as it asks for
+  something newer; the render itself is dropped if nobody else wants it
+- GET /metrics reports request counts, queue depth, cache hit ratio and
+  latency histograms in the Prometheus text format
+
+Endpoints are the same as the threaded server's (GET/POST /speak,
+POST /speak/batch, GET /audio/<key>.wav) plus /metrics.
+
+Usage:
+    python tts_server.py --async [--synth-workers 2] [--queue-size 32]
+"""
+
+import asyncio
+import http.client
+import json
+import time
+from collections import Counter
+from email.parser import BytesParser
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlparse
+
+from tts_server import (AUDIO_PATH, RenderError, audio_response, cache_key, play,
+                        request_items)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+MAX_BODY = 1024 * 1024
+
+class Stale(Exception):
+    """The client asked for something newer before this render started."""
+
+class QueueFull(Exception):
+    """The synthesis queue is at capacity."""
+
+class Histogram:
+    """Cumulative latency histogram in seconds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.sum += seconds
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+    def lines(self, name: str) -> list[str]:
+        out = [f"# TYPE {name} histogram"]
+        out += [f'{name}_bucket{{le="{b}"}} {c}' for b, c in zip(self.buckets, self.counts)]
+        out += [f'{name}_bucket{{le="+Inf"}} {self.count}',
+                f"{name}_sum {self.sum:.6f}", f"{name}_count {self.count}"]
+        return out
+
+class Job:
+    """One render, possibly awaited by several requests."""
+
+    def __init__(self, key, text, lang, voice):
+        self.key = key
+        self.args = (text, lang, voice)
+        self.waiters = []               # (client, future)
+        self.started = False
+        self.dropped = False
+
+class TTSService:
+    def __init__(self, cache, speakers, synth_workers=2, queue_size=32):
+        self.cache = cache
+        self.speakers = speakers
+        self.synth_workers = synth_workers
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.inflight = {}              # key -> Job
+        self.latest = {}                # client -> Job it is waiting on
+        self.requests = Counter()       # (route, status)
+        self.events = Counter()         # cache_hit, cache_miss, coalesced, stale, rejected
+        self.request_latency = Histogram()
+        self.synth_latency = Histogram()
+
+    # ------------------ synthesis -------------------
+    async def worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.dropped:
+                    continue
+                job.started = True
+                started = time.perf_counter()
+                try:
+                    result = await loop.run_in_executor(None, self.cache.get_or_render,
+                                                        *job.args)
+                except Exception as e:
+                    for _, fut in job.waiters:
+                        if not fut.done():
+                            fut.set_exception(e)
+                else:
+                    self.synth_latency.observe(time.perf_counter() - started)
+                    for _, fut in job.waiters:
+                        if not fut.done():
+                            fut.set_result(result)
+            finally:
+                if self.inflight.get(job.key) is job:
+                    del self.inflight[job.key]
+                self.queue.task_done()
+
+    def supersede(self, client, job):
+        """A client moved on to `job` (None: a cache hit); drop what it was waiting for."""
+        previous = self.latest.pop(client, None)
+        if job is not None:
+            self.latest[client] = job
+        if previous is None or previous is job or previous.started:
+            return
+        for owner, fut in previous.waiters:
+            if owner == client and not fut.done():
+                fut.set_exception(Stale())
+                self.events["stale"] += 1
+        previous.waiters = [(o, f) for o, f in previous.waiters if o != client]
+        if not previous.waiters:
+            previous.dropped = True
+            if self.inflight.get(previous.key) is previous:
+                del self.inflight[previous.key]
+
+    async def get_audio(self, text, lang, voice, client=None):
+        """(key, path, was_cached) for an utterance, rendering through the queue."""
+        key = cache_key(text, lang, voice)
+        path = self.cache.lookup(key)
+        if path:
+            self.events["cache_hit"] += 1
+            if client is not None:
+                self.supersede(client, None)
+            return key, path, True
+        job = self.inflight.get(key)
+        if job is not None:
+            self.events["coalesced"] += 1
+        else:
+            if self.queue.full():
+                self.events["rejected"] += 1
+                raise QueueFull()
+            job = self.inflight[key] = Job(key, text, lang, voice)
+            self.queue.put_nowait(job)
+            self.events["cache_miss"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        job.waiters.append((client, fut))
+        if client is not None:
+            self.supersede(client, job)
+        try:
+            key, path, _ = await fut
+        finally:
+            if self.latest.get(client) is job:
+                del self.latest[client]
+        return key, path, False
+
+    # ------------------ metrics ---------------------
+    def metrics(self) -> str:
+        hits, misses = self.events["cache_hit"], self.events["cache_miss"]
+        out = ["# TYPE tts_requests_total counter"]
+        out += [f'tts_requests_total{{route="{r}",status="{s}"}} {n}'
+                for (r, s), n in sorted(self.requests.items())]
+        out += ["# TYPE tts_events_total counter"]
+        out += [f'tts_events_total{{event="{e}"}} {n}' for e, n in sorted(self.events.items())]
+        out += ["# TYPE tts_queue_depth gauge", f"tts_queue_depth {self.queue.qsize()}",
+                "# TYPE tts_inflight gauge", f"tts_inflight {len(self.inflight)}",
+                "# TYPE tts_cache_hit_ratio gauge",
+                f"tts_cache_hit_ratio {hits / (hits + misses) if hits + misses else 0:.4f}",
+                "# TYPE tts_cache_bytes gauge", f"tts_cache_bytes {self.cache.total}"]
+        out += self.request_latency.lines("tts_request_seconds")
+        out += self.synth_latency.lines("tts_synthesis_seconds")
+        return "\n".join(out) + "\n"
+
+    # ------------------ HTTP ------------------------
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                lines = []
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    lines.append(line)
+                headers = BytesParser(_class=http.client.HTTPMessage).parsebytes(b"".join(lines))
+                method, target, version = request_line.decode("latin-1").split()
+                length = int(headers.get("Content-Length", 0))
+                if length > MAX_BODY:
+                    # the body is never read, so the connection cannot be reused
+                    status = await self.send_json(writer, 413, {"status": "error",
+                                                                "message": "Request body too large"},
+                                                  {"Connection": "close"})
+                    self.requests[("other", status)] += 1
+                    break
+                body = await reader.readexactly(length) if length else b""
+                started = time.perf_counter()
+                route, status = await self.dispatch(method, target, headers, body,
+                                                    peer[0] if peer else None, writer)
+                self.requests[(route, status)] += 1
+                self.request_latency.observe(time.perf_counter() - started)
+                if headers.get("Connection", "").lower() == "close" or version == "HTTP/1.0":
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, headers, body=b""):
+        head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def send_json(self, writer, status, payload, extra=None):
+        body = json.dumps(payload).encode()
+        headers = {"Content-type": "application/json", "Content-Length": str(len(body)),
+                   "Access-Control-Allow-Origin": "*", **(extra or {})}
+        await self.send(writer, status, headers, body)
+        return status
+
+    async def send_audio(self, writer, method, key, path, headers):
+        status, out, start, length = audio_response(key, path, headers)
+        body = b""
+        if method != "HEAD" and length:
+            with open(path, "rb") as f:
+                f.seek(start)
+                body = f.read(length)
+        await self.send(writer, status, out, body)
+        return status
+
+    async def render_error(self, writer, exc):
+        if isinstance(exc, Stale):
+            return await self.send_json(writer, 409, {"status": "stale",
+                                                      "message": "Superseded by a newer request"})
+        if isinstance(exc, QueueFull):
+            return await self.send_json(writer, 503, {"status": "error", "message": "Busy"},
+                                        {"Retry-After": "1"})
+        print(f"TTS command failed: {exc}")
+        return await self.send_json(writer, 500, {"status": "error", "message": str(exc)})
+
+    async def dispatch(self, method, target, headers, body, peer, writer):
+        url = urlparse(target)
+        query = parse_qs(url.query)
+        client = headers.get("X-Client-Id") or query.get("client", [peer])[0]
+        match = AUDIO_PATH.match(url.path)
+
+        if method == "OPTIONS":
+            await self.send(writer, 200, {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+                "Access-Control-Allow-Headers": "Content-Type, Range, If-None-Match, X-Client-Id",
+                "Content-Length": "0"})
+            return "options", 200
+        if method in ("GET", "HEAD") and url.path == "/metrics":
+            text = self.metrics().encode()
+            await self.send(writer, 200, {"Content-type": "text/plain; version=0.0.4",
+                                          "Content-Length": str(len(text))}, text)
+            return "metrics", 200
+        if method in ("GET", "HEAD") and match:
+            path = self.cache.lookup(match.group(1))
+            if not path:
+                return "audio", await self.send_json(writer, 404, {"status": "error",
+                                                                   "message": "Not cached"})
+            return "audio", await self.send_audio(writer, method, match.group(1), path, headers)
+        if method in ("GET", "HEAD") and url.path == "/speak":
+            text = query.get("text", [""])[0]
+            if not text:
+                return "speak", await self.send_json(writer, 400, {"status": "error",
+                                                                   "message": "No text given"})
+            try:
+                key, path, _ = await self.get_audio(text, query.get("lang", ["en-US"])[0],
+                                                    query.get("voice", [""])[0], client)
+            except Exception as e:
+                return "speak", await self.render_error(writer, e)
+            return "speak", await self.send_audio(writer, method, key, path, headers)
+        if method == "POST" and url.path in ("/speak", "/speak/batch"):
+            route = url.path.strip("/").replace("/", "_")
+            try:
+                data = json.loads(body.decode("utf-8"))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                return route, await self.send_json(writer, 400, {"status": "error",
+                                                                 "message": "Invalid JSON data"})
+            try:
+                items = request_items(data, batch=url.path == "/speak/batch")
+            except ValueError as e:
+                return route, await self.send_json(writer, 400, {"status": "error",
+                                                                 "message": str(e)})
+            if not items:
+                return route, await self.send_json(writer, 400, {"status": "error",
+                                                                 "message": "No text given"})
+            if data.get("play"):
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, play, self.speakers,
+                                                                     items)
+                except RenderError as e:
+                    return route, await self.render_error(writer, e)
+                return route, await self.send_json(writer, 200, {"status": "success",
+                                                                 "queued": len(items)})
+            if url.path == "/speak":
+                try:
+                    key, _, cached = await self.get_audio(*items[0], client)
+                except Exception as e:
+                    return route, await self.render_error(writer, e)
+                return route, await self.send_json(writer, 200, {
+                    "status": "success", "audio": f"/audio/{key}.wav", "cached": cached})
+            results = await asyncio.gather(*(self.get_audio(*item) for item in items),
+                                           return_exceptions=True)
+            audio = [{"text": item[0], "error": str(res) or type(res).__name__}
+                     if isinstance(res, Exception) else
+                     {"text": item[0], "audio": f"/audio/{res[0]}.wav", "cached": res[2]}
+                     for item, res in zip(items, results)]
+            return route, await self.send_json(writer, 200, {"status": "success", "audio": audio})
+        return "other", await self.send_json(writer, 404, {"status": "error",
+                                                           "message": "Not found"})
+
+async def serve(port, cache, speakers, synth_workers=2, queue_size=32):
+    service = TTSService(cache, speakers, synth_workers, queue_size)
+    workers = [asyncio.create_task(service.worker()) for _ in range(synth_workers)]
+    server = await asyncio.start_server(service.handle, "localhost", port)
+    print(f"Server running at http://localhost:{port} (asyncio, "
+          f"{synth_workers} synthesis workers, queue of {queue_size})")
+    print("Ready to receive TTS requests...")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in workers:
+            task.cancel()
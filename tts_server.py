@@ -1,135 +1,422 @@
 #!/usr/bin/env python3
 """
-Simple TTS Server that executes spd-say commands
+Simple TTS Server that renders speech to cached audio files
 Run this server to enable system TTS for the flashcards
+
+Speech is rendered once per (text, lang, voice) with espeak-ng into an
+on-disk LRU cache (tts_cache/, size-capped) and served as static audio
+with strong ETags and Range support, so repeat pronunciations cost a file
+read instead of a process spawn.
+
+With "play": true, speech goes to this machine's speakers instead, over a
+small pool of persistent speech-dispatcher connections (ssip_client.py),
+falling back to spd-say when its socket is unreachable.
+
+Endpoints:
+    GET  /speak?text=...&lang=ja-JP[&voice=...]  -> audio/wav (rendered on miss)
+    POST /speak {"text", "lang", "voice"}        -> {"status", "audio", "cached"}
+    POST /speak {"text", "lang", "play": true}   -> speak on the server
+    POST /speak/batch {"items": [{"text", ...}], "lang", "voice", "play"}
+                                                  -> one request for a card's
+                                                     name and origin elements
+    GET  /audio/<key>.wav                         -> cached audio
+
+With --static DIR, any other GET serves the app out of DIR as well
+(static_files.py: ETags, 304s, immutable caching of hashed names, gzip,
+sendfile), so the page and /speak share one threaded server and origin.
+
+Usage:
+    python tts_server.py [port] [--cache-dir tts_cache] [--cache-mb 200]
+                         [--ssip-connections 2] [--static .]
+    python tts_server.py [port] --async [--synth-workers 2] [--queue-size 32]
 """
 
+import argparse
+import hashlib
 import json
+import os
+import re
+import shutil
 import subprocess
-import sys
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 
+from ssip_client import SSIPError, SSIPPool
+from static_files import IMMUTABLE, StaticFiles, file_response, send_file
+
+# Map language codes to espeak-ng / spd-say language options
+LANG_MAP = {
+    'ja-JP': 'ja',
+    'en-US': 'en',
+    'en-GB': 'en',
+    'fr-FR': 'fr',
+    'de-DE': 'de',
+    'es-ES': 'es'
+}
+
+ENGINE = shutil.which('espeak-ng') or shutil.which('espeak') or 'espeak-ng'
+RENDER_TIMEOUT = 10
+AUDIO_PATH = re.compile(r'^/audio/([0-9a-f]{40})\.wav$')
+
+class RenderError(Exception):
+    """Speech could not be rendered or played; the message is safe to show clients."""
+
+def cache_key(text, lang, voice):
+    return hashlib.sha1(f"{text}\0{lang}\0{voice}".encode('utf-8')).hexdigest()
+
+def render(text, lang, voice, out_path):
+    """Render speech to a WAV file with espeak-ng."""
+    voice = voice or LANG_MAP.get(lang, 'en')
+    if voice.startswith('-'):
+        raise RenderError('Invalid voice')
+    # '--' so text starting with '-' is spoken, never read as an option (-w, -f)
+    cmd = [ENGINE, '-v', voice, '-w', str(out_path), '--', text]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=RENDER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise RenderError('TTS command timed out')
+    except FileNotFoundError:
+        raise RenderError(f'{ENGINE} command not found')
+    if result.returncode != 0:
+        raise RenderError(result.stderr.strip() or 'TTS command failed')
+
+def spd_say(text, lang):
+    """Speak through a one-off spd-say process (no speech-dispatcher socket)."""
+    cmd = ['spd-say', '-l', LANG_MAP.get(lang, 'en'), '--', text]
+    print(f"Executing: {' '.join(cmd)}")
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=RENDER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise RenderError('TTS command timed out')
+    except FileNotFoundError:
+        raise RenderError('spd-say command not found')
+    if result.returncode != 0:
+        raise RenderError(result.stderr.strip() or 'TTS command failed')
+
+def play(speakers, items):
+    """Speak (text, lang, voice) items on this machine, in order."""
+    try:
+        speakers.speak_many((text, LANG_MAP.get(lang, 'en'), voice or None)
+                            for text, lang, voice in items)
+    except ValueError:
+        raise RenderError('Invalid voice') from None
+    except SSIPError as e:
+        # items before e.sent are already queued; speak only the rest
+        print(f"speech-dispatcher unavailable ({e}), falling back to spd-say "
+              f"for {len(items) - e.sent} of {len(items)}")
+        for text, lang, _ in items[e.sent:]:
+            spd_say(text, lang)
+
+def request_items(data, batch=False):
+    """(text, lang, voice) items with text from a POST /speak(/batch) body.
+
+    Raises ValueError, with a message safe to show clients, on anything
+    but an object whose items are objects of strings.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    if batch:
+        raw = data.get('items', [])
+        if not isinstance(raw, list) or not all(isinstance(item, dict) for item in raw):
+            raise ValueError('Expected items to be a list of objects')
+        lang, voice = data.get('lang', 'en-US'), data.get('voice', '')
+    else:
+        raw, lang, voice = [data], 'en-US', ''
+    items = [(item.get('text', ''), item.get('lang', lang), item.get('voice', voice))
+             for item in raw]
+    if not all(isinstance(field, str) and '\0' not in field
+               for item in items for field in item):
+        raise ValueError('text, lang and voice must be strings (without NUL)')
+    return [item for item in items if item[0]]
+
+class AudioCache:
+    """Rendered audio files in one directory, evicted least recently used first."""
+
+    def __init__(self, directory, max_bytes):
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.entries = OrderedDict()        # key -> size, oldest use first
+        os.makedirs(directory, exist_ok=True)
+        files = [e for e in os.scandir(directory) if e.name.endswith('.wav')]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            self.entries[entry.name[:-4]] = entry.stat().st_size
+        self.total = sum(self.entries.values())
+
+    def path(self, key):
+        return os.path.join(self.dir, f"{key}.wav")
+
+    def lookup(self, key):
+        """Path of a cached file (marking it recently used), or None."""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        path = self.path(key)
+        try:
+            os.utime(path)                  # keeps LRU order across restarts
+        except FileNotFoundError:
+            with self.lock:
+                self.total -= self.entries.pop(key, 0)
+            return None
+        return path
+
+    def get_or_render(self, text, lang, voice):
+        """Return (key, path, was_cached), rendering on a miss."""
+        key = cache_key(text, lang, voice)
+        path = self.lookup(key)
+        if path:
+            return key, path, True
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:                  # one render per key at a time
+                path = self.lookup(key)
+                if path:
+                    return key, path, True
+                tmp = f"{self.path(key)}.{threading.get_ident()}.tmp"
+                try:
+                    render(text, lang, voice, tmp)
+                    os.replace(tmp, self.path(key))
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                self.add(key, os.path.getsize(self.path(key)))
+                return key, self.path(key), False
+        finally:
+            with self.lock:
+                self.key_locks.pop(key, None)
+
+    def add(self, key, size):
+        with self.lock:
+            self.total += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            while self.total > self.max_bytes and len(self.entries) > 1:
+                old, old_size = self.entries.popitem(last=False)
+                self.total -= old_size
+                try:
+                    os.remove(self.path(old))
+                except FileNotFoundError:
+                    pass
+
+def audio_response(key, path, request_headers):
+    """
+    Status, headers and byte range for serving a cached file.
+
+    Handles If-None-Match against a strong ETag and a single Range
+    (bytes=a-b, a- or -n).  Returns (status, headers, start, length).
+    """
+    size = os.path.getsize(path)
+    return file_response(size, f'"{key}-{size}"', 'audio/wav', IMMUTABLE, request_headers)
+
 class TTSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'       # keep-alive between card flips
+    cache = None                        # AudioCache, set in main()
+    speakers = None                     # SSIPPool, set in main()
+    static = None                       # StaticFiles with --static, set in main()
+
+    # ------------------ helpers ---------------------
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_audio(self, key, path):
+        """Serve a cached file with a strong ETag, 304s and single byte ranges."""
+        status, headers, start, length = audio_response(key, path, self.headers)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command == 'HEAD' or not length:
+            return
+        send_file(self, path, start, length)
+
+    def speak(self, text, lang, voice):
+        """Render (or reuse) speech; returns (key, path, was_cached) or None on error."""
+        if not text:
+            self.send_json(400, {'status': 'error', 'message': 'No text given'})
+            return None
+        print(f"Received TTS request: '{text}' in {lang}")
+        try:
+            key, path, cached = self.cache.get_or_render(text, lang, voice)
+            print(f"{'Cache hit' if cached else 'Rendered'}: {key}.wav")
+            return key, path, cached
+        except RenderError as e:
+            print(f"TTS command failed: {e}")
+            self.send_json(500, {'status': 'error', 'message': str(e)})
+            return None
+
+    def read_json(self, batch=False):
+        """(body, items) of a /speak(/batch) request, or None after answering 400."""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError, ValueError):
+            print("Invalid JSON data received")
+            self.send_json(400, {'status': 'error', 'message': 'Invalid JSON data'})
+            return None
+        try:
+            return data, request_items(data, batch)
+        except ValueError as e:
+            self.send_json(400, {'status': 'error', 'message': str(e)})
+            return None
+
+    # ------------------ routes ----------------------
+    def do_GET(self):
+        url = urlparse(self.path)
+        match = AUDIO_PATH.match(url.path)
+        if match:
+            path = self.cache.lookup(match.group(1))
+            if path:
+                self.send_audio(match.group(1), path)
+            else:
+                self.send_json(404, {'status': 'error', 'message': 'Not cached'})
+        elif url.path == '/speak':
+            query = parse_qs(url.query)
+            rendered = self.speak(query.get('text', [''])[0],
+                                  query.get('lang', ['en-US'])[0],
+                                  query.get('voice', [''])[0])
+            if rendered:
+                self.send_audio(*rendered[:2])
+        elif not (self.static and self.static.serve(self)):
+            self.send_json(404, {'status': 'error', 'message': 'Not found'})
+
+    do_HEAD = do_GET
+
     def do_POST(self):
         if self.path == '/speak':
-            # Get the content length
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                # Parse JSON data
-                data = json.loads(post_data.decode('utf-8'))
-                text = data.get('text', '')
-                lang = data.get('lang', 'en-US')
-                
-                print(f"Received TTS request: '{text}' in {lang}")
-                
-                # Execute spd-say command
+            request = self.read_json()
+            if request is None:
+                return
+            data, items = request
+            text, lang, voice = items[0] if items else ('', 'en-US', '')
+            if data.get('play'):
+                if not text:
+                    self.send_json(400, {'status': 'error', 'message': 'No text given'})
+                    return
+                print(f"Received TTS request: '{text}' in {lang} (play)")
                 try:
-                    # Map language codes to spd-say language options
-                    lang_map = {
-                        'ja-JP': 'ja',
-                        'en-US': 'en',
-                        'en-GB': 'en',
-                        'fr-FR': 'fr',
-                        'de-DE': 'de',
-                        'es-ES': 'es'
-                    }
-                    
-                    spd_lang = lang_map.get(lang, 'en')
-                    
-                    # Execute spd-say command
-                    cmd = ['spd-say', '-l', spd_lang, text]
-                    print(f"Executing: {' '.join(cmd)}")
-                    
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-                    
-                    if result.returncode == 0:
-                        print("TTS command executed successfully")
-                        self.send_response(200)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        response = {'status': 'success', 'message': 'TTS executed'}
-                        self.wfile.write(json.dumps(response).encode())
-                    else:
-                        print(f"TTS command failed: {result.stderr}")
-                        self.send_response(500)
-                        self.send_header('Content-type', 'application/json')
-                        self.send_header('Access-Control-Allow-Origin', '*')
-                        self.end_headers()
-                        response = {'status': 'error', 'message': result.stderr}
-                        self.wfile.write(json.dumps(response).encode())
-                        
-                except subprocess.TimeoutExpired:
-                    print("TTS command timed out")
-                    self.send_response(500)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    response = {'status': 'error', 'message': 'TTS command timed out'}
-                    self.wfile.write(json.dumps(response).encode())
-                    
-                except FileNotFoundError:
-                    print("spd-say command not found")
-                    self.send_response(500)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    response = {'status': 'error', 'message': 'spd-say command not found'}
-                    self.wfile.write(json.dumps(response).encode())
-                    
-            except json.JSONDecodeError:
-                print("Invalid JSON data received")
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                response = {'status': 'error', 'message': 'Invalid JSON data'}
-                self.wfile.write(json.dumps(response).encode())
-                
+                    play(self.speakers, [(text, lang, voice)])
+                except RenderError as e:
+                    print(f"TTS command failed: {e}")
+                    self.send_json(500, {'status': 'error', 'message': str(e)})
+                    return
+                self.send_json(200, {'status': 'success', 'message': 'TTS executed'})
+                return
+
+            rendered = self.speak(text, lang, voice)
+            if rendered:
+                key, _, cached = rendered
+                self.send_json(200, {'status': 'success', 'audio': f'/audio/{key}.wav',
+                                     'cached': cached})
+        elif self.path == '/speak/batch':
+            request = self.read_json(batch=True)
+            if request is None:
+                return
+            data, items = request
+            if not items:
+                self.send_json(400, {'status': 'error', 'message': 'No text given'})
+                return
+            print(f"Received TTS batch of {len(items)}: {', '.join(t for t, _, _ in items)}")
+            if data.get('play'):
+                try:
+                    play(self.speakers, items)
+                except RenderError as e:
+                    print(f"TTS command failed: {e}")
+                    self.send_json(500, {'status': 'error', 'message': str(e)})
+                    return
+                self.send_json(200, {'status': 'success', 'queued': len(items)})
+                return
+
+            results = []
+            for text, lang, voice in items:
+                try:
+                    key, _, cached = self.cache.get_or_render(text, lang, voice)
+                    results.append({'text': text, 'audio': f'/audio/{key}.wav',
+                                    'cached': cached})
+                except RenderError as e:
+                    results.append({'text': text, 'error': str(e)})
+            self.send_json(200, {'status': 'success', 'audio': results})
         else:
-            self.send_response(404)
-            self.end_headers()
-    
+            self.send_json(404, {'status': 'error', 'message': 'Not found'})
+
     def do_OPTIONS(self):
         # Handle CORS preflight requests
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Range, If-None-Match')
+        self.send_header('Content-Length', '0')
         self.end_headers()
-    
+
     def log_message(self, format, *args):
         # Custom logging to show requests
         print(f"[{self.log_date_time_string()}] {format % args}")
 
 def main():
-    if len(sys.argv) > 1:
-        port = int(sys.argv[1])
-    else:
-        port = 3000
-    
+    parser = argparse.ArgumentParser(description='Flashcard TTS server')
+    parser.add_argument('port', nargs='?', type=int, default=3000)
+    parser.add_argument('--cache-dir', default='tts_cache')
+    parser.add_argument('--cache-mb', type=float, default=200,
+                        help='evict least recently used audio above this size')
+    parser.add_argument('--ssip-connections', type=int, default=2,
+                        help='persistent speech-dispatcher connections for "play"')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='serve from one asyncio loop with request coalescing, '
+                             'a bounded synthesis queue and /metrics (see tts_async.py)')
+    parser.add_argument('--synth-workers', type=int, default=2,
+                        help='concurrent renders in --async mode')
+    parser.add_argument('--queue-size', type=int, default=32,
+                        help='pending renders before --async mode answers 503')
+    parser.add_argument('--static', metavar='DIR',
+                        help='also serve the app from DIR (threaded mode only)')
+    args = parser.parse_args()
+    port = args.port
+
+    TTSHandler.cache = AudioCache(args.cache_dir, int(args.cache_mb * 1024 * 1024))
+    TTSHandler.speakers = SSIPPool(args.ssip_connections)
+    if args.static:
+        if args.use_async:
+            parser.error('--static is only available in threaded mode')
+        TTSHandler.static = StaticFiles(args.static)
+
     print(f"Starting TTS Server on port {port}")
-    print("This server will execute spd-say commands for TTS requests")
-    print("Make sure spd-say is installed and working")
+    print(f"This server renders speech with {ENGINE} and caches it in {args.cache_dir}/")
+    print("Make sure espeak-ng is installed and working")
     print("Press Ctrl+C to stop the server")
-    
+
     try:
-        server = HTTPServer(('localhost', port), TTSHandler)
+        if args.use_async:
+            import asyncio
+            import tts_async
+            asyncio.run(tts_async.serve(port, TTSHandler.cache, TTSHandler.speakers,
+                                        args.synth_workers, args.queue_size))
+            return
+        server = ThreadingHTTPServer(('localhost', port), TTSHandler)
         print(f"Server running at http://localhost:{port}")
+        if TTSHandler.static:
+            print(f"Serving the app from {TTSHandler.static.root} at http://localhost:{port}/")
         print("Ready to receive TTS requests...")
         server.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down server...")
-        server.shutdown()
+        if not args.use_async:
+            server.shutdown()
+        TTSHandler.speakers.close()
     except OSError as e:
-        if e.errno == 48:  # Address already in use
+        if e.errno in (48, 98):  # Address already in use (macOS, Linux)
             print(f"Error: Port {port} is already in use")
             print("Try a different port: python tts_server.py 3001")
         else:
             print(f"Error starting server: {e}")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()